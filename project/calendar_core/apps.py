@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CalendarCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'calendar_core'
+
+    def ready(self):
+        import calendar_core.signals
\ No newline at end of file
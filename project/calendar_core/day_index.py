@@ -0,0 +1,115 @@
+from datetime import date, timedelta
+import calendar
+from dateutil import relativedelta
+
+from django.db.models import F
+from django.db.models.functions import Now
+
+from cycle_core.models import CycleWindow
+from log_core.models import DailyLog
+from .models import DayStateMonth
+
+# Per-user day-state index for the calendars (see DayStateMonth).
+# Month rows are built lazily on first read and dropped when the windows covering them change,
+# log flags are flipped in place. A visible range is then read with a single indexed query.
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def months_between(start: date, end: date) -> list[date]:
+    months = []
+    current = month_start(start)
+    while current <= end:
+        months.append(current)
+        current += relativedelta.relativedelta(months=1)
+    return months
+
+
+def _mark(bitmaps, flag, start, end, range_start, range_end):
+    # sets the flag for the days of [start, end] that fall inside the built range
+    day = max(start, range_start)
+    last = min(end, range_end)
+    while day <= last:
+        bitmaps[month_start(day)][flag] |= 1 << (day.day - 1)
+        day += timedelta(days=1)
+
+
+def build_day_index(user, months: list[date]) -> dict[date, DayStateMonth]:
+    range_start = months[0]
+    range_end = months[-1] + relativedelta.relativedelta(months=1) - timedelta(days=1)
+    bitmaps = {m: dict.fromkeys(DayStateMonth.FLAGS, 0) for m in months_between(range_start, range_end)}
+
+    windows = CycleWindow.objects.filter(
+        user=user,
+        menstruation_start__lte=range_end,
+        max_ovulation_window__gte=range_start
+    ).values_list('menstruation_start', 'menstruation_end', 'min_ovulation_window', 'max_ovulation_window', 'is_prediction')
+
+    for men_start, men_end, ov_start, ov_end, is_prediction in windows:
+        # open windows are not highlighted, same as CycleWindow.getMenstruationDatesAsList
+        if men_end is None:
+            continue
+        _mark(bitmaps, 'menstruation', men_start, men_end, range_start, range_end)
+        _mark(bitmaps, 'ovulation', ov_start, ov_end, range_start, range_end)
+        if is_prediction:
+            _mark(bitmaps, 'prediction', men_start, ov_end, range_start, range_end)
+        else:
+            _mark(bitmaps, 'logged_menstruation', men_start, men_end, range_start, range_end)
+
+    log_dates = DailyLog.objects.filter(user=user, date__gte=range_start, date__lte=range_end).values_list('date', flat=True)
+    for log_date in log_dates:
+        bitmaps[month_start(log_date)]['has_log'] |= 1 << (log_date.day - 1)
+
+    rows = [DayStateMonth(user=user, month=m, **bitmaps[m]) for m in months]
+    # concurrent builds of the same month compute the same row
+    DayStateMonth.objects.bulk_create(rows, ignore_conflicts=True)
+    return {row.month: row for row in rows}
+
+
+def get_day_index(user, start: date, end: date) -> dict[date, DayStateMonth]:
+    # Day states of every month in [start, end], keyed by the first day of the month.
+    months = months_between(start, end)
+    index = {
+        row.month: row
+        for row in DayStateMonth.objects.filter(user=user, month__gte=months[0], month__lte=months[-1])
+    }
+
+    missing = [m for m in months if m not in index]
+    if missing:
+        index.update(build_day_index(user, missing))
+
+    return index
+
+
+def invalidate_day_index(user_id, start: date = None, end: date = None):
+    # Drops the months overlapping [start, end] (unbounded when omitted), rebuilt on the next read.
+    rows = DayStateMonth.objects.filter(user_id=user_id)
+    if start:
+        rows = rows.filter(month__gte=month_start(start))
+    if end:
+        rows = rows.filter(month__lte=end)
+    rows.delete()
+
+
+def set_log_flag(user_id, day: date, has_log: bool):
+    # Flips a single has_log bit in place, months not built yet pick it up when they are.
+    mask = 1 << (day.day - 1)
+    value = F('has_log').bitor(mask) if has_log else F('has_log').bitand(~mask)
+    DayStateMonth.objects.filter(user_id=user_id, month=month_start(day)).update(has_log=value, updated_at=Now())
+
+
+def serialize_day_index(months: list[date], index: dict[date, DayStateMonth]) -> list[dict]:
+    # Compact form of the day states for client-side rendering: the bitmaps plus the grid layout.
+    serialized = []
+    for month in months:
+        row = index[month]
+        first_weekday, days = calendar.monthrange(month.year, month.month)
+        serialized.append({
+            'month': month.strftime('%Y-%m-%d'),
+            'first_weekday': first_weekday,  # Monday is 0
+            'days': days,
+            **{flag: getattr(row, flag) for flag in DayStateMonth.FLAGS},
+        })
+    return serialized
\ No newline at end of file
@@ -0,0 +1,32 @@
+from django.db import models
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+
+
+# Materialized day states of a user's month, read by the calendars instead of expanding every CycleWindow.
+# Bit (day - 1) of each field is set when that day of the month has the flag.
+class DayStateMonth(models.Model):
+    FLAGS = ('menstruation', 'ovulation', 'has_log', 'prediction', 'logged_menstruation')
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name=_("User"))
+    month = models.DateField(verbose_name=_("Month"))  # first day of the month
+
+    menstruation = models.IntegerField(default=0, verbose_name=_("Menstruation"))
+    ovulation = models.IntegerField(default=0, verbose_name=_("Ovulation"))
+    has_log = models.IntegerField(default=0, verbose_name=_("Has log"))
+    prediction = models.IntegerField(default=0, verbose_name=_("Prediction"))
+    # menstruation days of the logged (non predicted) windows, the days selected in the period editor
+    logged_menstruation = models.IntegerField(default=0, verbose_name=_("Logged menstruation"))
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated at"))
+
+    class Meta:
+        unique_together = ('user', 'month')
+        verbose_name = _("Day State Month")
+        verbose_name_plural = _("Day State Months")
+
+    def hasFlag(self, flag, day):
+        return bool(getattr(self, flag) >> (day - 1) & 1)
+
+    def __str__(self):
+        return f'{self.user} - {self.month:%Y-%m}'
\ No newline at end of file
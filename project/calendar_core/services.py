@@ -1,18 +1,39 @@
 from datetime import date
 from enum import Enum
+from functools import lru_cache
 import calendar
 from django.utils.formats import date_format
+from django.utils.translation import get_language
 
 class CalendarType(Enum):
     STANDARD = 0
     SELECTABLE = 1
 
+# DayStateMonth flag -> css class, in the order the highlights are applied
+DAY_STATE_CLASSES = (
+    ('menstruation', 'highlight-menstruation'),
+    ('ovulation', 'highlight-ovulation'),
+    ('has_log', 'has-log'),
+)
+
+# Marks the per-day slots of a month skeleton, filled with the day's attributes on every render.
+SLOT = '\x00'
+
+@lru_cache(maxsize=512)
+def get_month_skeleton(calendar_cls, year, month, withyear, language):
+    # The month grid only depends on these arguments: it is rendered (and date_format called) once,
+    # then shared across requests and users. The language is part of the key for the localized names.
+    return tuple(calendar_cls().formatSkeleton(year, month, withyear).split(SLOT))
+
 class CycleCalendar(calendar.HTMLCalendar):
-    def __init__(self, highlights=None):
+    def __init__(self, highlights=None, day_index=None):
         super().__init__(firstweekday=0)
         self.highlights = highlights or {}
+        # {month: DayStateMonth} from calendar_core.day_index, replaces the highlights when given
+        self.day_index = day_index
         self._year = None
         self._month = None
+        self._month_states = None
 
         self._date_to_classes = {}
         for css_class, dates in self.highlights.items():
@@ -37,54 +58,91 @@ class CycleCalendar(calendar.HTMLCalendar):
         return '<th class="%s">%s</th>' % (self.cssclasses[day], s)
 
     def formatmonth(self, theyear, themonth, withyear=True):
+        self._year = theyear
+        self._month = themonth
+        if self.day_index is not None:
+            self._month_states = self.day_index.get(date(theyear, themonth, 1))
+
+        segments = get_month_skeleton(type(self), theyear, themonth, withyear, get_language())
+
+        # single pass: every slot is followed by the next static segment
+        parts = [segments[0]]
+        next_segment = iter(segments[1:]).__next__
+        for day in range(1, calendar.monthrange(theyear, themonth)[1] + 1):
+            for value in self.fillDay(day):
+                parts.append(value)
+                parts.append(next_segment())
+
+        return ''.join(parts)
+
+    def formatSkeleton(self, theyear, themonth, withyear=True):
         self._year = theyear
         self._month = themonth
         return super().formatmonth(theyear, themonth, withyear)
 
+    def getDayClasses(self, day):
+        if self.day_index is None:
+            return self._date_to_classes.get(f"{self._year:04d}-{self._month:02d}-{day:02d}", [])
+
+        states = self._month_states
+        if states is None:
+            return []
+        return [css_class for flag, css_class in DAY_STATE_CLASSES if states.hasFlag(flag, day)]
+
+    def getClassAttribute(self, day):
+        css_class_str = " ".join(self.getDayClasses(day))
+        return f' class="{css_class_str}"' if css_class_str else ""
+
     def formatday(self, day, weekday):
+        # skeleton cell, the SLOT is the class attribute
         if day == 0:
             return '<td class="noday">&nbsp;</td>'
         
         date_str = f"{self._year:04d}-{self._month:02d}-{day:02d}"
-        css_classes = self._date_to_classes.get(date_str, [])
-        
-        css_class_str = " ".join(css_classes)
-        
-        if css_class_str:
-            return f'<td class="{css_class_str}" data-date="{date_str}"><div class="day-content">{day}</div></td>'
-        else:
-            return f'<td data-date="{date_str}"><div class="day-content">{day}</div></td>'
+        return f'<td{SLOT} data-date="{date_str}"><div class="day-content">{day}</div></td>'
+
+    def fillDay(self, day):
+        # values of the day's slots, in the order formatday emits them
+        return (self.getClassAttribute(day),)
 
 
 
 class SelectableCycleCalendar(CycleCalendar):
 
+    def formatmonth(self, theyear, themonth, withyear=True):
+        self._today = date.today()
+        return super().formatmonth(theyear, themonth, withyear)
+
     def formatday(self, day, weekday):
+        # skeleton cell, the SLOTs are the class and the disabled attributes
         if day == 0:
             return '<td class="noday">&nbsp;</td>'
 
         date_str = f"{self._year:04d}-{self._month:02d}-{day:02d}"
-        current_date = date(self._year, self._month, day)
-        css_classes = self._date_to_classes.get(date_str, [])
-        css_class_str = " ".join(css_classes)
-
-        td_class = f' class="{css_class_str}"' if css_class_str else ""
-
         checkbox_id = f"day_{date_str}"
 
-        is_future = current_date > date.today()
-        disabled_attr = ' disabled' if is_future else ''
-
         return (
-            f'<td{td_class}>'
+            f'<td{SLOT}>'
             f'  <label class="day-label" for="{checkbox_id}">'
             f'    <input type="checkbox" id="{checkbox_id}" '
-            f'           name="selected_days" value="{date_str}"{disabled_attr} />'
+            f'           name="selected_days" value="{date_str}"{SLOT} />'
             f'    <span class="day-number">{day}</span>'
             f'  </label>'
             f'</td>'
         )
 
+    def fillDay(self, day):
+        is_future = date(self._year, self._month, day) > self._today
+        disabled_attr = ' disabled' if is_future else ''
+        return (self.getClassAttribute(day), disabled_attr)
+
+def get_month_labels(months: list[date]) -> dict:
+    # Localized headers for client-side rendering, same text as CycleCalendar's.
+    return {
+        'weekdays': [date_format(date(2001, 1, 1 + day), "D") for day in range(7)],
+        'month_names': ['%s %s' % (date_format(dt, "F"), dt.year) for dt in months],
+    }
+
 def render_calendar(dt: date, menstruation_dates: dict=None, ovulation_dates: dict=None, log_dates: dict=None, calendar_type: CalendarType=CalendarType.STANDARD):
     highlights = {
         'highlight-menstruation' : menstruation_dates or {},
@@ -97,7 +155,7 @@ def render_calendar(dt: date, menstruation_dates: dict=None, ovulation_dates: di
     elif calendar_type == CalendarType.SELECTABLE:
         return SelectableCycleCalendar(highlights=highlights).formatmonth(dt.year, dt.month)
 
-def render_multiple_calendars(months: list[date], menstruation_dates: dict=None, ovulation_dates: dict=None, log_dates: dict=None, calendar_type: CalendarType=CalendarType.STANDARD) -> list[str]:
+def render_multiple_calendars(months: list[date], menstruation_dates: dict=None, ovulation_dates: dict=None, log_dates: dict=None, calendar_type: CalendarType=CalendarType.STANDARD, day_index: dict=None) -> list[str]:
     highlights = {
         'highlight-menstruation': menstruation_dates or {},
         'highlight-ovulation': ovulation_dates or {},
@@ -105,9 +163,9 @@ def render_multiple_calendars(months: list[date], menstruation_dates: dict=None,
     }
 
     if calendar_type == CalendarType.STANDARD:
-        calendar = CycleCalendar(highlights=highlights)
+        calendar = CycleCalendar(highlights=highlights, day_index=day_index)
     elif calendar_type == CalendarType.SELECTABLE:
-        calendar = SelectableCycleCalendar(highlights=highlights)
+        calendar = SelectableCycleCalendar(highlights=highlights, day_index=day_index)
 
     html_calendars = []
     for dt in months:
@@ -0,0 +1,50 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from cycle_core.models import CycleWindow
+from cycle_core.batching import is_deferred, cycle_data_bulk_changed
+from log_core.models import DailyLog
+from .day_index import invalidate_day_index, set_log_flag
+
+# Predicted windows are rewritten in bulk by cycle_core.signals.generateOrUpdatePredictions, and bulk
+# mutations (deferred_cycle_updates) drop the whole index once: both invalidate the index themselves.
+
+@receiver(cycle_data_bulk_changed)
+def dropDayIndexAfterBulkChange(sender, user_id, **kwargs):
+    invalidate_day_index(user_id)
+
+@receiver(post_save, sender=CycleWindow)
+def updateDayIndexOnWindowSave(sender, instance, created, **kwargs):
+    if instance.is_prediction or is_deferred(instance.user_id):
+        return
+
+    if created:
+        invalidate_day_index(instance.user_id, instance.menstruation_start, instance.max_ovulation_window)
+    else:
+        # the previous dates are unknown here
+        invalidate_day_index(instance.user_id)
+
+@receiver(post_delete, sender=CycleWindow)
+def updateDayIndexOnWindowDelete(sender, instance, **kwargs):
+    if instance.is_prediction or is_deferred(instance.user_id):
+        return
+    invalidate_day_index(instance.user_id, instance.menstruation_start, instance.max_ovulation_window)
+
+@receiver(post_save, sender=DailyLog)
+def updateDayIndexOnLogSave(sender, instance, **kwargs):
+    if is_deferred(instance.user_id):
+        return
+
+    # set by log_core.signals.rememberLogDate
+    previous_date = getattr(instance, '_previous_date', None)
+    if previous_date and previous_date != instance.date:
+        # both months are rebuilt on the next read
+        invalidate_day_index(instance.user_id, previous_date, previous_date)
+        invalidate_day_index(instance.user_id, instance.date, instance.date)
+    else:
+        set_log_flag(instance.user_id, instance.date, True)
+
+@receiver(post_delete, sender=DailyLog)
+def updateDayIndexOnLogDelete(sender, instance, **kwargs):
+    if not is_deferred(instance.user_id):
+        set_log_flag(instance.user_id, instance.date, False)
\ No newline at end of file
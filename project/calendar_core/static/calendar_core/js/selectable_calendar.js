@@ -0,0 +1,74 @@
+// Client-side counterpart of calendar_core.services.SelectableCycleCalendar.
+// Renders a month payload of dashboard:ajax_calendar_data into the same markup.
+(function () {
+    const WEEKDAY_CLASSES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'];
+
+    function hasFlag(bitmap, day) {
+        return ((bitmap >> (day - 1)) & 1) === 1;
+    }
+
+    function dateOf(month, day) {
+        return `${month.month.slice(0, 8)}${String(day).padStart(2, '0')}`;
+    }
+
+    function formatDay(month, day, today) {
+        const dateStr = dateOf(month, day);
+        const checkboxId = `day_${dateStr}`;
+        const tdClass = hasFlag(month.logged_menstruation, day)
+            ? ' class="highlight-menstruation"'
+            : '';
+        // ISO dates compare chronologically as strings
+        const disabledAttr = dateStr > today ? ' disabled' : '';
+
+        return (
+            `<td${tdClass}>` +
+            `  <label class="day-label" for="${checkboxId}">` +
+            `    <input type="checkbox" id="${checkboxId}" ` +
+            `           name="selected_days" value="${dateStr}"${disabledAttr} />` +
+            `    <span class="day-number">${day}</span>` +
+            `  </label>` +
+            `</td>`
+        );
+    }
+
+    function renderSelectableMonth(month, weekdays, today) {
+        const cells = [];
+        for (let i = 0; i < month.first_weekday; i++) {
+            cells.push('<td class="noday">&nbsp;</td>');
+        }
+        for (let day = 1; day <= month.days; day++) {
+            cells.push(formatDay(month, day, today));
+        }
+        while (cells.length % 7) {
+            cells.push('<td class="noday">&nbsp;</td>');
+        }
+
+        const rows = [
+            '<table border="0" cellpadding="0" cellspacing="0" class="month">',
+            `<tr><th colspan="7" class="month">${month.name}</th></tr>`,
+            '<tr>' +
+                weekdays
+                    .map((name, i) => `<th class="${WEEKDAY_CLASSES[i]}">${name}</th>`)
+                    .join('') +
+                '</tr>',
+        ];
+        for (let i = 0; i < cells.length; i += 7) {
+            rows.push(`<tr>${cells.slice(i, i + 7).join('')}</tr>`);
+        }
+        rows.push('</table>');
+        return rows.join('\n') + '\n';
+    }
+
+    function selectedDatesOfMonth(month) {
+        const dates = [];
+        for (let day = 1; day <= month.days; day++) {
+            if (hasFlag(month.logged_menstruation, day)) {
+                dates.push(dateOf(month, day));
+            }
+        }
+        return dates;
+    }
+
+    window.renderSelectableMonth = renderSelectableMonth;
+    window.selectedDatesOfMonth = selectedDatesOfMonth;
+})();
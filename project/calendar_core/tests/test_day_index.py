@@ -0,0 +1,124 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from datetime import date, timedelta
+
+from cycle_core.models import CycleDetails, CycleWindow
+from log_core.models import DailyLog
+from calendar_core.models import DayStateMonth
+from calendar_core.day_index import get_day_index, months_between
+from calendar_core.services import render_multiple_calendars
+
+User = get_user_model()
+
+
+class DayIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='pass')
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date(2025, 1, 1))
+        self.start = date(2025, 1, 1)
+        self.end = date(2025, 3, 31)
+
+    def _create_window(self, start, length=5):
+        return CycleWindow.objects.create(
+            user=self.user,
+            menstruation_start=start,
+            menstruation_end=start + timedelta(days=length - 1),
+            min_ovulation_window=start + timedelta(days=12),
+            max_ovulation_window=start + timedelta(days=16),
+            is_prediction=False
+        )
+
+    def _expanded_highlights(self):
+        # the per-request expansion the index replaces
+        menstruation, ovulation = set(), set()
+        for cw in CycleWindow.objects.filter(user=self.user):
+            menstruation.update(cw.getMenstruationDatesAsList())
+            ovulation.update(cw.getOvulationDatesAsList())
+        logs = {d.isoformat() for d in DailyLog.objects.filter(user=self.user).values_list('date', flat=True)}
+        return menstruation, ovulation, logs
+
+    def _assert_matches_windows(self):
+        months = months_between(self.start, self.end)
+        menstruation, ovulation, logs = self._expanded_highlights()
+
+        expected = render_multiple_calendars(months, list(menstruation), list(ovulation), list(logs))
+        rendered = render_multiple_calendars(months, day_index=get_day_index(self.user, self.start, self.end))
+        self.assertEqual(rendered, expected)
+
+    def test_months_between(self):
+        self.assertEqual(months_between(date(2024, 12, 15), date(2025, 2, 1)), [date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)])
+
+    def test_index_matches_windows(self):
+        self._create_window(date(2025, 1, 30))
+        self._create_window(date(2025, 2, 27))
+        DailyLog.objects.create(user=self.user, date=date(2025, 2, 3), note='note')
+
+        self._assert_matches_windows()
+
+        index = get_day_index(self.user, date(2025, 2, 1), date(2025, 2, 28))
+        february = index[date(2025, 2, 1)]
+        self.assertTrue(february.hasFlag('menstruation', 1))
+        self.assertFalse(february.hasFlag('menstruation', 4))
+        self.assertTrue(february.hasFlag('ovulation', 11))
+        self.assertTrue(february.hasFlag('has_log', 3))
+
+    def test_built_months_read_in_one_query(self):
+        self._create_window(date(2025, 1, 30))
+        get_day_index(self.user, self.start, self.end)
+
+        with self.assertNumQueries(1):
+            get_day_index(self.user, self.start, self.end)
+
+    def test_window_changes_invalidate_months(self):
+        get_day_index(self.user, self.start, self.end)
+
+        window = self._create_window(date(2025, 2, 10))
+        self._assert_matches_windows()
+
+        window.delete()
+        self._assert_matches_windows()
+
+    def test_log_flag_updated_in_place(self):
+        get_day_index(self.user, self.start, self.end)
+
+        log = DailyLog.objects.create(user=self.user, date=date(2025, 3, 31), note='note')
+        self.assertTrue(DayStateMonth.objects.get(user=self.user, month=date(2025, 3, 1)).hasFlag('has_log', 31))
+
+        log.delete()
+        self.assertEqual(DayStateMonth.objects.get(user=self.user, month=date(2025, 3, 1)).has_log, 0)
+
+    def test_moved_log_clears_previous_day(self):
+        log = DailyLog.objects.create(user=self.user, date=date(2025, 1, 15), note='note')
+        get_day_index(self.user, self.start, self.end)
+
+        log.date = date(2025, 3, 2)
+        log.save()
+        self._assert_matches_windows()
+        index = get_day_index(self.user, self.start, self.end)
+        self.assertEqual(index[date(2025, 1, 1)].has_log, 0)
+        self.assertTrue(index[date(2025, 3, 1)].hasFlag('has_log', 2))
+
+        # edits keeping the date flip the bit in place
+        log.note = 'edited'
+        log.save()
+        self.assertEqual(DayStateMonth.objects.filter(user=self.user).count(), 3)
+
+    def test_predictions_are_flagged(self):
+        today = date.today()
+        start, end = today - timedelta(days=40), today + timedelta(days=120)
+        get_day_index(self.user, start, end)
+
+        # regenerates the predictions
+        self._create_window(today - timedelta(days=20))
+
+        index = get_day_index(self.user, start, end)
+        for prediction in CycleWindow.objects.filter(user=self.user, is_prediction=True):
+            day = prediction.menstruation_start
+            if day <= end:
+                self.assertTrue(index[day.replace(day=1)].hasFlag('prediction', day.day))
+                self.assertTrue(index[day.replace(day=1)].hasFlag('menstruation', day.day))
+
+        self.start, self.end = start, end
+        self._assert_matches_windows()
@@ -0,0 +1,49 @@
+from django.test import SimpleTestCase
+from django.utils import translation
+from datetime import date, timedelta
+
+from calendar_core.services import CycleCalendar, SelectableCycleCalendar, CalendarType, render_multiple_calendars, get_month_skeleton
+
+
+class MonthSkeletonTest(SimpleTestCase):
+    def setUp(self):
+        get_month_skeleton.cache_clear()
+
+    def test_skeleton_reused_across_renders(self):
+        months = [date(2025, 1, 1), date(2025, 2, 1)]
+        render_multiple_calendars(months, menstruation_dates=['2025-01-02'])
+        render_multiple_calendars(months, log_dates=['2025-02-03'])
+
+        info = get_month_skeleton.cache_info()
+        self.assertEqual(info.misses, 2)
+        self.assertEqual(info.hits, 2)
+
+    def test_day_cells_filled(self):
+        html = CycleCalendar(highlights={
+            'highlight-menstruation': ['2025-01-02'],
+            'has-log': ['2025-01-02', '2025-01-03'],
+        }).formatmonth(2025, 1)
+
+        self.assertIn('<td class="highlight-menstruation has-log" data-date="2025-01-02"><div class="day-content">2</div></td>', html)
+        self.assertIn('<td class="has-log" data-date="2025-01-03"><div class="day-content">3</div></td>', html)
+        self.assertIn('<td data-date="2025-01-31"><div class="day-content">31</div></td>', html)
+        self.assertNotIn('\x00', html)
+
+    def test_selectable_disables_future_days(self):
+        today = date.today()
+        tomorrow = today + timedelta(days=1)
+        calendars = render_multiple_calendars([today.replace(day=1), tomorrow.replace(day=1)], calendar_type=CalendarType.SELECTABLE)
+        html = ''.join(calendars)
+
+        self.assertIn(f'value="{today.isoformat()}" />', html)
+        self.assertIn(f'value="{tomorrow.isoformat()}" disabled />', html)
+
+    def test_skeleton_per_language(self):
+        with translation.override('en'):
+            english = CycleCalendar().formatmonth(2025, 1)
+        with translation.override('it'):
+            italian = SelectableCycleCalendar().formatmonth(2025, 1)
+            self.assertNotEqual(CycleCalendar().formatmonth(2025, 1), english)
+
+        self.assertIn('January', english)
+        self.assertNotIn('January', italian)
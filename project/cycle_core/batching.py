@@ -0,0 +1,53 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.dispatch import Signal
+
+from .models import CycleStats
+from .services import update_cycle_stats
+
+# Sent with user_id when the outermost deferred_cycle_updates scope ends: the apps whose per-row receivers
+# were skipped (calendar index, analytics) invalidate the user's derived data from their own signals.py.
+cycle_data_bulk_changed = Signal()
+
+# user id -> nesting depth of the active deferred_cycle_updates scopes (per thread)
+_state = threading.local()
+
+
+def _deferred_users() -> dict:
+    if not hasattr(_state, 'users'):
+        _state.users = {}
+    return _state.users
+
+
+def is_deferred(user_id) -> bool:
+    return user_id in _deferred_users()
+
+
+@contextmanager
+def deferred_cycle_updates(user):
+    # Bulk CycleWindow mutations (period editing, restore, reset) would otherwise recompute the stats and
+    # regenerate the predictions once per row. Inside this scope the per-row receivers in signals.py are
+    # skipped for the user, and a single refresh runs once the surrounding transaction commits.
+    users = _deferred_users()
+    outermost = user.id not in users
+    users[user.id] = users.get(user.id, 0) + 1
+
+    try:
+        yield
+    finally:
+        users[user.id] -= 1
+        if not users[user.id]:
+            del users[user.id]
+
+    if outermost:
+        cycle_data_bulk_changed.send(sender=type(user), user_id=user.id)
+        transaction.on_commit(lambda: refresh_cycle_data(user))
+
+
+def refresh_cycle_data(user):
+    # Saving CycleStats regenerates the predictions through the CycleStats post_save receiver.
+    stats = CycleStats.objects.filter(user=user).first()
+    if stats:
+        update_cycle_stats(stats)
\ No newline at end of file
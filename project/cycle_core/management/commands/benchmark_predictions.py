@@ -0,0 +1,37 @@
+import timeit
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from cycle_core.models import CycleDetails
+from cycle_core.services import PredictionBuilder
+
+
+class Command(BaseCommand):
+    help = ("Times the guest-mode predictions (CycleDetails input, no database) built as PredictedWindows "
+            "against the same predictions built as unsaved CycleWindow models.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20000, help="Predictions built per measure.")
+        parser.add_argument('--repeat', type=int, default=5, help="Measures taken, the best one is reported.")
+        parser.add_argument('--times', type=int, default=3, help="Cycles predicted per run.")
+
+    def handle(self, *args, **options):
+        cd = CycleDetails(base_menstruation_date=date.today(), avg_cycle_duration=28, avg_menstruation_duration=5)
+        times = options['times']
+
+        def predicted():
+            for window in PredictionBuilder.generateMultiplePredictions(cd, times):
+                window.getMenstruationDatesAsList()
+                window.getOvulationDatesAsList()
+
+        def models():
+            # what the guest flow built before PredictedWindow: an unsaved model per prediction
+            for window in PredictionBuilder.generateMultiplePredictions(cd, times):
+                window = window.toCycleWindow()
+                window.getMenstruationDatesAsList()
+                window.getOvulationDatesAsList()
+
+        for label, func in (('CycleWindow', models), ('PredictedWindow', predicted)):
+            best = min(timeit.repeat(func, number=options['runs'], repeat=options['repeat']))
+            self.stdout.write(f'{label}: {options["runs"] / best:,.0f} runs/s')
\ No newline at end of file
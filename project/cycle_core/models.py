@@ -4,12 +4,15 @@ from django.conf import settings
 from django.utils.text import format_lazy
 from django.utils.translation import gettext_lazy as _
 
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 # Create your models here.
 
 MIN_LOG_FOR_STATS = 6
 
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
 class CycleDetails(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
 
@@ -41,57 +44,24 @@ class CycleDetails(models.Model):
         blank=False,
         null=False,
     )
-    
-    # CycleWindow.objects.get_or_create() should be used in view.
-    # The model should NOT be the one to insert elements in database.
-    # Used in services.PredictionBuilder.generateMultiplePrediction to generate
-    # a uniformed list of CycleWindows starting from the initial CycleWindow.
-    def asCycleWindow(self):
-        cw = CycleWindow(
-            menstruation_start=self.base_menstruation_date,
-            menstruation_end=self.base_menstruation_date + timedelta(days=self.avg_menstruation_duration-1),
-            min_ovulation_window=self.base_menstruation_date + timedelta(days=CycleDetails.AVG_MIN_OVULATION_DAY),
-            max_ovulation_window=self.base_menstruation_date + timedelta(days=CycleDetails.AVG_MAX_OVULATION_DAY),
-            is_prediction = False
 
-        )
-        
-        return cw
-    
     def __str__(self):
         return f'last menstruation: {self.base_menstruation_date}\n average cycle duration:{self.avg_cycle_duration}\n average menstruation duration:{self.avg_menstruation_duration}'
 
 
 
-class CycleWindow(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
-
-    menstruation_start = models.DateField(
-        blank=False,
-        default=now
-    )
-
-    menstruation_end = models.DateField(
-        null=True,
-        blank=True,
-    )
-
-    min_ovulation_window = models.DateField(
-        blank=False,
-    )
-
-    max_ovulation_window = models.DateField(
-        blank=False,
-    )
-
-    is_prediction = models.BooleanField(default=True)
+# Date accessors shared by the CycleWindow model and the unsaved PredictedWindow value type.
+class CycleWindowDatesMixin():
+    __slots__ = ()
 
     def getMenstruationDatesAsList(self):
         if self.menstruation_start is None or self.menstruation_end is None:
             raise ValueError('period_start and period_end must be set.')
 
         delta = self.getMenstruationDuration()
-        return [(self.menstruation_start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(delta.days)]
+        start = _as_date(self.menstruation_start)
+        # isoformat() is the '%Y-%m-%d' string, several times faster than strftime
+        return [(start + timedelta(days=i)).isoformat() for i in range(delta.days)]
 
 
     def getOvulationDatesAsList(self):
@@ -99,7 +69,8 @@ class CycleWindow(models.Model):
             raise ValueError('min_ovulation_window and max_ovulation_window must be set.')
 
         delta = self.getOvulationDuration()
-        return [(self.min_ovulation_window + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(delta.days)]
+        start = _as_date(self.min_ovulation_window)
+        return [(start + timedelta(days=i)).isoformat() for i in range(delta.days)]
     
 
     def getMenstruationDuration(self):
@@ -135,9 +106,77 @@ class CycleWindow(models.Model):
             f"Menstruation: from {self.menstruation_start} to {self.menstruation_end}, "
             f"Ovulation: from {self.min_ovulation_window} to {self.max_ovulation_window}"
         )
-    
 
-    
+
+class CycleWindow(CycleWindowDatesMixin, models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+
+    menstruation_start = models.DateField(
+        blank=False,
+        default=now
+    )
+
+    menstruation_end = models.DateField(
+        null=True,
+        blank=True,
+    )
+
+    min_ovulation_window = models.DateField(
+        blank=False,
+    )
+
+    max_ovulation_window = models.DateField(
+        blank=False,
+    )
+
+    is_prediction = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            # per-user history/predictions ordered or ranged by start (stats, predictions, calendar, dashboard).
+            # is_prediction comes last: boolean filters are compiled to a bare column test, which can't seek an index.
+            models.Index(fields=['user', 'menstruation_start', 'is_prediction'], name='cyclewindow_user_start_pred'),
+        ]
+
+
+# Prediction computed on the fly (guest mode, prediction regeneration): it only holds the four dates,
+# which makes it far cheaper to build than an unsaved CycleWindow.
+# Converted to a CycleWindow only when the predictions are stored with bulk_create.
+class PredictedWindow(CycleWindowDatesMixin):
+    __slots__ = ('menstruation_start', 'menstruation_end', 'min_ovulation_window', 'max_ovulation_window')
+
+    is_prediction = True
+
+    def __init__(self, menstruation_start, menstruation_end, min_ovulation_window, max_ovulation_window):
+        self.menstruation_start = menstruation_start
+        self.menstruation_end = menstruation_end
+        self.min_ovulation_window = min_ovulation_window
+        self.max_ovulation_window = max_ovulation_window
+
+    def toCycleWindow(self, user=None) -> CycleWindow:
+        return CycleWindow(
+            user=user,
+            menstruation_start=self.menstruation_start,
+            menstruation_end=self.menstruation_end,
+            min_ovulation_window=self.min_ovulation_window,
+            max_ovulation_window=self.max_ovulation_window,
+            is_prediction=True
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, PredictedWindow):
+            return NotImplemented
+        return (
+            self.menstruation_start == other.menstruation_start and
+            self.menstruation_end == other.menstruation_end and
+            self.min_ovulation_window == other.min_ovulation_window and
+            self.max_ovulation_window == other.max_ovulation_window
+        )
+
+    def __repr__(self):
+        return f"<PredictedWindow: {self}>"
+
+
 # This class is used as a stats holder which will be dynamically updated by methods.
 # It's different from CycleDetails, which is a class used to generate the initial setup form
 # fillled by the user through UI.
@@ -149,4 +188,10 @@ class CycleStats(models.Model):
     avg_ovulation_end_day = models.IntegerField(default=CycleDetails.AVG_MAX_OVULATION_DAY)
     updated_at = models.DateTimeField(auto_now=True)
 
-    log_count = models.PositiveIntegerField(default=0)
\ No newline at end of file
+    log_count = models.PositiveIntegerField(default=0)
+
+    # Running aggregates maintained by stats_engine.CycleStatsEngine.
+    # recent_windows: [id, 'YYYY-MM-DD', menstruation days] of the newest MIN_LOG_FOR_STATS logged windows, oldest first.
+    # ovulation_offsets: {window id: cycle day of the first positive ovulation test} for every closed cycle.
+    recent_windows = models.JSONField(default=list, blank=True)
+    ovulation_offsets = models.JSONField(default=dict, blank=True)
\ No newline at end of file
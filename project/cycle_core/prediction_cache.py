@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import CycleWindow, PredictedWindow
+
+# Predictions only change when generateOrUpdatePredictions (or the CycleDetails teardown) rewrites them,
+# so dashboard reads are served from the cache. Entries are keyed by user and by a per-user version stamp:
+# invalidating bumps the stamp and stale entries simply expire.
+PREDICTION_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(user_id):
+    return f'cycle_core:predictions_version:{user_id}'
+
+
+def _predictions_key(user_id, version):
+    return f'cycle_core:predictions:{user_id}:{version}'
+
+
+def _bump_version(user_id):
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # no stamp yet (or evicted)
+        cache.set(_version_key(user_id), 1, None)
+
+
+def invalidate_predictions(user_id):
+    _bump_version(user_id)
+    # readers may have cached the pre-commit rows in the meantime
+    transaction.on_commit(lambda: _bump_version(user_id))
+
+
+def get_predictions(user) -> list[PredictedWindow]:
+    # The user's stored predictions ordered by menstruation_start.
+    version = cache.get_or_set(_version_key(user.id), 0, None)
+    key = _predictions_key(user.id, version)
+
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(
+            CycleWindow.objects.filter(user=user, is_prediction=True)
+            .order_by('menstruation_start')
+            .values_list('menstruation_start', 'menstruation_end', 'min_ovulation_window', 'max_ovulation_window')
+        )
+        cache.set(key, rows, PREDICTION_CACHE_TIMEOUT)
+
+    return [PredictedWindow(*row) for row in rows]
\ No newline at end of file
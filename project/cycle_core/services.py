@@ -1,7 +1,8 @@
 from django.utils.timezone import now
 
 
-from .models import CycleDetails, CycleWindow, CycleStats, MIN_LOG_FOR_STATS
+from .models import CycleDetails, CycleWindow, CycleStats, PredictedWindow, MIN_LOG_FOR_STATS
+from .stats_engine import CycleStatsEngine, first_positive_test_offsets
 from log_core.models import DailyLog
 
 
@@ -29,69 +30,10 @@ def generate_prediction_based_on_log_count(user, threshold = MIN_LOG_FOR_STATS):
 
 
 def update_cycle_stats(cs: CycleStats, min_logs:int=MIN_LOG_FOR_STATS):
-        user = cs.user
-        if user:
-            logs = CycleWindow.objects.filter(user=user, is_prediction=False)
-            if cs.log_count < min_logs:
-                return
-        
-            # compute avg cycle duration and menstruation duration from last 6 logs
-            # foreach CycleWindow compute
-            #   timedelta between menstruation_start and menstruation_end (inclusive)
-            #   timedelta between menstruation_start and menstruation_start of next CycleWindow
-
-            recent_windows = list(logs.order_by('-menstruation_start')[:min_logs])  # newest first
-            if not recent_windows:
-                return
-
-            # work in chronological order (oldest -> newest)
-            recent_windows.reverse()
-
-            menstruation_lengths = []
-            cycle_lengths = []
-
-            for idx, cw in enumerate(recent_windows):
-                start = cw.menstruation_start
-                end = cw.menstruation_end
-
-                # normalize possible datetime -> date (subtraction works for both)
-                if isinstance(start, datetime):
-                    start = start.date()
-                if isinstance(end, datetime):
-                    end = end.date()
-
-                # menstruation duration: inclusive days (end - start + 1)
-                men_days = cw.getMenstruationDuration().days
-                if men_days > 0:
-                    menstruation_lengths.append(men_days)
-
-                # cycle length: days between this start and next start
-                if idx < len(recent_windows) - 1:
-                    next_start = recent_windows[idx + 1].menstruation_start
-                    if isinstance(next_start, datetime):
-                        next_start = next_start.date()
-                    cycle_days = (next_start - start).days
-                    if cycle_days > 0:
-                        cycle_lengths.append(cycle_days)
-
-            # update cyclestats values (round to nearest int)
-            updated = False
-            if cycle_lengths:
-                new_avg_cycle = int(round(statistics.mean(cycle_lengths)))
-                if new_avg_cycle != cs.avg_cycle_duration:
-                    cs.avg_cycle_duration = new_avg_cycle
-                    updated = True
-            if menstruation_lengths:
-                new_avg_men = int(round(statistics.mean(menstruation_lengths)))
-                if new_avg_men != cs.avg_menstruation_duration:
-                    cs.avg_menstruation_duration = new_avg_men
-                    updated = True
-
-            if updated:
-                cs.save(update_fields=['avg_cycle_duration', 'avg_menstruation_duration'])
-            
-            # Update ovulation stats based on logged ovulation tests
-            update_ovulation_stats(cs)
+    # Full recompute of log_count, averages and ovulation timing with a single CycleStats save.
+    # Used after bulk operations that bypass the CycleWindow signals (bulk_create).
+    if cs.user:
+        CycleStatsEngine(cs, min_logs).rebuild()
 
 def calculate_ovulation_timing_from_logs(user, min_logs=MIN_LOG_FOR_STATS):
     """
@@ -99,34 +41,19 @@ def calculate_ovulation_timing_from_logs(user, min_logs=MIN_LOG_FOR_STATS):
     Returns a tuple: (avg_ovulation_start_day, avg_ovulation_end_day)
     Returns None if insufficient data.
     """
-    logged_cycles = list(
+    cycle_starts = list(
         CycleWindow.objects.filter(
             user=user,
             is_prediction=False
-        ).order_by('menstruation_start')  # Chronological order
+        ).order_by('menstruation_start').values_list('menstruation_start', flat=True)  # Chronological order
     )
     
-    if len(logged_cycles) < min_logs:
+    if len(cycle_starts) < min_logs:
         return None
     
-    # Only use cycles where we have boundary data (current + next cycle)
-    ovulation_day_offsets = []
-    
-    for idx, cycle in enumerate(logged_cycles[:-1]):  # Exclude the last cycle
-        # Use actual next cycle start as boundary (real cycle length)
-        next_cycle_start = logged_cycles[idx + 1].menstruation_start
-        
-        positive_tests = DailyLog.objects.filter(
-            user=user,
-            date__gte=cycle.menstruation_start,
-            date__lt=next_cycle_start,  # Cycle ends before next menstruation starts
-            ovulation_test='POSITIVE'
-        ).order_by('date')
-        
-        if positive_tests.exists():
-            first_positive = positive_tests.first()
-            day_offset = (first_positive.date - cycle.menstruation_start).days
-            ovulation_day_offsets.append(day_offset)
+    # Only cycles with boundary data (current + next cycle) are used, the last one is excluded.
+    # All positive tests are fetched at once: the query count doesn't depend on the number of cycles.
+    ovulation_day_offsets = list(first_positive_test_offsets(user, cycle_starts).values())
     
     if not ovulation_day_offsets:
         return None
@@ -159,19 +86,16 @@ def update_ovulation_stats(cs: CycleStats):
 
 class PredictionBuilder():
     @staticmethod
-    def generatePrediction(base_menstruation_date: date, avg_cycle_duration: int, avg_menstruation_duration: int, user = None) -> CycleWindow:
+    def generatePrediction(base_menstruation_date: date, avg_cycle_duration: int, avg_menstruation_duration: int) -> PredictedWindow:
         predicted_menstruation_start, predicted_menstruation_end = PredictionBuilder.predictMenstruation(base_menstruation_date, avg_cycle_duration, avg_menstruation_duration)
         min_ovulation_window, max_ovulation_window = PredictionBuilder.predictOvulation(predicted_menstruation_start)
 
-        cwp = CycleWindow(
-            user=user,
+        return PredictedWindow(
             menstruation_start=predicted_menstruation_start,
             menstruation_end=predicted_menstruation_end,
             min_ovulation_window=min_ovulation_window,
-            max_ovulation_window=max_ovulation_window,
-            is_prediction = True
+            max_ovulation_window=max_ovulation_window
         )
-        return cwp
 
     @staticmethod
     def predictMenstruation(last_menstruation_date: datetime.date, avg_cycle_duration: int, avg_menstruation_duration: int) -> tuple[datetime, datetime]:
@@ -188,18 +112,18 @@ class PredictionBuilder():
         return(ovulation_start, ovulation_end)
 
     @staticmethod
-    def generateMultiplePredictions(source, times: int = 3, user = None, today = None) -> list:
+    def generateMultiplePredictions(source, times: int = 3, user = None, today = None) -> list[PredictedWindow]:
+        # Returns unsaved PredictedWindows, use PredictedWindow.toCycleWindow() to store them.
         prediction_list = []
         
-        # Normalize to an initial CycleWindow and avg values
+        # Normalize to an initial menstruation start and avg values
         if isinstance(source, CycleDetails):
             cd = source
             
-            latest_real_cw = None
+            latest_real_start = None
             if user:
-                latest_real_cw = CycleWindow.objects.filter(user=user, is_prediction=False).order_by('-menstruation_start').first()
+                latest_real_start = CycleWindow.objects.filter(user=user, is_prediction=False).order_by('-menstruation_start').values_list('menstruation_start', flat=True).first()
             
-            initial_cw = latest_real_cw or cd.asCycleWindow()
             avg_cycle = cd.avg_cycle_duration
             avg_menstruation = cd.avg_menstruation_duration
         
@@ -209,9 +133,8 @@ class PredictionBuilder():
             if cd is None:
                 raise ValueError('CycleStats provided but related CycleDetails (user.cycledetails) not found.')
 
-            latest_real_cw = CycleWindow.objects.filter(user=stats.user, is_prediction=False).order_by('-menstruation_start').first()
+            latest_real_start = CycleWindow.objects.filter(user=stats.user, is_prediction=False).order_by('-menstruation_start').values_list('menstruation_start', flat=True).first()
             
-            initial_cw = latest_real_cw or cd.asCycleWindow()
             avg_cycle = stats.avg_cycle_duration
             avg_menstruation = stats.avg_menstruation_duration
         else:
@@ -222,17 +145,45 @@ class PredictionBuilder():
         if today is None:
             today = now().date()
         
-        current_start = initial_cw.menstruation_start
+        current_start = latest_real_start or cd.base_menstruation_date
         if isinstance(current_start, datetime):
             current_start = current_start.date()
         
-        # Keep advancing until we reach a prediction that starts on or after today
-        while current_start + timedelta(days=avg_cycle) < today:
-            current_start = current_start + timedelta(days=avg_cycle)
-        
+        # Jump to the cycle whose next prediction starts on or after today
+        current_start = PredictionBuilder.fastForward(current_start, avg_cycle, today)
+
+        series = generate_prediction_series(current_start, avg_cycle, avg_menstruation, times)
         for i in range(times):
-            cw = PredictionBuilder.generatePrediction(current_start, avg_cycle, avg_menstruation, user=user)
-            prediction_list.append(cw)
-            current_start = cw.menstruation_start
+            prediction_list.append(PredictedWindow(
+                menstruation_start=series['menstruation_start'][i],
+                menstruation_end=series['menstruation_end'][i],
+                min_ovulation_window=series['min_ovulation_window'][i],
+                max_ovulation_window=series['max_ovulation_window'][i]
+            ))
 
-        return prediction_list
\ No newline at end of file
+        return prediction_list
+
+    @staticmethod
+    def fastForward(start: date, avg_cycle: int, today: date) -> date:
+        # Closed form of: while start + avg_cycle < today: start += avg_cycle
+        if avg_cycle <= 0:
+            raise ValueError('avg_cycle must be a positive number of days.')
+
+        skipped_cycles = max(0, ((today - start).days - 1) // avg_cycle)
+        return start + timedelta(days=skipped_cycles * avg_cycle)
+
+
+def generate_prediction_series(start: date, avg_cycle: int, avg_menstruation: int, n: int, ovulation_start_day: int = CycleDetails.AVG_MIN_OVULATION_DAY, ovulation_end_day: int = CycleDetails.AVG_MAX_OVULATION_DAY) -> dict[str, list[date]]:
+    # Dates of the n predicted windows following start, as parallel lists keyed by CycleWindow field name.
+    # Same arithmetic as PredictionBuilder.generatePrediction, without building a CycleWindow per prediction.
+    starts = [start + timedelta(days=avg_cycle * i) for i in range(1, n + 1)]
+    menstruation_offset = timedelta(days=avg_menstruation - 1)
+    ovulation_start_offset = timedelta(days=ovulation_start_day)
+    ovulation_end_offset = timedelta(days=ovulation_end_day)
+
+    return {
+        'menstruation_start': starts,
+        'menstruation_end': [s + menstruation_offset for s in starts],
+        'min_ovulation_window': [s + ovulation_start_offset for s in starts],
+        'max_ovulation_window': [s + ovulation_end_offset for s in starts],
+    }
\ No newline at end of file
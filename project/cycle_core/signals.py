@@ -2,7 +2,11 @@ from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from .models import CycleDetails, CycleWindow, CycleStats
-from .services import generate_prediction_based_on_log_count, update_cycle_stats
+from .services import generate_prediction_based_on_log_count
+from .stats_engine import CycleStatsEngine
+from .batching import is_deferred
+from .prediction_cache import invalidate_predictions, get_predictions
+from calendar_core.day_index import invalidate_day_index
 
 @receiver(post_save, sender=CycleDetails)
 def initCycleStatsOnCycleDetailsCreation(sender, instance, created, **kwargs):
@@ -32,6 +36,8 @@ def teardownCycleStatsOnCycleDetailsDeletion(sender, instance, **kwargs):
     CycleStats.objects.filter(user=user).delete()
     # remove any generated predictions for this user
     CycleWindow.objects.filter(user=user, is_prediction=True).delete()
+    invalidate_predictions(user.id)
+    invalidate_day_index(user.id)
 
 
 
@@ -43,30 +49,38 @@ def generateOrUpdatePredictions(sender, instance, created, **kwargs):
 	if sender is CycleDetails and created:
 		return
 
+	# regenerated once by batching.deferred_cycle_updates
+	if user and is_deferred(user.id):
+		return
+
 	if user:
+		previous = get_predictions(user)
 		predictions = generate_prediction_based_on_log_count(user)
 		CycleWindow.objects.filter(user=user, is_prediction=True).delete()
-		CycleWindow.objects.bulk_create(predictions)
+		CycleWindow.objects.bulk_create([p.toCycleWindow(user) for p in predictions])
+		invalidate_predictions(user.id)
 
-@receiver([post_save, post_delete], sender=CycleWindow)
-def updateLogCount(sender, instance, **kwargs):
-    if instance.is_prediction:
-        return  # only count real logs
+		# calendar months covered by the old or the new predictions
+		starts = [p.menstruation_start for p in previous + predictions]
+		if starts:
+			invalidate_day_index(user.id, min(starts))
 
-    stats = CycleStats.objects.filter(user=instance.user).first()
+# A single receiver per signal: CycleStatsEngine updates log_count, averages and ovulation timing
+# together and saves CycleStats once, so predictions are regenerated once per change.
+@receiver(post_save, sender=CycleWindow)
+def updateStatsOnLogSave(sender, instance, created, **kwargs):
+    stats = _get_log_stats(instance)
     if stats:
-        stats.log_count = CycleWindow.objects.filter(user=instance.user, is_prediction=False).count()
-        stats.save()
+        CycleStatsEngine(stats).windowSaved(instance, created)
 
-@receiver([post_save, post_delete], sender=CycleWindow)
-def updateStatsOnLogChange(sender, instance, **kwargs):
-	if instance.is_prediction:
-		return
-	if not instance.user:
-		return
-    
-	try:
-		stats = CycleStats.objects.get(user=instance.user)
-	except CycleStats.DoesNotExist:
-		return
-	update_cycle_stats(stats)
\ No newline at end of file
+@receiver(post_delete, sender=CycleWindow)
+def updateStatsOnLogDelete(sender, instance, **kwargs):
+    stats = _get_log_stats(instance)
+    if stats:
+        CycleStatsEngine(stats).windowDeleted(instance)
+
+def _get_log_stats(instance):
+    # only real logs affect the stats, bulk updates are refreshed once by batching.deferred_cycle_updates
+    if instance.is_prediction or not instance.user_id or is_deferred(instance.user_id):
+        return None
+    return CycleStats.objects.filter(user_id=instance.user_id).first()
\ No newline at end of file
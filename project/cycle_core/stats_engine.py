@@ -0,0 +1,177 @@
+from datetime import date
+from bisect import bisect_right
+import statistics
+
+from .models import CycleDetails, CycleWindow, CycleStats, MIN_LOG_FOR_STATS, _as_date
+from log_core.models import DailyLog
+
+
+def first_positive_test_offsets(user, cycle_starts: list) -> dict:
+    # Maps the index of every closed cycle in cycle_starts (chronological) to the cycle day of its first
+    # positive ovulation test. Positive tests are fetched in a single query and bucketed with bisect.
+    offsets = {}
+    if len(cycle_starts) < 2:
+        return offsets
+
+    positive_dates = DailyLog.objects.filter(
+        user=user,
+        date__gte=cycle_starts[0],
+        date__lt=cycle_starts[-1],  # the last cycle is still open
+        ovulation_test='POSITIVE'
+    ).order_by('date').values_list('date', flat=True)
+
+    for test_date in positive_dates:
+        idx = bisect_right(cycle_starts, test_date) - 1
+        # dates are sorted, the first hit of a cycle is its first positive test
+        if idx not in offsets:
+            offsets[idx] = (test_date - cycle_starts[idx]).days
+
+    return offsets
+
+
+# Keeps CycleStats in sync with the logged CycleWindows without reloading the whole history on every change.
+# Creating or deleting a window only touches its direct neighbours, so every update costs a constant number
+# of small queries and exactly one CycleStats.save() (therefore one prediction regeneration).
+# Edits and inconsistent aggregates (e.g. stats restored from a backup) fall back to rebuild().
+class CycleStatsEngine():
+    def __init__(self, stats: CycleStats, min_logs: int = MIN_LOG_FOR_STATS):
+        self.stats = stats
+        self.user = stats.user
+        self.min_logs = min_logs
+
+    def windowSaved(self, window: CycleWindow, created: bool):
+        # Edited windows may have moved anywhere in the history.
+        if not created or not self.isConsistent():
+            return self.rebuild()
+
+        start = _as_date(window.menstruation_start)
+        prev_window, next_window = self._getNeighbours(window)
+
+        self.stats.log_count += 1
+        # the previous cycle now ends where the new window starts
+        self._updateOvulationOffset(prev_window, start)
+        self._updateOvulationOffset((window.id, start), next_window[1] if next_window else None)
+        self._pushRecentWindow(window)
+
+        self._applyAverages()
+        self.stats.save()
+
+    def windowDeleted(self, window: CycleWindow):
+        if not self.isConsistent():
+            return self.rebuild()
+
+        prev_window, next_window = self._getNeighbours(window)
+
+        self.stats.log_count = max(self.stats.log_count - 1, 0)
+        self.stats.ovulation_offsets.pop(str(window.id), None)
+        # the previous cycle now extends up to the following window (or becomes the open, last cycle)
+        self._updateOvulationOffset(prev_window, next_window[1] if next_window else None)
+
+        if any(entry[0] == window.id for entry in self.stats.recent_windows):
+            self.stats.recent_windows = self._loadRecentWindows()
+
+        self._applyAverages()
+        self.stats.save()
+
+    def rebuild(self):
+        # Full recompute from the logged windows, still a single CycleStats write.
+        windows = list(
+            CycleWindow.objects.filter(user=self.user, is_prediction=False)
+            .order_by('menstruation_start')
+            .values_list('id', 'menstruation_start', 'menstruation_end')
+        )
+
+        self.stats.log_count = len(windows)
+        self.stats.recent_windows = [self._recentEntry(*w) for w in windows[-self.min_logs:]]
+        offsets = first_positive_test_offsets(self.user, [w[1] for w in windows])
+        self.stats.ovulation_offsets = {str(windows[idx][0]): offset for idx, offset in offsets.items()}
+
+        self._applyAverages()
+        self.stats.save()
+
+    def isConsistent(self):
+        return len(self.stats.recent_windows) == min(self.stats.log_count, self.min_logs)
+
+    def _getNeighbours(self, window):
+        start = _as_date(window.menstruation_start)
+        logs = CycleWindow.objects.filter(user=self.user, is_prediction=False).exclude(pk=window.pk)
+
+        prev_window = logs.filter(menstruation_start__lt=start).order_by('-menstruation_start').values_list('id', 'menstruation_start').first()
+        next_window = logs.filter(menstruation_start__gt=start).order_by('menstruation_start').values_list('id', 'menstruation_start').first()
+
+        return prev_window, next_window
+
+    def _updateOvulationOffset(self, cycle, cycle_end):
+        # Stores the day of the first positive ovulation test in [cycle_start, cycle_end).
+        # Open cycles (no following window) are excluded, same as calculate_ovulation_timing_from_logs.
+        if cycle is None:
+            return
+
+        cycle_id, cycle_start = cycle
+        offset = None
+        if cycle_end is not None:
+            first_positive = DailyLog.objects.filter(
+                user=self.user,
+                date__gte=cycle_start,
+                date__lt=cycle_end,
+                ovulation_test='POSITIVE'
+            ).order_by('date').values_list('date', flat=True).first()
+
+            if first_positive:
+                offset = (first_positive - cycle_start).days
+
+        if offset is None:
+            self.stats.ovulation_offsets.pop(str(cycle_id), None)
+        else:
+            self.stats.ovulation_offsets[str(cycle_id)] = offset
+
+    def _pushRecentWindow(self, window):
+        entry = self._recentEntry(window.id, window.menstruation_start, window.menstruation_end)
+        recent = self.stats.recent_windows
+
+        # older than every tracked window: it doesn't belong to the rolling set
+        if len(recent) >= self.min_logs and entry[1] < recent[0][1]:
+            return
+
+        recent.append(entry)
+        recent.sort(key=lambda e: e[1])
+        del recent[:-self.min_logs]
+
+    def _loadRecentWindows(self):
+        windows = CycleWindow.objects.filter(user=self.user, is_prediction=False)\
+            .order_by('-menstruation_start')\
+            .values_list('id', 'menstruation_start', 'menstruation_end')[:self.min_logs]
+
+        return [self._recentEntry(*w) for w in reversed(windows)]
+
+    @staticmethod
+    def _recentEntry(window_id, start, end):
+        start, end = _as_date(start), _as_date(end)
+        menstruation_days = (end - start).days + 1 if end else 0
+        return [window_id, start.isoformat(), menstruation_days]
+
+    def _applyAverages(self):
+        stats = self.stats
+        if stats.log_count < self.min_logs:
+            return
+
+        # recent_windows is bounded by min_logs, so these are constant-time
+        recent = stats.recent_windows
+        starts = [date.fromisoformat(entry[1]) for entry in recent]
+
+        menstruation_lengths = [entry[2] for entry in recent if entry[2] > 0]
+        cycle_lengths = [(b - a).days for a, b in zip(starts, starts[1:]) if (b - a).days > 0]
+
+        if cycle_lengths:
+            stats.avg_cycle_duration = int(round(statistics.mean(cycle_lengths)))
+        if menstruation_lengths:
+            stats.avg_menstruation_duration = int(round(statistics.mean(menstruation_lengths)))
+
+        offsets = list(stats.ovulation_offsets.values())
+        if offsets:
+            avg_ovulation_day = statistics.mean(offsets)
+            stats.avg_ovulation_start_day = max(0, round(avg_ovulation_day - 2))
+            stats.avg_ovulation_end_day = round(avg_ovulation_day + 2)
+        else:
+            stats.avg_ovulation_start_day = CycleDetails.AVG_MIN_OVULATION_DAY
+            stats.avg_ovulation_end_day = CycleDetails.AVG_MAX_OVULATION_DAY
\ No newline at end of file
@@ -0,0 +1,66 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from datetime import date, timedelta
+
+from cycle_core.batching import deferred_cycle_updates, is_deferred, refresh_cycle_data
+from cycle_core.models import CycleDetails, CycleWindow, CycleStats
+from cycle_core.services import generate_prediction_based_on_log_count
+
+User = get_user_model()
+
+
+class DeferredCycleUpdatesTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='pass')
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date(2025, 1, 1))
+
+    def _create_windows(self, count):
+        for i in range(count):
+            start = date(2024, 1, 1) + timedelta(days=i*30)
+            CycleWindow.objects.create(
+                user=self.user,
+                menstruation_start=start,
+                menstruation_end=start + timedelta(days=3),
+                min_ovulation_window=start + timedelta(days=12),
+                max_ovulation_window=start + timedelta(days=16),
+                is_prediction=False
+            )
+
+    def test_single_refresh_for_bulk_changes(self):
+        with patch('cycle_core.signals.generate_prediction_based_on_log_count', wraps=generate_prediction_based_on_log_count) as mock_generate:
+            with self.captureOnCommitCallbacks(execute=True):
+                with deferred_cycle_updates(self.user):
+                    self._create_windows(10)
+                    CycleWindow.objects.filter(user=self.user, is_prediction=False).first().delete()
+
+                    self.assertEqual(mock_generate.call_count, 0)
+
+        self.assertEqual(mock_generate.call_count, 1)
+
+        stats = CycleStats.objects.get(user=self.user)
+        self.assertEqual(stats.log_count, 9)
+        self.assertEqual(stats.avg_cycle_duration, 30)
+        self.assertEqual(stats.avg_menstruation_duration, 4)
+        self.assertTrue(CycleWindow.objects.filter(user=self.user, is_prediction=True).exists())
+
+    def test_nested_scopes_refresh_once(self):
+        with patch('cycle_core.batching.refresh_cycle_data', wraps=refresh_cycle_data) as mock_refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                with deferred_cycle_updates(self.user):
+                    with deferred_cycle_updates(self.user):
+                        self._create_windows(2)
+                    self.assertTrue(is_deferred(self.user.id))
+
+        self.assertFalse(is_deferred(self.user.id))
+        self.assertEqual(mock_refresh.call_count, 1)
+        self.assertEqual(CycleStats.objects.get(user=self.user).log_count, 2)
+
+    def test_no_refresh_on_error(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(ValueError):
+                with deferred_cycle_updates(self.user):
+                    raise ValueError
+
+        self.assertEqual(callbacks, [])
+        self.assertFalse(is_deferred(self.user.id))
\ No newline at end of file
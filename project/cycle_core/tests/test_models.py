@@ -54,30 +54,6 @@ class TestCycleDetailsModel(TestCase):
         with self.assertRaises(ValidationError):
             obj.full_clean()
 
-    def test_as_cycle_window(self):
-        cd = CycleDetails(
-            base_menstruation_date=self.DATE,
-            avg_cycle_duration=self.AVG_CYCLE_DURATION,
-            avg_menstruation_duration=self.AVG_MENSTRUATION_DURATION
-        )
-
-        cw = cd.asCycleWindow()
-
-        expected_menstruation_start = self.DATE
-        expected_menstruation_end = self.DATE + datetime.timedelta(days=self.AVG_MENSTRUATION_DURATION-1)
-        expected_ovulation_start = self.DATE + datetime.timedelta(days=CycleDetails.AVG_MIN_OVULATION_DAY)
-        expected_ovulation_end = self.DATE + datetime.timedelta(days=CycleDetails.AVG_MAX_OVULATION_DAY)
-
-        self.assertIsInstance(cw, CycleWindow)
-        self.assertEqual(cw.menstruation_start, expected_menstruation_start)
-        self.assertEqual(cw.menstruation_end, expected_menstruation_end)
-        self.assertEqual(cw.min_ovulation_window, expected_ovulation_start)
-        self.assertEqual(cw.max_ovulation_window, expected_ovulation_end)
-
-        cw2 = cd.asCycleWindow()
-
-        self.assertIsInstance(cw2, CycleWindow)
-
 
 class TestCycleWindowPrediction(TestCase):
     def setUp(self):
@@ -93,4 +93,42 @@ class OvulationPredictionTest(TestCase):
         update_ovulation_stats(self.stats)
         self.stats.refresh_from_db()
         self.assertEqual(self.stats.avg_ovulation_start_day, 12)  # Default
-        self.assertEqual(self.stats.avg_ovulation_end_day, 16)    # Default
\ No newline at end of file
+        self.assertEqual(self.stats.avg_ovulation_end_day, 16)    # Default
+
+class OvulationTimingQueryCountTest(TestCase):
+    # Benchmark: the query count must not grow with the number of logged cycles.
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='pass')
+
+    def _create_cycles(self, count):
+        windows = []
+        logs = []
+        for i in range(count):
+            start = date(2015, 1, 1) + timedelta(days=i*28)
+            windows.append(CycleWindow(
+                user=self.user,
+                menstruation_start=start,
+                menstruation_end=start + timedelta(days=4),
+                min_ovulation_window=start + timedelta(days=12),
+                max_ovulation_window=start + timedelta(days=16),
+                is_prediction=False
+            ))
+            # a negative test before the positive ones shouldn't be picked up
+            logs.append(DailyLog(user=self.user, date=start + timedelta(days=12), ovulation_test='NEGATIVE'))
+            logs.append(DailyLog(user=self.user, date=start + timedelta(days=14), ovulation_test='POSITIVE'))
+            logs.append(DailyLog(user=self.user, date=start + timedelta(days=15), ovulation_test='POSITIVE'))
+
+        # bulk_create skips the CycleWindow signals
+        CycleWindow.objects.bulk_create(windows)
+        DailyLog.objects.bulk_create(logs)
+
+    def test_query_count_is_constant(self):
+        for cycles in (6, 60, 120):
+            CycleWindow.objects.filter(user=self.user).delete()
+            DailyLog.objects.filter(user=self.user).delete()
+            self._create_cycles(cycles)
+
+            with self.assertNumQueries(2):
+                result = calculate_ovulation_timing_from_logs(self.user)
+
+            self.assertEqual(result, (12, 16))
@@ -1,8 +1,8 @@
 from django.test import TestCase
 from datetime import datetime, timedelta
 
-from cycle_core.models import CycleDetails, CycleWindow
-from cycle_core.services import PredictionBuilder
+from cycle_core.models import CycleDetails, CycleWindow, PredictedWindow
+from cycle_core.services import PredictionBuilder, generate_prediction_series
 
 
 class TestPredictionBuilder(TestCase):
@@ -52,7 +52,7 @@ class TestPredictionBuilder(TestCase):
         expected_ovulation_start = expected_menstruation_start + timedelta(days=CycleDetails.AVG_MIN_OVULATION_DAY)
         expected_ovulation_end = expected_menstruation_start + timedelta(days=CycleDetails.AVG_MAX_OVULATION_DAY)
 
-        self.assertIsInstance(cwp, CycleWindow)
+        self.assertIsInstance(cwp, PredictedWindow)
         self.assertEqual(cwp.menstruation_start, expected_menstruation_start)
         self.assertEqual(cwp.menstruation_end, expected_menstruation_end)
         self.assertEqual(cwp.min_ovulation_window, expected_ovulation_start)
@@ -73,5 +73,53 @@ class TestPredictionBuilder(TestCase):
             expected_start = predictions[i-1].menstruation_start + timedelta(days=self.avg_cycle_duration)
             self.assertEqual(predictions[i].menstruation_start, expected_start)
 
+    def test_fast_forward_matches_iterative_walk(self):
+        start = self.base_menstruation_date
+        for avg_cycle in (22, 28, 35, 44):
+            for days in (-10, 0, 1, avg_cycle - 1, avg_cycle, avg_cycle + 1, 2 * avg_cycle, 1000, 10000):
+                today = start + timedelta(days=days)
+
+                expected = start
+                while expected + timedelta(days=avg_cycle) < today:
+                    expected = expected + timedelta(days=avg_cycle)
+
+                self.assertEqual(PredictionBuilder.fastForward(start, avg_cycle, today), expected)
+
+    def test_generate_multiple_predictions_from_old_base_date(self):
+        old_cd = CycleDetails(base_menstruation_date=datetime(1980, 1, 1).date(), avg_cycle_duration=28, avg_menstruation_duration=5)
+        today = datetime(2025, 6, 15).date()
+
+        predictions = PredictionBuilder.generateMultiplePredictions(old_cd, 3, today=today)
+
+        self.assertGreaterEqual(predictions[0].menstruation_start, today)
+        self.assertLess(predictions[0].menstruation_start - timedelta(days=28), today)
+        self.assertEqual((predictions[0].menstruation_start - old_cd.base_menstruation_date).days % 28, 0)
+
+    def test_generate_prediction_series(self):
+        series = generate_prediction_series(self.base_menstruation_date, self.avg_cycle_duration, self.avg_menstruation_duration, 12)
+
+        current_start = self.base_menstruation_date
+        for i in range(12):
+            cwp = PredictionBuilder.generatePrediction(current_start, self.avg_cycle_duration, self.avg_menstruation_duration)
+            self.assertEqual(series['menstruation_start'][i], cwp.menstruation_start)
+            self.assertEqual(series['menstruation_end'][i], cwp.menstruation_end)
+            self.assertEqual(series['min_ovulation_window'][i], cwp.min_ovulation_window)
+            self.assertEqual(series['max_ovulation_window'][i], cwp.max_ovulation_window)
+            current_start = cwp.menstruation_start
+
+    def test_predicted_window_matches_cycle_window(self):
+        predicted = PredictionBuilder.generatePrediction(self.base_menstruation_date, self.avg_cycle_duration, self.avg_menstruation_duration)
+        cw = predicted.toCycleWindow()
+
+        self.assertIsInstance(cw, CycleWindow)
+        self.assertTrue(cw.is_prediction)
+        self.assertEqual(predicted.getMenstruationDatesAsList(), cw.getMenstruationDatesAsList())
+        self.assertEqual(predicted.getOvulationDatesAsList(), cw.getOvulationDatesAsList())
+        self.assertEqual(predicted.getPhasesBreakdown(), cw.getPhasesBreakdown())
+        self.assertEqual(str(predicted), str(cw))
+
+        with self.assertRaises(AttributeError):
+            predicted.user = None
+
 if __name__ == "__main__":
     TestCase.main()
@@ -0,0 +1,55 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from datetime import date, timedelta
+
+from cycle_core.models import CycleDetails, CycleWindow
+from cycle_core.prediction_cache import get_predictions
+
+User = get_user_model()
+
+
+class PredictionCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='pass')
+        self.cycle_details = CycleDetails.objects.create(user=self.user, base_menstruation_date=date.today() - timedelta(days=10))
+        # editing the details regenerates the predictions
+        self.cycle_details.save()
+
+    def _stored_predictions(self):
+        return [
+            (cw.menstruation_start, cw.min_ovulation_window)
+            for cw in CycleWindow.objects.filter(user=self.user, is_prediction=True).order_by('menstruation_start')
+        ]
+
+    def test_reads_are_cached(self):
+        predictions = get_predictions(self.user)
+        self.assertEqual(len(predictions), 3)
+        self.assertEqual([(p.menstruation_start, p.min_ovulation_window) for p in predictions], self._stored_predictions())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_predictions(self.user), predictions)
+
+    def test_regeneration_invalidates(self):
+        before = get_predictions(self.user)
+
+        start = date.today() - timedelta(days=3)
+        CycleWindow.objects.create(
+            user=self.user,
+            menstruation_start=start,
+            menstruation_end=start + timedelta(days=4),
+            min_ovulation_window=start + timedelta(days=12),
+            max_ovulation_window=start + timedelta(days=16),
+            is_prediction=False
+        )
+
+        after = get_predictions(self.user)
+        self.assertNotEqual(before, after)
+        self.assertEqual([(p.menstruation_start, p.min_ovulation_window) for p in after], self._stored_predictions())
+
+    def test_teardown_invalidates(self):
+        get_predictions(self.user)
+        self.cycle_details.delete()
+
+        self.assertEqual(get_predictions(self.user), [])
\ No newline at end of file
@@ -0,0 +1,105 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from datetime import date, timedelta
+
+from cycle_core.models import CycleDetails, CycleWindow, CycleStats, MIN_LOG_FOR_STATS
+from cycle_core.services import generate_prediction_based_on_log_count
+from cycle_core.stats_engine import CycleStatsEngine
+from log_core.models import DailyLog
+
+User = get_user_model()
+
+
+class CycleStatsEngineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='pass')
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date(2025, 1, 1))
+        self.base = date(2025, 1, 1)
+        # irregular cycles and durations so that the rolling window matters
+        self.cycle_lengths = [27, 30, 26, 31, 29, 28, 33, 25]
+        self.menstruation_lengths = [4, 5, 6, 5, 3, 5, 7, 4, 5]
+
+    def _create_window(self, start, menstruation_days=5):
+        return CycleWindow.objects.create(
+            user=self.user,
+            menstruation_start=start,
+            menstruation_end=start + timedelta(days=menstruation_days - 1),
+            min_ovulation_window=start + timedelta(days=12),
+            max_ovulation_window=start + timedelta(days=16),
+            is_prediction=False
+        )
+
+    def _create_history(self):
+        starts = [self.base]
+        for length in self.cycle_lengths:
+            starts.append(starts[-1] + timedelta(days=length))
+
+        for i, start in enumerate(starts):
+            DailyLog.objects.create(user=self.user, date=start + timedelta(days=13 + i % 3), ovulation_test='POSITIVE')
+
+        return [self._create_window(start, days) for start, days in zip(starts, self.menstruation_lengths)]
+
+    def _stats_snapshot(self):
+        stats = CycleStats.objects.get(user=self.user)
+        return (
+            stats.log_count,
+            stats.avg_cycle_duration,
+            stats.avg_menstruation_duration,
+            stats.avg_ovulation_start_day,
+            stats.avg_ovulation_end_day,
+        )
+
+    def _rebuilt_snapshot(self):
+        CycleStatsEngine(CycleStats.objects.get(user=self.user)).rebuild()
+        return self._stats_snapshot()
+
+    def test_incremental_matches_rebuild(self):
+        self._create_history()
+        incremental = self._stats_snapshot()
+
+        self.assertEqual(incremental[0], len(self.menstruation_lengths))
+        self.assertEqual(incremental, self._rebuilt_snapshot())
+
+    def test_rolling_averages_use_last_windows(self):
+        self._create_history()
+        stats = CycleStats.objects.get(user=self.user)
+
+        recent_cycles = self.cycle_lengths[-(MIN_LOG_FOR_STATS - 1):]
+        recent_menstruations = self.menstruation_lengths[-MIN_LOG_FOR_STATS:]
+        self.assertEqual(stats.avg_cycle_duration, round(sum(recent_cycles) / len(recent_cycles)))
+        self.assertEqual(stats.avg_menstruation_duration, round(sum(recent_menstruations) / len(recent_menstruations)))
+        self.assertEqual(len(stats.recent_windows), MIN_LOG_FOR_STATS)
+
+    def test_out_of_order_insert_and_delete_match_rebuild(self):
+        windows = self._create_history()
+
+        # deleting a tracked window in the middle and the newest window
+        windows[-3].delete()
+        self.assertEqual(self._stats_snapshot(), self._rebuilt_snapshot())
+        windows[-1].delete()
+        self.assertEqual(self._stats_snapshot(), self._rebuilt_snapshot())
+
+        # inserting a window older than every tracked one
+        self._create_window(self.base - timedelta(days=28))
+        self.assertEqual(self._stats_snapshot(), self._rebuilt_snapshot())
+
+    def test_single_prediction_regeneration_per_change(self):
+        self._create_history()
+
+        with patch('cycle_core.signals.generate_prediction_based_on_log_count', wraps=generate_prediction_based_on_log_count) as mock_generate:
+            window = self._create_window(self.base + timedelta(days=400))
+            self.assertEqual(mock_generate.call_count, 1)
+
+            window.delete()
+            self.assertEqual(mock_generate.call_count, 2)
+
+    def test_inconsistent_stats_are_rebuilt(self):
+        self._create_history()
+        # e.g. a restored backup overwriting log_count
+        CycleStats.objects.filter(user=self.user).update(log_count=40, recent_windows=[])
+
+        self._create_window(self.base + timedelta(days=400))
+        stats = CycleStats.objects.get(user=self.user)
+        self.assertEqual(stats.log_count, len(self.menstruation_lengths) + 1)
+        self.assertEqual(self._stats_snapshot(), self._rebuilt_snapshot())
\ No newline at end of file
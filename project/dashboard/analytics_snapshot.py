@@ -0,0 +1,94 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from job_core.services import enqueue_job_once
+from log_core.models import SymptomLog
+from .dashboard_analytics import get_intercourse_metrics_by_range, get_cycle_length_distribution
+from .models import UserAnalyticsSnapshot
+
+# The stats page payload (intercourse metrics of every range, cycle length distribution, top symptoms) is stored
+# per user in UserAnalyticsSnapshot, so the stats views read a single row. Changes to the user's logs and periods
+# bump the snapshot version (receivers in signals.py) and queue a refresh job, at most one pending per user:
+# bursts of changes are rebuilt once, by the workers. Reads serve the last snapshot, a stale one (changed since
+# it was built, or built on another day) queues the refresh too. Only a missing snapshot is built in the request.
+SNAPSHOT_FORMAT = 1  # bump when the payload changes shape, snapshots of older formats are rebuilt on read
+REFRESH_JOB = 'refresh_analytics'
+TOP_SYMPTOMS_LIMIT = 5
+
+
+def get_top_symptoms(user, limit=TOP_SYMPTOMS_LIMIT) -> list:
+    # untranslated names, translated when rendered
+    top_symptoms = SymptomLog.objects.filter(log__user=user)\
+        .values('symptom__name')\
+        .annotate(count=Count('id'))\
+        .order_by('-count')[:limit]
+    return [{'name': item['symptom__name'], 'count': item['count']} for item in top_symptoms]
+
+
+def build_stats_payload(user) -> dict:
+    return {
+        'format': SNAPSHOT_FORMAT,
+        # JSON object keys: the month ranges as strings
+        'intercourse_metrics': {str(month_range): metrics for month_range, metrics in get_intercourse_metrics_by_range(user).items()},
+        'cycle_length_distribution': get_cycle_length_distribution(user),
+        'top_symptoms': get_top_symptoms(user),
+    }
+
+
+def _is_current(snapshot, today) -> bool:
+    return (
+        snapshot.built_version == snapshot.version
+        and snapshot.built_on == today
+        and snapshot.payload.get('format') == SNAPSHOT_FORMAT
+    )
+
+
+def _rebuild(snapshot, today):
+    # changes committed while building bump version past built_version: the snapshot stays stale
+    built_version = snapshot.version
+    snapshot.payload = build_stats_payload(snapshot.user)
+    snapshot.built_version = built_version
+    snapshot.built_on = today
+    snapshot.save(update_fields=['payload', 'built_version', 'built_on', 'updated_at'])
+
+
+def refresh_analytics_snapshot(user, force=False) -> bool:
+    # Rebuilds the user's snapshot unless it is current (or force), True when rebuilt.
+    snapshot, _ = UserAnalyticsSnapshot.objects.get_or_create(user=user)
+    today = date.today()
+    if not force and _is_current(snapshot, today):
+        return False
+
+    _rebuild(snapshot, today)
+    return True
+
+
+def get_stats_snapshot(user) -> dict:
+    # The user's stats page payload, a single query while the snapshot is current.
+    today = date.today()
+    snapshot = UserAnalyticsSnapshot.objects.filter(user=user).first()
+    if snapshot is None or snapshot.payload.get('format') != SNAPSHOT_FORMAT:
+        # nothing to serve yet
+        snapshot = snapshot or UserAnalyticsSnapshot.objects.get_or_create(user=user)[0]
+        _rebuild(snapshot, today)
+    elif not _is_current(snapshot, today):
+        schedule_snapshot_refresh(user.id)
+    return snapshot.payload
+
+
+def schedule_snapshot_refresh(user_id):
+    enqueue_job_once(user_id, REFRESH_JOB)
+
+
+def mark_analytics_stale(user_id):
+    # Users without a snapshot (never opened the stats page) get theirs built on the first read.
+    if UserAnalyticsSnapshot.objects.filter(user_id=user_id).update(version=F('version') + 1):
+        transaction.on_commit(lambda: _schedule_after_commit(user_id))
+
+
+def _schedule_after_commit(user_id):
+    # the user (and the snapshot with it) may have been deleted since
+    if UserAnalyticsSnapshot.objects.filter(user_id=user_id).exists():
+        schedule_snapshot_refresh(user_id)
\ No newline at end of file
@@ -0,0 +1,384 @@
+import gzip
+import json
+import time
+import zlib
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from cycle_core.models import CycleDetails, CycleStats, CycleWindow
+from cycle_core.batching import deferred_cycle_updates
+from log_core.models import DailyLog, IntercourseLog, Symptom, Mood, Medication, SymptomLog, MoodLog, MedicationLog
+from log_core.catalog import get_names
+from log_core.search import index_notes, unindex_user_notes
+
+# Export and restore of a user's data (see dashboard.views.backup_data and restore_data).
+# The export reads rows with .iterator(chunk_size) and writes them as they come, so memory doesn't grow
+# with the history and the query count is bounded by the number of chunks.
+# The restore validates the whole file first, then writes every table with bulk_create.
+
+BACKUP_CHUNK_SIZE = 2000
+# size of the pieces handed to the StreamingHttpResponse
+BUFFER_SIZE = 64 * 1024
+
+BACKUP_FORMATS = ('json', 'ndjson')
+
+
+def _date(value):
+    return value.strftime('%Y-%m-%d') if value else None
+
+
+def _cycle_details(user):
+    cd = CycleDetails.objects.filter(user=user).first()
+    if not cd:
+        return {}
+    return {
+        'base_menstruation_date': _date(cd.base_menstruation_date),
+        'avg_cycle_duration': cd.avg_cycle_duration,
+        'avg_menstruation_duration': cd.avg_menstruation_duration
+    }
+
+
+def _cycle_stats(user):
+    cs = CycleStats.objects.filter(user=user).first()
+    if not cs:
+        return {}
+    return {
+        'avg_cycle_duration': cs.avg_cycle_duration,
+        'avg_menstruation_duration': cs.avg_menstruation_duration,
+        'avg_ovulation_start_day': cs.avg_ovulation_start_day,
+        'avg_ovulation_end_day': cs.avg_ovulation_end_day,
+        'log_count': cs.log_count
+    }
+
+
+def iter_cycle_windows(user, chunk_size=BACKUP_CHUNK_SIZE):
+    windows = CycleWindow.objects.filter(user=user).values_list(
+        'menstruation_start', 'menstruation_end', 'min_ovulation_window', 'max_ovulation_window', 'is_prediction'
+    ).iterator(chunk_size=chunk_size)
+
+    for men_start, men_end, ov_start, ov_end, is_prediction in windows:
+        yield {
+            'menstruation_start': _date(men_start),
+            'menstruation_end': _date(men_end),
+            'min_ovulation_window': _date(ov_start),
+            'max_ovulation_window': _date(ov_end),
+            'is_prediction': is_prediction
+        }
+
+
+def iter_daily_logs(user, chunk_size=BACKUP_CHUNK_SIZE, progress=None):
+    # Each chunk costs one query for the logs (with their IntercourseLog) and one per through table,
+    # the item names come from the log_core catalog cache.
+    # progress(done, total) is called once per chunk.
+    total = DailyLog.objects.filter(user=user).count() if progress else 0
+
+    logs = DailyLog.objects.filter(user=user).select_related('intercourse').prefetch_related(
+        Prefetch('symptoms', queryset=SymptomLog.objects.order_by('id').only('log_id', 'symptom_id')),
+        Prefetch('moods', queryset=MoodLog.objects.order_by('id').only('log_id', 'mood_id')),
+        Prefetch('medication', queryset=MedicationLog.objects.order_by('id').only('log_id', 'medication_id')),
+    ).iterator(chunk_size=chunk_size)
+
+    for done, log in enumerate(logs):
+        if progress and not done % chunk_size:
+            progress(done, total)
+
+        log_data = {
+            'date': _date(log.date),
+            'note': log.note,
+            'flow': log.flow,
+            'weight': log.weight,
+            'temperature': log.temperature,
+            'ovulation_test': log.ovulation_test,
+            'symptoms': get_names(Symptom, [s.symptom_id for s in log.symptoms.all()]),
+            'moods': get_names(Mood, [m.mood_id for m in log.moods.all()]),
+            'medications': get_names(Medication, [m.medication_id for m in log.medication.all()]),
+        }
+
+        il = getattr(log, 'intercourse', None)
+        if il:
+            log_data['intercourse'] = {
+                'protected': il.protected,
+                'orgasm': il.orgasm,
+                'quantity': il.quantity
+            }
+
+        yield log_data
+
+
+def _json_list(items):
+    # list items laid out as json.dumps(indent=4) does at the second level
+    first = True
+    for item in items:
+        yield ('\n        ' if first else ',\n        ') + json.dumps(item, indent=4).replace('\n', '\n        ')
+        first = False
+    yield ']' if first else '\n    ]'
+
+
+def iter_backup_json(user, progress=None):
+    # Same document as json.dumps(backup, indent=4), written incrementally.
+    yield '{\n    "cycle_details": ' + json.dumps(_cycle_details(user), indent=4).replace('\n', '\n    ')
+    yield ',\n    "cycle_stats": ' + json.dumps(_cycle_stats(user), indent=4).replace('\n', '\n    ')
+    yield ',\n    "cycle_windows": ['
+    yield from _json_list(iter_cycle_windows(user))
+    yield ',\n    "daily_logs": ['
+    yield from _json_list(iter_daily_logs(user, progress=progress))
+    yield '\n}'
+
+
+def iter_backup_ndjson(user, progress=None):
+    # One {"<section>": record} object per line.
+    yield json.dumps({'cycle_details': _cycle_details(user)}) + '\n'
+    yield json.dumps({'cycle_stats': _cycle_stats(user)}) + '\n'
+    for cw in iter_cycle_windows(user):
+        yield json.dumps({'cycle_window': cw}) + '\n'
+    for log in iter_daily_logs(user, progress=progress):
+        yield json.dumps({'daily_log': log}) + '\n'
+
+
+def iter_backup(user, backup_format='json', compress=False, progress=None):
+    iter_chunks = iter_backup_ndjson if backup_format == 'ndjson' else iter_backup_json
+    chunks = iter_chunks(user, progress=progress)
+
+    buffer, size = [], 0
+    compressor = zlib.compressobj(wbits=31) if compress else None  # gzip container
+
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= BUFFER_SIZE:
+            data = ''.join(buffer).encode()
+            buffer, size = [], 0
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+
+    data = ''.join(buffer).encode()
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    yield data
+
+
+def load_backup(backup_file) -> dict:
+    # Reads any format written by iter_backup back into the json layout.
+    raw = backup_file.read()
+    if raw[:2] == b'\x1f\x8b':
+        try:
+            raw = gzip.decompress(raw)
+        except (OSError, EOFError, zlib.error):
+            # truncated or corrupted upload
+            raise ValueError('invalid backup file')
+
+    text = raw.decode()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # not a single document: NDJSON
+        pass
+
+    data = {'cycle_details': {}, 'cycle_stats': {}, 'cycle_windows': [], 'daily_logs': []}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        # every line is a {section: record} object
+        if not isinstance(entry, dict) or len(entry) != 1:
+            raise ValueError('NDJSON lines must be single-key objects')
+        (section, record), = entry.items()
+        if section in ('cycle_window', 'daily_log'):
+            data[section + 's'].append(record)
+        else:
+            data[section] = record
+    return data
+
+
+def _parse_date(value, field, required=True):
+    if value is None and not required:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f'{field}: invalid date {value!r}')
+
+
+def _check_type(value, types, field, required=False):
+    if value is None and not required:
+        return None
+    # bools are ints in Python
+    if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+        raise ValueError(f'{field}: invalid value {value!r}')
+    return value
+
+
+def _check_choice(value, choices, field):
+    if value is not None and value not in [choice for choice, _ in choices]:
+        raise ValueError(f'{field}: invalid value {value!r}')
+    return value
+
+
+def _check_record(value, field):
+    if not isinstance(value, dict):
+        raise ValueError(f'{field}: not an object')
+    return value
+
+
+def _check_list(value, field):
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise ValueError(f'{field}: not a list')
+    return value
+
+
+def validate_backup(data) -> dict:
+    # Checks the whole backup before anything is written, raises ValueError naming the first bad field.
+    _check_record(data, 'backup')
+
+    cleaned = {'cycle_details': None, 'cycle_stats': None, 'cycle_windows': [], 'daily_logs': []}
+
+    cd_data = data.get('cycle_details')
+    if cd_data:
+        _check_record(cd_data, 'cycle_details')
+        cleaned['cycle_details'] = {
+            'base_menstruation_date': _parse_date(cd_data.get('base_menstruation_date'), 'cycle_details.base_menstruation_date'),
+            'avg_cycle_duration': _check_type(cd_data.get('avg_cycle_duration'), (int,), 'cycle_details.avg_cycle_duration', True),
+            'avg_menstruation_duration': _check_type(cd_data.get('avg_menstruation_duration'), (int,), 'cycle_details.avg_menstruation_duration', True),
+        }
+
+    cs_data = data.get('cycle_stats')
+    if cs_data:
+        _check_record(cs_data, 'cycle_stats')
+        cleaned['cycle_stats'] = {
+            field: _check_type(cs_data.get(field), (int,), f'cycle_stats.{field}', True)
+            for field in ('avg_cycle_duration', 'avg_menstruation_duration', 'avg_ovulation_start_day', 'avg_ovulation_end_day', 'log_count')
+        }
+
+    for i, cw_data in enumerate(_check_list(data.get('cycle_windows'), 'cycle_windows')):
+        field = f'cycle_windows[{i}]'
+        _check_record(cw_data, field)
+        cleaned['cycle_windows'].append({
+            'menstruation_start': _parse_date(cw_data.get('menstruation_start'), f'{field}.menstruation_start'),
+            'menstruation_end': _parse_date(cw_data.get('menstruation_end'), f'{field}.menstruation_end', required=False),
+            'min_ovulation_window': _parse_date(cw_data.get('min_ovulation_window'), f'{field}.min_ovulation_window'),
+            'max_ovulation_window': _parse_date(cw_data.get('max_ovulation_window'), f'{field}.max_ovulation_window'),
+            'is_prediction': _check_type(cw_data.get('is_prediction', False), (bool,), f'{field}.is_prediction', True),
+        })
+
+    log_dates = set()
+    for i, log_data in enumerate(_check_list(data.get('daily_logs'), 'daily_logs')):
+        field = f'daily_logs[{i}]'
+        _check_record(log_data, field)
+        log_date = _parse_date(log_data.get('date'), f'{field}.date')
+        # one log per day
+        if log_date in log_dates:
+            raise ValueError(f'{field}.date: duplicate date {log_date}')
+        log_dates.add(log_date)
+
+        il_data = log_data.get('intercourse')
+        if il_data:
+            _check_record(il_data, f'{field}.intercourse')
+        cleaned['daily_logs'].append({
+            'date': log_date,
+            'note': _check_type(log_data.get('note'), (str,), f'{field}.note'),
+            'flow': _check_choice(log_data.get('flow'), DailyLog.FLOW_CHOICES, f'{field}.flow'),
+            'weight': _check_type(log_data.get('weight'), (int, float), f'{field}.weight'),
+            'temperature': _check_type(log_data.get('temperature'), (int, float), f'{field}.temperature'),
+            'ovulation_test': _check_choice(log_data.get('ovulation_test'), DailyLog.OVULATION_TEST_CHOICES, f'{field}.ovulation_test'),
+            'symptoms': [_check_type(name, (str,), f'{field}.symptoms', True) for name in _check_list(log_data.get('symptoms'), f'{field}.symptoms')],
+            'moods': [_check_type(name, (str,), f'{field}.moods', True) for name in _check_list(log_data.get('moods'), f'{field}.moods')],
+            'medications': [_check_type(name, (str,), f'{field}.medications', True) for name in _check_list(log_data.get('medications'), f'{field}.medications')],
+            'intercourse': {
+                'protected': _check_type(il_data.get('protected'), (bool,), f'{field}.intercourse.protected'),
+                'orgasm': _check_type(il_data.get('orgasm'), (bool,), f'{field}.intercourse.orgasm'),
+                'quantity': _check_type(il_data.get('quantity'), (int,), f'{field}.intercourse.quantity'),
+            } if il_data else None,
+        })
+
+    return cleaned
+
+
+def _resolve_catalog(model, logs, key) -> dict[str, int]:
+    # one query per catalog, unknown names are dropped like before
+    names = {name for log in logs for name in log[key]}
+    if not names:
+        return {}
+    return dict(model.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+# progress is only visible outside the restore transaction: catalogs resolved, rows written
+RESTORE_STEPS = 2
+
+
+def restore_backup(user, data, batch_size=BACKUP_CHUNK_SIZE, progress=None) -> dict:
+    # Replaces the user's data with a validated backup (see validate_backup).
+    # Stats, predictions and the calendar index are refreshed once, when the transaction commits.
+    # progress(done, total, message) is called after each step (RESTORE_STEPS).
+    progress = progress or (lambda done, total, message='': None)
+    started = time.perf_counter()
+    logs = data['daily_logs']
+
+    symptom_ids = _resolve_catalog(Symptom, logs, 'symptoms')
+    mood_ids = _resolve_catalog(Mood, logs, 'moods')
+    medication_ids = _resolve_catalog(Medication, logs, 'medications')
+    progress(1, RESTORE_STEPS, 'catalogs')
+
+    counts = {}
+    with transaction.atomic(), deferred_cycle_updates(user):
+        # Delete existing data to prevent duplicates/conflicts (Cascade will handle logs-intercourse relationship)
+        CycleWindow.objects.filter(user=user).delete()
+        unindex_user_notes(user.id)
+        DailyLog.objects.filter(user=user).delete()
+
+        if data['cycle_details']:
+            CycleDetails.objects.update_or_create(user=user, defaults=data['cycle_details'])
+        if data['cycle_stats']:
+            CycleStats.objects.update_or_create(user=user, defaults=data['cycle_stats'])
+
+        windows = CycleWindow.objects.bulk_create(
+            [CycleWindow(user=user, **cw_data) for cw_data in data['cycle_windows']],
+            batch_size=batch_size
+        )
+
+        daily_logs = DailyLog.objects.bulk_create([
+            DailyLog(
+                user=user,
+                date=log_data['date'],
+                note=log_data['note'],
+                flow=log_data['flow'],
+                weight=log_data['weight'],
+                temperature=log_data['temperature'],
+                ovulation_test=log_data['ovulation_test']
+            )
+            for log_data in logs
+        ], batch_size=batch_size)
+
+        symptom_logs, mood_logs, medication_logs, intercourse_logs = [], [], [], []
+        # bulk_create sets the primary keys, in input order
+        for daily_log, log_data in zip(daily_logs, logs):
+            # dict.fromkeys: duplicated names would break the unique constraints
+            symptom_logs += [SymptomLog(log=daily_log, symptom_id=symptom_ids[name]) for name in dict.fromkeys(log_data['symptoms']) if name in symptom_ids]
+            mood_logs += [MoodLog(log=daily_log, mood_id=mood_ids[name]) for name in dict.fromkeys(log_data['moods']) if name in mood_ids]
+            medication_logs += [MedicationLog(log=daily_log, medication_id=medication_ids[name]) for name in dict.fromkeys(log_data['medications']) if name in medication_ids]
+            if log_data['intercourse']:
+                intercourse_logs.append(IntercourseLog(log=daily_log, **log_data['intercourse']))
+
+        SymptomLog.objects.bulk_create(symptom_logs, batch_size=batch_size)
+        MoodLog.objects.bulk_create(mood_logs, batch_size=batch_size)
+        MedicationLog.objects.bulk_create(medication_logs, batch_size=batch_size)
+        IntercourseLog.objects.bulk_create(intercourse_logs, batch_size=batch_size)
+        # bulk_create skips the receivers keeping the note search index in sync
+        index_notes(daily_logs)
+
+        counts = {
+            'cycle_windows': len(windows),
+            'daily_logs': len(daily_logs),
+            'symptoms': len(symptom_logs),
+            'moods': len(mood_logs),
+            'medications': len(medication_logs),
+            'intercourse': len(intercourse_logs),
+        }
+
+    progress(RESTORE_STEPS, RESTORE_STEPS, 'done')
+    counts['seconds'] = round(time.perf_counter() - started, 3)
+    return counts
\ No newline at end of file
@@ -1,107 +1,137 @@
-from django.db.models import Sum
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum, Count, Q
 
 from datetime import date
 from dateutil import relativedelta
+from itertools import pairwise
+import statistics
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from log_core.models import IntercourseLog
 from cycle_core.models import CycleWindow
 from collections import Counter
 
+# The distribution only depends on the logged period starts: it is cached per user until the next period
+# edit (the CycleWindow receivers in signals.py, or the end of a deferred_cycle_updates scope).
+CYCLE_LENGTH_CACHE_TIMEOUT = 60 * 60 * 24
+CYCLE_LENGTH_PERCENTILES = (10, 25, 50, 75, 90)
+
+def _cycle_length_key(user_id):
+    return f'dashboard:cycle_length_distribution:{user_id}'
+
+def invalidate_cycle_length_distribution(user_id):
+    cache.delete(_cycle_length_key(user_id))
+    # a concurrent read may cache the pre-commit windows
+    transaction.on_commit(lambda: cache.delete(_cycle_length_key(user_id)))
+
+def _cycle_lengths(starts):
+    # days between consecutive menstruation starts, unrealistic values (e.g. a missing log) left out
+    if numpy is not None:
+        deltas = numpy.diff(numpy.array(starts, dtype='datetime64[D]')).astype(int).tolist()
+    else:
+        deltas = [(b - a).days for a, b in pairwise(starts)]
+    return [delta for delta in deltas if 15 < delta < 60]
+
+def _percentiles(lengths):
+    if numpy is not None:
+        values = numpy.percentile(lengths, CYCLE_LENGTH_PERCENTILES).tolist()
+    elif len(lengths) == 1:
+        values = lengths * len(CYCLE_LENGTH_PERCENTILES)
+    else:
+        # inclusive is numpy's default (linear) interpolation
+        quantiles = statistics.quantiles(lengths, n=100, method='inclusive')
+        values = [quantiles[p - 1] for p in CYCLE_LENGTH_PERCENTILES]
+    return {f'p{p}': round(value, 1) for p, value in zip(CYCLE_LENGTH_PERCENTILES, values)}
+
 def get_cycle_length_distribution(user):
     # Calculates the distribution of cycle lengths for historical data.
-    
-    windows = CycleWindow.objects.filter(
-        user=user, 
-        is_prediction=False
-    ).order_by('menstruation_start')
-
-    if windows.count() < 2:
-        return {'labels': [], 'data': []}
-
-    cycle_lengths = []
-    
-    # Calculate lengths between consecutive menstruation starts
-    for i in range(len(windows) - 1):
-        delta = (windows[i+1].menstruation_start - windows[i].menstruation_start).days
-        # Filter out unrealistic values if necessary (e.g., < 15 or > 60)
-        if 15 < delta < 60:
-            cycle_lengths.append(delta)
-
-    if not cycle_lengths:
-        return {'labels': [], 'data': []}
-
-    # Count frequencies
-    counts = Counter(cycle_lengths)
-    
-    # Sort by length for the x-axis
-    sorted_lengths = sorted(counts.keys())
-    
+    key = _cycle_length_key(user.id)
+    distribution = cache.get(key)
+    if distribution is not None:
+        return distribution
+
+    starts = list(
+        CycleWindow.objects.filter(user=user, is_prediction=False)
+        .order_by('menstruation_start')
+        .values_list('menstruation_start', flat=True)
+    )
+    lengths = _cycle_lengths(starts)
+
+    if not lengths:
+        distribution = {'labels': [], 'data': [], 'percentiles': {}, 'stddev': None}
+    else:
+        # Count frequencies, sorted by length for the x-axis
+        counts = Counter(lengths)
+        sorted_lengths = sorted(counts.keys())
+
+        distribution = {
+            'labels': [str(l) for l in sorted_lengths],
+            'data': [counts[l] for l in sorted_lengths],
+            'percentiles': _percentiles(lengths),
+            'stddev': round(statistics.pstdev(lengths), 1)
+        }
+
+    cache.set(key, distribution, CYCLE_LENGTH_CACHE_TIMEOUT)
+    return distribution
+
+# Month ranges offered by the activity/frequency dropdowns of the stats page
+MONTH_RANGES = (1, 3, 6, 12)
+
+def _intercourse_aggregates(start_date, suffix):
+    # Every intercourse metric of the logs from start_date on, as conditional aggregates of a single query
+    in_range = Q(log__date__gte=start_date)
     return {
-        'labels': [str(l) for l in sorted_lengths],
-        'data': [counts[l] for l in sorted_lengths]
+        f'intercourse_count{suffix}': Sum('quantity', filter=in_range),
+        f'total_with_quantity{suffix}': Count('pk', filter=in_range & Q(quantity__isnull=False)),
+        f'orgasm_count{suffix}': Count('pk', filter=in_range & Q(orgasm=True)),
+        f'protected_count{suffix}': Count('pk', filter=in_range & Q(protected=True)),
+        f'unprotected_count{suffix}': Count('pk', filter=in_range & Q(protected=False)),
+        f'days_with_intercourse{suffix}': Count('log__date', filter=in_range, distinct=True),
+        f'days_with_orgasm{suffix}': Count('log__date', filter=in_range & Q(orgasm=True), distinct=True),
     }
 
-def get_intercourse_activity_metrics(user, end_date=date.today(), month_range=1):
-    start_date = end_date - relativedelta.relativedelta(months=month_range)
-
-    intercourse_count = IntercourseLog.objects.filter(
-        log__user=user,
-        log__date__range=[start_date,end_date]
-    ).aggregate(total_sum=Sum('quantity'))['total_sum'] or 0
-
-
-    total_with_quantity = IntercourseLog.objects.filter(
-        log__user=user,
-        log__date__range=[start_date, end_date],
-        quantity__isnull=False
-    ).count()
-
-    orgasm_count = IntercourseLog.objects.filter(
-        log__user=user,
-        log__date__range=[start_date, end_date],
-        orgasm=True
-    ).count()
-
-    orgasm_percentage = (orgasm_count/total_with_quantity) * 100 if total_with_quantity > 0 else None
-
-    protected_count = IntercourseLog.objects.filter(
-        log__user=user,
-        log__date__range=[start_date, end_date],
-        protected=True
-    ).count()
-
-    unprotected_count = IntercourseLog.objects.filter(
-        log__user=user,
-        log__date__range=[start_date, end_date],
-        protected=False
-    ).count()
-
-    return {
-        'intercourse_count': intercourse_count,
-        'orgasm_percentage': orgasm_percentage,
-        'protected_count': protected_count,
-        'unprotected_count': unprotected_count
+def get_intercourse_metrics_by_range(user, end_date=None, month_ranges=MONTH_RANGES):
+    # Activity and frequency metrics of each month range ending at end_date, in one query:
+    # {month_range: metrics}
+    end_date = end_date or date.today()
+    start_dates = {
+        month_range: end_date - relativedelta.relativedelta(months=month_range)
+        for month_range in month_ranges
     }
 
-def get_intercourse_frequency_metrics(user, end_date=date.today(), month_range=1):
-    start_date = end_date - relativedelta.relativedelta(months=month_range)
-
-    total_days = (end_date - start_date).days
+    aggregates = {}
+    for month_range, start_date in start_dates.items():
+        aggregates.update(_intercourse_aggregates(start_date, f'_{month_range}'))
 
-    days_with_intercourse = IntercourseLog.objects.filter(
+    totals = IntercourseLog.objects.filter(
         log__user=user,
-        log__date__range=[start_date, end_date],
-    ).values('log__date').distinct().count()
-
-    days_with_orgasm = IntercourseLog.objects.filter(
-        log__user=user,
-        log__date__range=[start_date, end_date]
-    ).values('log__date').distinct().count()
-
-    frequency_intercourse = total_days / days_with_intercourse if days_with_intercourse > 0 else None
-    frequency_orgasm = total_days / days_with_orgasm if days_with_orgasm > 0 else None
-
-    return {
-        'frequency_intercourse': round(frequency_intercourse, 1) if frequency_intercourse else None,
-        'frequency_orgasm': round(frequency_orgasm, 1) if frequency_orgasm else None
-    }
\ No newline at end of file
+        log__date__range=[min(start_dates.values()), end_date]
+    ).aggregate(**aggregates)
+
+    metrics = {}
+    for month_range, start_date in start_dates.items():
+        row = {key[:-len(f'_{month_range}')]: value for key, value in totals.items() if key.endswith(f'_{month_range}')}
+        total_days = (end_date - start_date).days
+
+        orgasm_percentage = (row['orgasm_count']/row['total_with_quantity']) * 100 if row['total_with_quantity'] > 0 else None
+        frequency_intercourse = total_days / row['days_with_intercourse'] if row['days_with_intercourse'] > 0 else None
+        frequency_orgasm = total_days / row['days_with_orgasm'] if row['days_with_orgasm'] > 0 else None
+
+        metrics[month_range] = {
+            'intercourse_count': row['intercourse_count'] or 0,
+            'orgasm_percentage': orgasm_percentage,
+            'protected_count': row['protected_count'],
+            'unprotected_count': row['unprotected_count'],
+            'frequency_intercourse': round(frequency_intercourse, 1) if frequency_intercourse else None,
+            'frequency_orgasm': round(frequency_orgasm, 1) if frequency_orgasm else None
+        }
+
+    return metrics
+
+def get_intercourse_metrics(user, end_date=None, month_range=1):
+    return get_intercourse_metrics_by_range(user, end_date, [month_range])[month_range]
\ No newline at end of file
@@ -0,0 +1,28 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from dashboard.analytics_snapshot import refresh_analytics_snapshot
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the stats page snapshots of the configured users, for backfills or after a payload format change."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', default=None,
+                            help="Only rebuild the snapshot of this user, can be repeated.")
+        parser.add_argument('--stale-only', action='store_true',
+                            help="Leave the snapshots that are already current.")
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.filter(userprofile__is_configured=True).order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        started = time.perf_counter()
+        rebuilt = sum(
+            refresh_analytics_snapshot(user, force=not options['stale_only'])
+            for user in users.iterator()
+        )
+        self.stdout.write(f'{rebuilt} analytics snapshots rebuilt in {time.perf_counter() - started:.2f}s')
\ No newline at end of file
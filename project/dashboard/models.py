@@ -0,0 +1,17 @@
+from django.db import models
+from django.conf import settings
+
+
+class UserAnalyticsSnapshot(models.Model):
+    # Precomputed stats page payload (dashboard.analytics_snapshot). version is bumped by every change to the
+    # user's data, the payload is current while built_version matches it.
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='analytics_snapshot')
+    version = models.PositiveIntegerField(default=0)
+    built_version = models.PositiveIntegerField(blank=True, null=True)
+    # the intercourse metrics are relative to the build date
+    built_on = models.DateField(blank=True, null=True)
+    payload = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} - v{self.version}"
\ No newline at end of file
@@ -5,7 +5,11 @@ from django.db import transaction
 
 from cycle_core.models import CycleWindow, CycleStats, CycleDetails, MIN_LOG_FOR_STATS
 
-from cycle_core.services import PredictionBuilder, update_cycle_stats
+from cycle_core.services import PredictionBuilder
+from cycle_core.batching import deferred_cycle_updates
+from cycle_core.prediction_cache import get_predictions
+from log_core.models import DailyLog
+from log_core.search import unindex_user_notes
 from calendar_core.services import render_multiple_calendars, CalendarType
 from datetime import timedelta, datetime, date
 from dateutil import relativedelta
@@ -57,10 +61,11 @@ def configured_required(view_func):
     return _wrapped_view
 
 def fetch_closest_prediction(user):
-    prediction = CycleWindow.objects.filter(user=user, is_prediction=True).order_by('menstruation_start').first()
-    return prediction
+    predictions = get_predictions(user)
+    return predictions[0] if predictions else None
 
-def render_selectable_calendars(user, date):
+def get_selectable_months(date):
+    # the months shown by the period editor around a reference date
     date_start = date.replace(day=1)
     one_month_ago = date_start - relativedelta.relativedelta(months=1)
     two_months_ago = date_start - relativedelta.relativedelta(months=2)
@@ -77,6 +82,11 @@ def render_selectable_calendars(user, date):
     rendered_month_start = two_months_ago
     rendered_month_end = (one_month_fwd + relativedelta.relativedelta(months=1)) - timedelta(days=1)
 
+    return rendered_months, rendered_month_start, rendered_month_end
+
+def render_selectable_calendars(user, date):
+    rendered_months, rendered_month_start, rendered_month_end = get_selectable_months(date)
+
     rendered_menstruation_windows = get_visible_windows(user, rendered_month_start, rendered_month_end)
 
     return {
@@ -221,25 +231,18 @@ def apply_period_windows(user, selected_ranges, visible_start, visible_end, mont
     deleted_count = 0
     created_objs = []
 
-    if existing_ids_to_delete:
-        deleted_count = CycleWindow.objects.filter(id__in=existing_ids_to_delete).delete()[0]
-
-    objs_to_create = []
-    for s, e in create_ranges:
-        objs_to_create.append(create_cycle_window(user, s, e))
+    # bulk_create doesn't trigger post_save signals and the deletes would refresh the stats once per row:
+    # CycleStats and predictions are refreshed once, when the transaction commits.
+    with deferred_cycle_updates(user):
+        if existing_ids_to_delete:
+            deleted_count = CycleWindow.objects.filter(id__in=existing_ids_to_delete).delete()[0]
 
-    if objs_to_create:
-        created_objs = CycleWindow.objects.bulk_create(objs_to_create)
+        objs_to_create = []
+        for s, e in create_ranges:
+            objs_to_create.append(create_cycle_window(user, s, e))
 
-    # Manually update CycleStats since bulk_create doesn't trigger post_save signals
-    try:
-        stats = CycleStats.objects.get(user=user)
-        stats.log_count = CycleWindow.objects.filter(user=user, is_prediction=False).count()
-        stats.save()
-        # Update avg durations if we have enough logs
-        update_cycle_stats(stats)
-    except CycleStats.DoesNotExist:
-        pass
+        if objs_to_create:
+            created_objs = CycleWindow.objects.bulk_create(objs_to_create)
 
     return {
         "deleted_count": deleted_count,
@@ -250,6 +253,21 @@ def apply_period_windows(user, selected_ranges, visible_start, visible_end, mont
     }
 
 
+def reset_user_data(user):
+    with transaction.atomic(), deferred_cycle_updates(user):
+        # Delete all cycle-related data
+        CycleWindow.objects.filter(user=user).delete()
+        unindex_user_notes(user.id)
+        DailyLog.objects.filter(user=user).delete()
+        CycleDetails.objects.filter(user=user).delete()
+        CycleStats.objects.filter(user=user).delete()
+
+        # Reset configuration status
+        profile = user.userprofile
+        profile.is_configured = False
+        profile.save()
+
+
 def get_current_cycle(user):
     # returns the most recent non-prediction cycle.
     current_cycle = CycleWindow.objects.filter(
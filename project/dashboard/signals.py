@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from cycle_core.models import CycleWindow
+from cycle_core.batching import is_deferred, cycle_data_bulk_changed
+from log_core.models import DailyLog, IntercourseLog, SymptomLog
+from .dashboard_analytics import invalidate_cycle_length_distribution
+from .analytics_snapshot import mark_analytics_stale
+
+# Bulk mutations (deferred_cycle_updates) invalidate once, at the end of the scope.
+
+@receiver(post_save, sender=CycleWindow)
+@receiver(post_delete, sender=CycleWindow)
+def clearCycleLengthDistribution(sender, instance, **kwargs):
+    if instance.is_prediction or is_deferred(instance.user_id):
+        return
+    invalidate_cycle_length_distribution(instance.user_id)
+
+
+def _snapshot_user_id(instance):
+    if isinstance(instance, IntercourseLog):
+        return instance.log.user_id
+    if isinstance(instance, CycleWindow) and instance.is_prediction:
+        return None
+    return instance.user_id
+
+@receiver(post_save, sender=DailyLog)
+@receiver(post_save, sender=IntercourseLog)
+@receiver(post_save, sender=CycleWindow)
+@receiver(post_delete, sender=DailyLog)
+@receiver(post_delete, sender=IntercourseLog)
+@receiver(post_delete, sender=CycleWindow)
+def markAnalyticsSnapshotStale(sender, instance, origin=None, **kwargs):
+    # the user is being deleted (the snapshot goes with it), or the log holding this row: marked once by the log
+    if isinstance(origin, get_user_model()) or (sender is IntercourseLog and isinstance(origin, DailyLog)):
+        return
+
+    user_id = _snapshot_user_id(instance)
+    if user_id and not is_deferred(user_id):
+        mark_analytics_stale(user_id)
+
+@receiver(m2m_changed, sender=SymptomLog)
+def markAnalyticsSnapshotStaleOnSymptoms(sender, instance, action, reverse, **kwargs):
+    # top symptoms, logs edited from the symptom side are left to the next rebuild
+    if reverse or action not in ('post_add', 'post_remove', 'post_clear') or is_deferred(instance.user_id):
+        return
+    mark_analytics_stale(instance.user_id)
+
+@receiver(cycle_data_bulk_changed)
+def clearAnalyticsAfterBulkChange(sender, user_id, **kwargs):
+    invalidate_cycle_length_distribution(user_id)
+    mark_analytics_stale(user_id)
\ No newline at end of file
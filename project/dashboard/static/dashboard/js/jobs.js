@@ -0,0 +1,27 @@
+document.addEventListener('DOMContentLoaded', function () {
+    // Polls the background jobs listed on the settings page (backups, restores, resets)
+    // and reloads the page once one of them finishes, to show its outcome.
+    const POLL_INTERVAL = 2000;
+    const pending = Array.from(document.querySelectorAll('.job-item')).filter(
+        (item) => item.dataset.status === 'PENDING' || item.dataset.status === 'RUNNING',
+    );
+
+    function poll(item) {
+        fetch(item.dataset.pollUrl)
+            .then((response) => response.json())
+            .then((job) => {
+                if (job.status === 'DONE' || job.status === 'FAILED') {
+                    window.location.reload();
+                    return;
+                }
+                const progress = item.querySelector('.job-progress');
+                if (progress) {
+                    progress.textContent = `${job.progress}%`;
+                }
+                setTimeout(() => poll(item), POLL_INTERVAL);
+            })
+            .catch(() => setTimeout(() => poll(item), POLL_INTERVAL));
+    }
+
+    pending.forEach((item) => setTimeout(() => poll(item), POLL_INTERVAL));
+});
\ No newline at end of file
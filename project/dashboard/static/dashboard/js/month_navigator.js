@@ -16,33 +16,87 @@ document.addEventListener('DOMContentLoaded', () => {
         document.dispatchEvent(new Event('calendars-updated'));
     }
 
+    function setRenderedRange(data) {
+        window.referenceMonth = data.reference_month;
+        document.getElementById('reference_month').value = data.reference_month;
+        document.getElementById('mo_start').value = data.rendered_month_start;
+        document.getElementById('mo_end').value = data.rendered_month_end;
+    }
+
+    function shiftMonth(referenceMonth, buttonType) {
+        const [year, month] = referenceMonth.split('-').map(Number);
+        // month is 1-based, Date months are 0-based
+        const shifted = new Date(
+            Date.UTC(year, month - 1 + (buttonType === 'next_btn' ? 1 : -1), 1),
+        );
+        return shifted.toISOString().slice(0, 10);
+    }
+
+    // Data mode: day-state bitmaps rendered here, the browser revalidates them with the ETag.
+    function navigateWithData(buttonType) {
+        const referenceMonth = shiftMonth(window.referenceMonth, buttonType);
+        return fetch(
+            `/dashboard/ajax/calendar-data/?reference_month=${referenceMonth}`,
+            {
+                cache: 'no-cache',
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+            },
+        )
+            .then((response) => {
+                if (!response.ok) {
+                    throw new Error(response.status);
+                }
+                return response.json();
+            })
+            .then((data) => {
+                setRenderedRange(data);
+                window.selectedDates = data.months.flatMap(
+                    window.selectedDatesOfMonth,
+                );
+                setNewCalendars(
+                    data.months.map((month) =>
+                        window.renderSelectableMonth(
+                            month,
+                            data.weekdays,
+                            data.today,
+                        ),
+                    ),
+                );
+            });
+    }
+
+    // HTML mode: calendars rendered by the server.
+    function navigateWithHtml(buttonType) {
+        return fetch('/dashboard/ajax/navigate-calendar/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrftoken,
+                'X-Requested-With': 'XMLHttpRequest',
+            },
+            body: JSON.stringify({
+                reference_month: window.referenceMonth,
+                button_type: buttonType,
+            }),
+        })
+            .then((response) => response.json())
+            .then((data) => {
+                setRenderedRange(data);
+                window.selectedDates = data.selected_dates;
+                setNewCalendars(data.calendars);
+            });
+    }
+
     buttonInputs.forEach((button) => {
         button.addEventListener('click', () => {
-            buttonType = button.id;
-            fetch('/dashboard/ajax/navigate-calendar/', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'X-CSRFToken': csrftoken,
-                    'X-Requested-With': 'XMLHttpRequest',
-                },
-                body: JSON.stringify({
-                    reference_month: window.referenceMonth,
-                    button_type: buttonType,
-                }),
-            })
-                .then((response) => response.json())
-                .then((data) => {
-                    window.referenceMonth = data.reference_month;
-                    window.selectedDates = data.selected_dates;
-                    setNewCalendars(data.calendars);
-                    document.getElementById('reference_month').value =
-                        data.reference_month;
-                    document.getElementById('mo_start').value =
-                        data.rendered_month_start;
-                    document.getElementById('mo_end').value =
-                        data.rendered_month_end;
-                });
+            const buttonType = button.id;
+            if (window.renderSelectableMonth) {
+                navigateWithData(buttonType).catch(() =>
+                    navigateWithHtml(buttonType),
+                );
+            } else {
+                navigateWithHtml(buttonType);
+            }
         });
     });
 });
@@ -6,10 +6,18 @@ document.addEventListener('DOMContentLoaded', function () {
         'frequency-range-dropdown',
     );
 
-    activity_dropdown.addEventListener('change', function () {
-        const monthRange = this.value;
+    // metrics of every dropdown range, rendered with the page
+    const metricsElement = document.getElementById('intercourse-metrics');
+    const intercourseMetrics = metricsElement
+        ? JSON.parse(metricsElement.textContent)
+        : {};
+
+    function loadMetrics(monthRange, type) {
+        if (intercourseMetrics[monthRange]) {
+            return Promise.resolve(intercourseMetrics[monthRange]);
+        }
 
-        fetch('/dashboard/ajax/load-stats', {
+        return fetch('/dashboard/ajax/load-stats', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -19,47 +27,35 @@ document.addEventListener('DOMContentLoaded', function () {
             },
             body: JSON.stringify({
                 month_range: monthRange,
-                type: 'activity_dropdown',
+                type: type,
             }),
-        })
-            .then((response) => response.json())
-            .then((data) => {
-                document.getElementById('intercourse-count').textContent =
-                    data.intercourse_count;
-                document.getElementById('orgasm-percentage').textContent =
-                    data.orgasm_percentage
-                        ? data.orgasm_percentage.toFixed(1)
-                        : '0';
-                document.getElementById('protected-count').textContent =
-                    data.protected_count;
-                document.getElementById('unprotected-count').textContent =
-                    data.unprotected_count;
-            });
+        }).then((response) => response.json());
+    }
+
+    activity_dropdown.addEventListener('change', function () {
+        loadMetrics(this.value, 'activity_dropdown').then((data) => {
+            document.getElementById('intercourse-count').textContent =
+                data.intercourse_count;
+            document.getElementById('orgasm-percentage').textContent =
+                data.orgasm_percentage
+                    ? data.orgasm_percentage.toFixed(1)
+                    : '0';
+            document.getElementById('protected-count').textContent =
+                data.protected_count;
+            document.getElementById('unprotected-count').textContent =
+                data.unprotected_count;
+        });
     });
 
     frequency_dropdown.addEventListener('change', function () {
-        const monthRange = this.value;
-
-        fetch('/dashboard/ajax/load-stats', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'X-CSRFToken': document.querySelector(
-                    '[name=csrfmiddlewaretoken]',
-                ).value,
-            },
-            body: JSON.stringify({
-                month_range: monthRange,
-                type: 'frequency_dropdown',
-            }),
-        })
-            .then((response) => response.json())
-            .then((data) => {
-                document.getElementById('frequency-intercourse').textContent =
-                    data.frequency_intercourse.toFixed(1);
-                document.getElementById('frequency-orgasm').textContent =
-                    data.frequency_orgasm.toFixed(1);
-            });
+        loadMetrics(this.value, 'frequency_dropdown').then((data) => {
+            document.getElementById('frequency-intercourse').textContent =
+                data.frequency_intercourse
+                    ? data.frequency_intercourse.toFixed(1)
+                    : '—';
+            document.getElementById('frequency-orgasm').textContent =
+                data.frequency_orgasm ? data.frequency_orgasm.toFixed(1) : '—';
+        });
     });
 
     // --- Search & Analysis Logic ---
@@ -78,35 +74,47 @@ document.addEventListener('DOMContentLoaded', function () {
     const resultsList = document.getElementById('search-results-list');
 
     const noResultsText = container.dataset.noResultsText || 'No matches found';
+    const searchMoreBtn = document.getElementById('search-more-btn');
+    let searchQuery = '';
+    let searchCursor = null;
 
-    searchBtn.addEventListener('click', () => {
-        const query = searchInput.value;
-        if (!query) return;
-
+    // snippets are escaped server-side, only the <mark> highlights are markup
+    function searchLogs(cursor) {
         fetch(searchUrl, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
                 'X-CSRFToken': csrfToken,
             },
-            body: JSON.stringify({ query: query }),
+            body: JSON.stringify({ query: searchQuery, cursor: cursor }),
         })
             .then((res) => res.json())
             .then((data) => {
-                resultsList.innerHTML = '';
+                if (!cursor) resultsList.innerHTML = '';
                 resultsContainer.classList.remove('hidden');
-                if (data.results.length === 0) {
+                if (!cursor && data.results.length === 0) {
                     resultsList.innerHTML = `<li>${noResultsText}</li>`;
                 } else {
                     data.results.forEach((log) => {
                         const li = document.createElement('li');
-                        li.innerHTML = `<a href="/dashboard/calendar/?date=${log.date}"><span>${log.date}</span></a> <span>${log.note}</span>`;
+                        li.innerHTML = `<a href="/dashboard/calendar/?date=${log.date}"><span>${log.date}</span></a> <span>${log.snippet}</span>`;
                         resultsList.appendChild(li);
                     });
                 }
+
+                searchCursor = data.next_cursor;
+                searchMoreBtn.classList.toggle('hidden', !searchCursor);
             });
+    }
+
+    searchBtn.addEventListener('click', () => {
+        searchQuery = searchInput.value;
+        if (!searchQuery) return;
+        searchLogs(null);
     });
 
+    searchMoreBtn.addEventListener('click', () => searchLogs(searchCursor));
+
     // 2. Analysis Items
     let allItems = {};
     let selectedItems = new Set(); // Stores item names for current tab
@@ -0,0 +1,113 @@
+from io import StringIO
+from unittest.mock import patch
+from django.test import TestCase
+from django.urls import reverse
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from datetime import date, timedelta
+
+from cycle_core.models import CycleDetails, CycleWindow
+from log_core.models import DailyLog, IntercourseLog, Symptom
+from job_core.models import Job
+from job_core.services import claim_next_job, run_job
+from dashboard.models import UserAnalyticsSnapshot
+from dashboard.analytics_snapshot import REFRESH_JOB, get_stats_snapshot
+
+User = get_user_model()
+
+
+class AnalyticsSnapshotTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='pass', email='testuser@test.com')
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date.today() - timedelta(days=10))
+        profile = self.user.userprofile
+        profile.is_configured = True
+        profile.save()
+
+        self.headache = Symptom.objects.create(name='Headache')
+        self.log = DailyLog.objects.create(user=self.user, date=date.today() - timedelta(days=2))
+        self.log.symptoms_field.add(self.headache)
+        IntercourseLog.objects.create(log=self.log, quantity=2)
+
+    def test_reads_a_single_row(self):
+        payload = get_stats_snapshot(self.user)
+        self.assertEqual(payload['intercourse_metrics']['1']['intercourse_count'], 2)
+        self.assertEqual(payload['top_symptoms'], [{'name': 'Headache', 'count': 1}])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_stats_snapshot(self.user), payload)
+
+    def _refresh_jobs(self):
+        return Job.objects.filter(user=self.user, kind=REFRESH_JOB, status='PENDING')
+
+    def test_changes_queue_one_refresh(self):
+        get_stats_snapshot(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            log = DailyLog.objects.create(user=self.user, date=date.today() - timedelta(days=1))
+            log.symptoms_field.add(self.headache)
+            IntercourseLog.objects.create(log=log, quantity=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            start = date.today() - timedelta(days=40)
+            CycleWindow.objects.create(
+                user=self.user,
+                menstruation_start=start,
+                menstruation_end=start + timedelta(days=4),
+                min_ovulation_window=start + timedelta(days=12),
+                max_ovulation_window=start + timedelta(days=16),
+                is_prediction=False
+            )
+        self.assertEqual(self._refresh_jobs().count(), 1)
+
+        self.assertEqual(run_job(claim_next_job().id), 'DONE')
+        with self.assertNumQueries(1):
+            payload = get_stats_snapshot(self.user)
+        self.assertEqual(payload['intercourse_metrics']['1']['intercourse_count'], 3)
+        self.assertEqual(payload['top_symptoms'], [{'name': 'Headache', 'count': 2}])
+
+    def test_stale_read_serves_last_snapshot(self):
+        payload = get_stats_snapshot(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.log.delete()
+
+        # no rebuild in the request: the snapshot and the already queued refresh job
+        with self.assertNumQueries(2):
+            self.assertEqual(get_stats_snapshot(self.user), payload)
+        self.assertEqual(self._refresh_jobs().count(), 1)
+
+        run_job(claim_next_job().id)
+        payload = get_stats_snapshot(self.user)
+        self.assertEqual(payload['intercourse_metrics']['1']['intercourse_count'], 0)
+        self.assertEqual(payload['top_symptoms'], [])
+
+    def test_refreshed_on_the_next_day(self):
+        get_stats_snapshot(self.user)
+
+        tomorrow = date.today() + timedelta(days=1)
+        with patch('dashboard.analytics_snapshot.date') as mock_date:
+            mock_date.today.return_value = tomorrow
+            get_stats_snapshot(self.user)
+            self.assertEqual(self._refresh_jobs().count(), 1)
+            run_job(claim_next_job().id)
+
+        self.assertEqual(UserAnalyticsSnapshot.objects.get(user=self.user).built_on, tomorrow)
+
+    def test_top_symptoms_endpoint(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard:ajax_get_top_symptoms'))
+        self.assertEqual(response.json(), {'top_symptoms': [{'name': 'Headache', 'count': 1}]})
+
+    def test_rebuild_command(self):
+        get_stats_snapshot(self.user)
+        UserAnalyticsSnapshot.objects.filter(user=self.user).update(payload={})
+
+        out = StringIO()
+        call_command('rebuild_analytics_snapshots', '--stale-only', stdout=out)
+        self.assertTrue(out.getvalue().startswith('1 analytics snapshots rebuilt'))
+        self.assertEqual(UserAnalyticsSnapshot.objects.get(user=self.user).payload['top_symptoms'], [{'name': 'Headache', 'count': 1}])
+
+        out = StringIO()
+        call_command('rebuild_analytics_snapshots', '--stale-only', stdout=out)
+        self.assertTrue(out.getvalue().startswith('0 analytics snapshots rebuilt'))
\ No newline at end of file
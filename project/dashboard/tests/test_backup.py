@@ -0,0 +1,275 @@
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.test import override_settings
+from datetime import date, timedelta
+import gzip
+import io
+import json
+import shutil
+import tempfile
+
+from cycle_core.models import CycleDetails, CycleWindow
+from log_core.models import DailyLog, IntercourseLog, Symptom, Mood
+from log_core.catalog import invalidate_catalog
+from dashboard.backup import iter_backup, load_backup, validate_backup, restore_backup
+from job_core.services import claim_next_job, run_job
+
+User = get_user_model()
+
+
+class StreamingBackupTest(TestCase):
+    def setUp(self):
+        invalidate_catalog(Symptom)
+        invalidate_catalog(Mood)
+
+        self.user = User.objects.create_user(username='testuser', password='pass')
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date(2025, 1, 1))
+        profile = self.user.userprofile
+        profile.is_configured = True
+        profile.save()
+
+        self.symptom = Symptom.objects.create(name='Headache')
+        self.mood = Mood.objects.create(name='Happy')
+
+        start = date(2025, 1, 1)
+        CycleWindow.objects.create(
+            user=self.user,
+            menstruation_start=start,
+            menstruation_end=start + timedelta(days=4),
+            min_ovulation_window=start + timedelta(days=12),
+            max_ovulation_window=start + timedelta(days=16),
+            is_prediction=False
+        )
+        self._create_logs(5)
+
+    def _create_logs(self, count, offset=0):
+        for i in range(offset, offset + count):
+            log = DailyLog.objects.create(user=self.user, date=date(2024, 1, 1) + timedelta(days=i), note=f'note {i}', flow=i % 4)
+            log.symptoms_field.add(self.symptom)
+            log.moods_field.add(self.mood)
+            if i % 2:
+                IntercourseLog.objects.create(log=log, protected=True, orgasm=False, quantity=1)
+
+    def _backup(self, **params):
+        response = self.client.get(reverse('dashboard:backup_data'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_json_layout(self):
+        self.client.login(username='testuser', password='pass')
+        response, content = self._backup()
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+        data = json.loads(content)
+        # identical to the former json.dumps(data, indent=4) document
+        self.assertEqual(content.decode(), json.dumps(data, indent=4))
+
+        self.assertEqual(data['cycle_details']['base_menstruation_date'], '2025-01-01')
+        self.assertEqual(data['cycle_stats']['log_count'], 1)
+        self.assertEqual(len(data['cycle_windows']), CycleWindow.objects.filter(user=self.user).count())
+
+        logs = {log['date']: log for log in data['daily_logs']}
+        self.assertEqual(len(logs), 5)
+        self.assertEqual(logs['2024-01-02']['symptoms'], ['Headache'])
+        self.assertEqual(logs['2024-01-02']['moods'], ['Happy'])
+        self.assertEqual(logs['2024-01-02']['intercourse'], {'protected': True, 'orgasm': False, 'quantity': 1})
+        self.assertNotIn('intercourse', logs['2024-01-01'])
+
+    def test_query_count_independent_of_history(self):
+        # warm the catalog cache
+        b''.join(iter_backup(self.user))
+
+        with self.assertNumQueries(7):
+            b''.join(iter_backup(self.user))
+
+        self._create_logs(40, offset=5)
+        with self.assertNumQueries(7):
+            b''.join(iter_backup(self.user))
+
+    def test_ndjson_and_gzip_round_trip(self):
+        expected = json.loads(b''.join(iter_backup(self.user)))
+
+        ndjson = b''.join(iter_backup(self.user, 'ndjson'))
+        self.assertEqual(len(ndjson.splitlines()), 2 + len(expected['cycle_windows']) + len(expected['daily_logs']))
+        self.assertEqual(load_backup(io.BytesIO(ndjson)), expected)
+
+        compressed = b''.join(iter_backup(self.user, 'ndjson', compress=True))
+        self.assertEqual(gzip.decompress(compressed), ndjson)
+        self.assertEqual(load_backup(io.BytesIO(compressed)), expected)
+
+    def test_empty_history(self):
+        DailyLog.objects.filter(user=self.user).delete()
+
+        content = b''.join(iter_backup(self.user)).decode()
+        data = json.loads(content)
+        self.assertEqual(data['daily_logs'], [])
+        self.assertEqual(content, json.dumps(data, indent=4))
+
+
+class BulkRestoreTest(TestCase):
+    def setUp(self):
+        # the settings page stores uploads for the restore job
+        self.results_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.results_root)
+        settings_override = override_settings(JOB_RESULTS_ROOT=self.results_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='testuser', password='pass')
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date(2025, 1, 1))
+        profile = self.user.userprofile
+        profile.is_configured = True
+        profile.save()
+
+        Symptom.objects.create(name='Headache')
+        Mood.objects.create(name='Happy')
+
+    def _backup_data(self, windows=6, logs=30):
+        cycle_windows = []
+        for i in range(windows):
+            start = date(2024, 1, 1) + timedelta(days=i * 28)
+            cycle_windows.append({
+                'menstruation_start': start.isoformat(),
+                'menstruation_end': (start + timedelta(days=4)).isoformat(),
+                'min_ovulation_window': (start + timedelta(days=12)).isoformat(),
+                'max_ovulation_window': (start + timedelta(days=16)).isoformat(),
+                'is_prediction': False
+            })
+
+        daily_logs = []
+        for i in range(logs):
+            daily_logs.append({
+                'date': (date(2024, 1, 1) + timedelta(days=i)).isoformat(),
+                'note': f'note {i}', 'flow': i % 4, 'weight': 60.5, 'temperature': None, 'ovulation_test': 'POSITIVE' if i == 13 else None,
+                'symptoms': ['Headache', 'Unknown'], 'moods': ['Happy'], 'medications': [],
+                'intercourse': {'protected': True, 'orgasm': None, 'quantity': 1} if i % 3 == 0 else None
+            })
+
+        return {
+            'cycle_details': {'base_menstruation_date': '2024-01-01', 'avg_cycle_duration': 28, 'avg_menstruation_duration': 5},
+            'cycle_stats': {'avg_cycle_duration': 28, 'avg_menstruation_duration': 5, 'avg_ovulation_start_day': 12, 'avg_ovulation_end_day': 16, 'log_count': windows},
+            'cycle_windows': cycle_windows,
+            'daily_logs': daily_logs,
+        }
+
+    def test_restore(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            report = restore_backup(self.user, validate_backup(self._backup_data()))
+
+        self.assertEqual(report['cycle_windows'], 6)
+        self.assertEqual(report['daily_logs'], 30)
+        self.assertEqual((report['symptoms'], report['moods'], report['intercourse']), (30, 30, 10))
+
+        self.assertEqual(CycleWindow.objects.filter(user=self.user, is_prediction=False).count(), 6)
+        self.assertTrue(CycleWindow.objects.filter(user=self.user, is_prediction=True).exists())
+        log = DailyLog.objects.get(user=self.user, date=date(2024, 1, 4))
+        self.assertEqual([s.name for s in log.symptoms_field.all()], ['Headache'])
+        self.assertEqual(log.intercourse.quantity, 1)
+
+        # stats recomputed from the restored windows
+        stats = self.user.cyclestats
+        stats.refresh_from_db()
+        self.assertEqual(stats.log_count, 6)
+        self.assertEqual(stats.ovulation_offsets, {str(CycleWindow.objects.get(user=self.user, menstruation_start=date(2024, 1, 1)).id): 13})
+
+    def test_query_count_independent_of_size(self):
+        def restore_queries(windows, logs):
+            data = validate_backup(self._backup_data(windows, logs))
+            DailyLog.objects.filter(user=self.user).delete()
+            CycleWindow.objects.filter(user=self.user, is_prediction=False).delete()
+            # the predictions regenerated by the delete above
+            CycleWindow.objects.filter(user=self.user).delete()
+
+            with CaptureQueriesContext(connection) as ctx:
+                restore_backup(self.user, data)
+            return len(ctx.captured_queries)
+
+        # same number of bulk_create batches (SQLite caps them at 999 parameters)
+        self.assertEqual(restore_queries(6, 30), restore_queries(20, 100))
+
+    def test_invalid_file_is_rejected_before_writing(self):
+        data = self._backup_data()
+        data['daily_logs'][5]['date'] = '2024-13-01'
+        with self.assertRaisesMessage(ValueError, 'daily_logs[5].date'):
+            validate_backup(data)
+
+        data = self._backup_data()
+        data['daily_logs'][5]['date'] = data['daily_logs'][4]['date']
+        with self.assertRaisesMessage(ValueError, 'duplicate date'):
+            validate_backup(data)
+
+        data = self._backup_data()
+        data['cycle_windows'][0] = ['not', 'a', 'window']
+        with self.assertRaisesMessage(ValueError, 'cycle_windows[0]'):
+            validate_backup(data)
+
+        with self.assertRaisesMessage(ValueError, 'cycle_windows: not a list'):
+            validate_backup({'cycle_windows': 5})
+
+        data = self._backup_data()
+        data['daily_logs'][0]['symptoms'] = 'Headache'
+        with self.assertRaisesMessage(ValueError, 'daily_logs[0].symptoms: not a list'):
+            validate_backup(data)
+
+    def test_malformed_ndjson_is_rejected(self):
+        for text in ['{"cycle_details": {}}\n[1]\n', '{"cycle_details": {}}\n{"a": 1, "b": 2}\n']:
+            with self.assertRaises(ValueError):
+                load_backup(io.BytesIO(text.encode()))
+
+        self.client.login(username='testuser', password='pass')
+        backup_file = SimpleUploadedFile('backup.ndjson', b'{"cycle_details": {}}\n[1]\n')
+        self.client.post(reverse('dashboard:restore_data'), {'backup_file': backup_file})
+        self.assertEqual(run_job(claim_next_job().id), 'FAILED')
+
+        response = self.client.get(reverse('dashboard:settings_page'))
+        self.assertContains(response, 'Restore failed: ValueError: NDJSON lines must be single-key objects')
+
+    def test_truncated_gzip_is_rejected(self):
+        compressed = gzip.compress(json.dumps(self._backup_data()).encode())
+        with self.assertRaisesMessage(ValueError, 'invalid backup file'):
+            load_backup(io.BytesIO(compressed[:len(compressed) // 2]))
+
+        self.client.login(username='testuser', password='pass')
+        backup_file = SimpleUploadedFile('backup.json.gz', compressed[:len(compressed) // 2])
+        self.client.post(reverse('dashboard:restore_data'), {'backup_file': backup_file})
+        self.assertEqual(run_job(claim_next_job().id), 'FAILED')
+
+        response = self.client.get(reverse('dashboard:settings_page'))
+        self.assertContains(response, 'Restore failed: ValueError: invalid backup file')
+        self.assertFalse(DailyLog.objects.filter(user=self.user).exists())
+
+    def test_settings_page_restores_in_a_job(self):
+        self.client.login(username='testuser', password='pass')
+        backup_file = SimpleUploadedFile('backup.json', json.dumps(self._backup_data()).encode())
+
+        response = self.client.post(reverse('dashboard:restore_data'), {'backup_file': backup_file})
+        texts = [str(m) for m in get_messages(response.wsgi_request)]
+        self.assertIn('Your backup is being restored, the result is shown on this page.', texts)
+        # nothing restored in the request
+        self.assertFalse(DailyLog.objects.filter(user=self.user).exists())
+
+        response = self.client.get(reverse('dashboard:settings_page'))
+        self.assertContains(response, 'data-status="PENDING"')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(run_job(claim_next_job().id), 'DONE')
+        self.assertEqual(DailyLog.objects.filter(user=self.user).count(), 30)
+
+        response = self.client.get(reverse('dashboard:settings_page'))
+        self.assertContains(response, 'Restored 6 cycle windows and 30 daily logs')
+
+    def test_settings_page_resets_in_a_job(self):
+        self.client.login(username='testuser', password='pass')
+        self.client.post(reverse('dashboard:reset_data'))
+        self.assertTrue(CycleDetails.objects.filter(user=self.user).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(run_job(claim_next_job().id), 'DONE')
+        self.assertFalse(CycleDetails.objects.filter(user=self.user).exists())
+        # the polling page moves on to the setup page
+        self.assertRedirects(self.client.get(reverse('dashboard:settings_page')), reverse('dashboard:setup_page'), fetch_redirect_response=False)
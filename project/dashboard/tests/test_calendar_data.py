@@ -0,0 +1,83 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from unittest.mock import patch
+from datetime import date, timedelta
+
+from cycle_core.models import CycleDetails, CycleWindow
+from log_core.models import DailyLog
+
+User = get_user_model()
+
+
+class CalendarDataTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='pass')
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date(2025, 1, 1))
+        profile = self.user.userprofile
+        profile.is_configured = True
+        profile.save()
+        self.client.login(username='testuser', password='pass')
+
+        CycleWindow.objects.create(
+            user=self.user,
+            menstruation_start=date(2025, 1, 30),
+            menstruation_end=date(2025, 2, 2),
+            min_ovulation_window=date(2025, 2, 11),
+            max_ovulation_window=date(2025, 2, 15),
+            is_prediction=False
+        )
+        self.url = reverse('dashboard:ajax_calendar_data')
+
+    def _get(self, **headers):
+        return self.client.get(self.url, {'reference_month': '2025-02-14'}, headers=headers)
+
+    def test_payload(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+
+        data = response.json()
+        self.assertEqual(data['reference_month'], '2025-02-01')
+        self.assertEqual(data['rendered_month_start'], '2024-12-01')
+        self.assertEqual(data['rendered_month_end'], '2025-03-31')
+        self.assertEqual(len(data['weekdays']), 7)
+        self.assertEqual([m['month'] for m in data['months']], ['2024-12-01', '2025-01-01', '2025-02-01', '2025-03-01'])
+
+        january, february = data['months'][1], data['months'][2]
+        self.assertEqual(january['name'], 'January 2025')
+        self.assertEqual((january['first_weekday'], january['days']), (2, 31))
+        self.assertEqual(january['logged_menstruation'], 0b11 << 29)
+        self.assertEqual(february['logged_menstruation'], 0b11)
+        self.assertEqual(february['ovulation'], 0b11111 << 10)
+
+    def test_conditional_get(self):
+        response = self._get()
+        self.assertIn('private', response['Cache-Control'])
+
+        self.assertEqual(self._get(if_none_match=response['ETag']).status_code, 304)
+
+        DailyLog.objects.create(user=self.user, date=date(2025, 2, 3), note='note')
+        changed = self._get(if_none_match=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['months'][2]['has_log'], 1 << 2)
+
+    def test_etag_follows_language_and_day(self):
+        etag = self._get()['ETag']
+
+        response = self._get(if_none_match=etag, accept_language='it')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['months'][1]['name'], 'Gennaio 2025')
+        self.assertNotIn('Last-Modified', response)
+
+        tomorrow = date.today() + timedelta(days=1)
+        with patch('dashboard.views.date') as mock_date:
+            mock_date.today.return_value = tomorrow
+            response = self._get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['today'], tomorrow.isoformat())
+
+    def test_invalid_reference_month(self):
+        response = self.client.get(self.url, {'reference_month': 'nope'})
+        self.assertEqual(response.status_code, 400)
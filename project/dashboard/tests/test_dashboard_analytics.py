@@ -0,0 +1,119 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from datetime import date, timedelta
+
+from cycle_core.batching import deferred_cycle_updates
+from cycle_core.models import CycleDetails, CycleWindow
+from log_core.models import DailyLog, IntercourseLog
+from dashboard.dashboard_analytics import (
+    MONTH_RANGES,
+    get_intercourse_metrics,
+    get_intercourse_metrics_by_range,
+    get_cycle_length_distribution
+)
+
+User = get_user_model()
+
+
+class IntercourseMetricsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='pass', email='testuser@test.com')
+        self.end_date = date(2025, 6, 30)
+
+        # (days ago, protected, orgasm, quantity)
+        for days_ago, protected, orgasm, quantity in [
+            (2, True, True, 2),
+            (10, False, False, 1),
+            (20, None, True, None),
+            (50, True, True, 1),
+            (200, False, None, 3),
+            (400, True, True, 1),  # out of every range
+        ]:
+            log = DailyLog.objects.create(user=self.user, date=self.end_date - timedelta(days=days_ago))
+            IntercourseLog.objects.create(log=log, protected=protected, orgasm=orgasm, quantity=quantity)
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            metrics = get_intercourse_metrics(self.user, end_date=self.end_date)
+
+        self.assertEqual(metrics, {
+            'intercourse_count': 3,
+            'orgasm_percentage': 100.0,
+            'protected_count': 1,
+            'unprotected_count': 1,
+            # 31 days
+            'frequency_intercourse': 10.3,
+            'frequency_orgasm': 15.5,
+        })
+
+    def test_ranges_in_one_query(self):
+        with self.assertNumQueries(1):
+            by_range = get_intercourse_metrics_by_range(self.user, end_date=self.end_date)
+
+        self.assertEqual(list(by_range), list(MONTH_RANGES))
+        for month_range in MONTH_RANGES:
+            self.assertEqual(by_range[month_range], get_intercourse_metrics(self.user, end_date=self.end_date, month_range=month_range))
+
+        self.assertEqual(by_range[12]['intercourse_count'], 7)
+        self.assertEqual((by_range[12]['protected_count'], by_range[12]['unprotected_count']), (2, 2))
+
+    def test_end_date_defaults_to_today(self):
+        log = DailyLog.objects.create(user=self.user, date=date.today())
+        IntercourseLog.objects.create(log=log, quantity=4)
+
+        self.assertEqual(get_intercourse_metrics(self.user)['intercourse_count'], 4)
+
+
+class CycleLengthDistributionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='pass', email='testuser@test.com')
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date(2025, 1, 1))
+
+        start = date(2024, 1, 1)
+        # the 90 days gap (a missing log) is left out
+        for length in [28, 30, 28, 90, 26, 32, 28]:
+            self._create_window(start)
+            start += timedelta(days=length)
+        self._create_window(start)
+
+    def _create_window(self, start):
+        return CycleWindow.objects.create(
+            user=self.user,
+            menstruation_start=start,
+            menstruation_end=start + timedelta(days=4),
+            min_ovulation_window=start + timedelta(days=12),
+            max_ovulation_window=start + timedelta(days=16),
+            is_prediction=False
+        )
+
+    def test_distribution(self):
+        with self.assertNumQueries(1):
+            distribution = get_cycle_length_distribution(self.user)
+
+        self.assertEqual(distribution['labels'], ['26', '28', '30', '32'])
+        self.assertEqual(distribution['data'], [1, 3, 1, 1])
+        self.assertEqual(distribution['percentiles'], {'p10': 27.0, 'p25': 28.0, 'p50': 28.0, 'p75': 29.5, 'p90': 31.0})
+        self.assertEqual(distribution['stddev'], 1.9)
+
+    def test_without_numpy(self):
+        expected = get_cycle_length_distribution(self.user)
+        cache.clear()
+
+        with patch('dashboard.dashboard_analytics.numpy', None):
+            self.assertEqual(get_cycle_length_distribution(self.user), expected)
+
+    def test_cached_until_period_edit(self):
+        get_cycle_length_distribution(self.user)
+        with self.assertNumQueries(0):
+            get_cycle_length_distribution(self.user)
+
+        self._create_window(date(2024, 10, 20))
+        self.assertEqual(get_cycle_length_distribution(self.user)['data'], [1, 3, 1, 1, 1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with deferred_cycle_updates(self.user):
+                CycleWindow.objects.filter(user=self.user, is_prediction=False).delete()
+        self.assertEqual(get_cycle_length_distribution(self.user)['data'], [])
\ No newline at end of file
@@ -0,0 +1,184 @@
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from datetime import date, timedelta
+from dateutil import relativedelta
+import json
+import os
+import statistics
+import time
+
+from cycle_core.models import CycleDetails
+from log_core.models import Symptom, Mood, Medication
+from log_core.catalog import invalidate_catalog
+from dashboard.backup import validate_backup, restore_backup, BACKUP_CHUNK_SIZE
+
+User = get_user_model()
+
+# Months of history seeded for each user: query counts must not depend on it.
+HISTORY_MONTHS = (1, 12, 120)
+
+# Queries allowed per view once the per-user caches are warm (second request onwards).
+# backup_data streams the logs in chunks of BACKUP_CHUNK_SIZE, its budget is per started chunk.
+VIEW_BUDGETS = {
+    'homepage': 8,
+    'calendar_view': 8,
+    'stats': 5,
+    'cycle_logs': 6,
+    'ajax_load_log': 6,
+    'backup_data': 10,
+}
+BACKUP_QUERIES_PER_CHUNK = 3
+
+VIEW_URLS = {
+    'homepage': 'dashboard:homepage',
+    'calendar_view': 'dashboard:calendar_view',
+    'stats': 'dashboard:stats',
+    'cycle_logs': 'dashboard:logs_page',
+    'ajax_load_log': 'dashboard:ajax_load_log',
+    'backup_data': 'dashboard:backup_data',
+}
+
+LATENCY_RUNS = 5
+
+# Set to a file path to write the per-view latency report (JSON), e.g. to compare two commits.
+REPORT_ENV = 'DASHBOARD_BUDGET_REPORT'
+
+
+def _history(months, today):
+    # One logged cycle every 28 days and a daily log for every day of the last `months` months.
+    start = today - relativedelta.relativedelta(months=months)
+    windows, logs = [], []
+
+    cycle_start = start
+    while cycle_start <= today - timedelta(days=5):
+        windows.append({
+            'menstruation_start': cycle_start.isoformat(),
+            'menstruation_end': (cycle_start + timedelta(days=4)).isoformat(),
+            'min_ovulation_window': (cycle_start + timedelta(days=12)).isoformat(),
+            'max_ovulation_window': (cycle_start + timedelta(days=16)).isoformat(),
+            'is_prediction': False,
+        })
+        cycle_start += timedelta(days=28)
+
+    for i in range((today - start).days):
+        day = start + timedelta(days=i)
+        logs.append({
+            'date': day.isoformat(),
+            'note': f'note {i}',
+            'flow': i % 4,
+            'ovulation_test': 'POSITIVE' if i % 28 == 14 else None,
+            'symptoms': ['Headache', 'Cramps'][:i % 3],
+            'moods': ['Happy'] if i % 2 else [],
+            'medications': ['Ibuprofen'] if i % 5 == 0 else [],
+            'intercourse': {'protected': bool(i % 2), 'orgasm': i % 3 == 0, 'quantity': 1} if i % 4 == 0 else None,
+        })
+
+    return {
+        'cycle_details': {'base_menstruation_date': windows[0]['menstruation_start'], 'avg_cycle_duration': 28, 'avg_menstruation_duration': 5},
+        'cycle_stats': None,
+        'cycle_windows': windows,
+        'daily_logs': logs,
+    }
+
+
+class DashboardQueryBudgetTest(TestCase):
+    report = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = date.today()
+        for name in ['Headache', 'Cramps']:
+            Symptom.objects.create(name=name)
+        Mood.objects.create(name='Happy')
+        Medication.objects.create(name='Ibuprofen')
+
+        cls.users = {}
+        for months in HISTORY_MONTHS:
+            user = User.objects.create_user(username=f'history_{months}', password='pass', email=f'history_{months}@test.com')
+            CycleDetails.objects.create(user=user, base_menstruation_date=cls.today - timedelta(days=10))
+            profile = user.userprofile
+            profile.is_configured = True
+            profile.save()
+
+            with cls.captureOnCommitCallbacks(execute=True):
+                restore_backup(user, validate_backup(_history(months, cls.today)))
+            cls.users[months] = user
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        path = os.environ.get(REPORT_ENV)
+        if path and cls.report:
+            with open(path, 'w') as f:
+                json.dump({
+                    'database': connection.vendor,
+                    'latency_runs': LATENCY_RUNS,
+                    'views': cls.report,
+                }, f, indent=4, sort_keys=True)
+
+    def setUp(self):
+        cache.clear()
+        for model in (Symptom, Mood, Medication):
+            invalidate_catalog(model)
+
+    def _request(self, view):
+        yesterday = (self.today - timedelta(days=1)).isoformat()
+        if view == 'ajax_load_log':
+            return self.client.post(reverse('dashboard:ajax_load_log'), json.dumps({'date': yesterday}), content_type='application/json')
+
+        response = self.client.get(reverse(VIEW_URLS[view]))
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def _measure(self, view):
+        for months, user in self.users.items():
+            with self.subTest(view=view, months=months):
+                self.client.force_login(user)
+                # warm the per-user caches (predictions, calendar index, catalog)
+                self.assertEqual(self._request(view).status_code, 200)
+
+                with CaptureQueriesContext(connection) as queries:
+                    self._request(view)
+                query_count = len(queries)
+
+                budget = VIEW_BUDGETS[view]
+                if view == 'backup_data':
+                    chunks = -(-user.dailylog_set.count() // BACKUP_CHUNK_SIZE)
+                    budget += BACKUP_QUERIES_PER_CHUNK * max(chunks - 1, 0)
+                self.assertLessEqual(query_count, budget, '\n'.join(q['sql'] for q in queries.captured_queries))
+
+                timings = []
+                for _ in range(LATENCY_RUNS):
+                    started = time.perf_counter()
+                    self._request(view)
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                self.report.setdefault(view, {})[str(months)] = {
+                    'queries': query_count,
+                    'budget': budget,
+                    'median_ms': round(statistics.median(timings), 2),
+                    'max_ms': round(max(timings), 2),
+                }
+
+    def test_homepage(self):
+        self._measure('homepage')
+
+    def test_calendar_view(self):
+        self._measure('calendar_view')
+
+    def test_stats(self):
+        self._measure('stats')
+
+    def test_cycle_logs(self):
+        self._measure('cycle_logs')
+
+    def test_ajax_load_log(self):
+        self._measure('ajax_load_log')
+
+    def test_backup_data(self):
+        self._measure('backup_data')
\ No newline at end of file
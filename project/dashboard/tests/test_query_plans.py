@@ -0,0 +1,82 @@
+from django.test import TestCase
+from django.db import connection
+from django.contrib.auth import get_user_model
+from datetime import date, timedelta
+import re
+import unittest
+
+from cycle_core.models import CycleWindow
+from log_core.models import DailyLog
+from notifications.models import Notification
+
+User = get_user_model()
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'asserts on SQLite query plans')
+class HotQueryPlanTest(TestCase):
+    # The per-user dashboard queries must be served by the composite indexes: a SEARCH on the index,
+    # no table SCAN and no temporary b-tree to sort the rows.
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create([User(username=f'user_{i}', email=f'user_{i}@test.com') for i in range(20)])
+        cls.user = users[0]
+
+        windows, logs, notifications = [], [], []
+        for user in users:
+            for i in range(24):
+                start = date(2023, 1, 1) + timedelta(days=28 * i)
+                windows.append(CycleWindow(
+                    user=user,
+                    menstruation_start=start,
+                    menstruation_end=start + timedelta(days=4),
+                    min_ovulation_window=start + timedelta(days=12),
+                    max_ovulation_window=start + timedelta(days=16),
+                    is_prediction=i >= 21
+                ))
+            logs.extend(DailyLog(user=user, date=date(2023, 1, 1) + timedelta(days=i)) for i in range(0, 600, 3))
+            notifications.extend(
+                Notification(user=user, title='Title', message='Message', notification_type='FORUM', is_read=i % 3 == 0)
+                for i in range(30)
+            )
+
+        CycleWindow.objects.bulk_create(windows)
+        DailyLog.objects.bulk_create(logs)
+        Notification.objects.bulk_create(notifications)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf'SEARCH \w+ USING (COVERING )?INDEX {index_name}', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertIsNone(re.search(r'SCAN \w+$', plan, re.MULTILINE), plan)
+
+    def test_cycle_window_queries(self):
+        index = 'cyclewindow_user_start_pred'
+        history = CycleWindow.objects.filter(user=self.user, is_prediction=False)
+
+        self.assertUsesIndex(history.order_by('menstruation_start').values_list('id', 'menstruation_start', 'menstruation_end'), index)
+        self.assertUsesIndex(history.order_by('-menstruation_start').values_list('menstruation_start', flat=True)[:1], index)
+        self.assertUsesIndex(history.filter(menstruation_start__lt=date(2024, 1, 1)).order_by('-menstruation_start')[:1], index)
+        self.assertUsesIndex(CycleWindow.objects.filter(user=self.user, is_prediction=True).order_by('menstruation_start'), index)
+        self.assertUsesIndex(history.filter(menstruation_start__lte=date(2024, 4, 1), menstruation_end__gte=date(2024, 1, 1)), index)
+        # calendar day index: logged and predicted windows together
+        self.assertUsesIndex(CycleWindow.objects.filter(
+            user=self.user, menstruation_start__lte=date(2024, 4, 1), max_ovulation_window__gte=date(2024, 1, 1)
+        ), index)
+
+    def test_daily_log_queries(self):
+        # served by the (user, date) unique_together index
+        index = r'log_core_dailylog_user_id_date_\w+_uniq'
+        logs = DailyLog.objects.filter(user=self.user)
+
+        self.assertUsesIndex(logs.filter(date=date(2023, 3, 1)), index)
+        self.assertUsesIndex(logs.filter(date__range=(date(2023, 1, 1), date(2023, 3, 31))).order_by('date'), index)
+        self.assertUsesIndex(logs.filter(date__gte=date(2023, 1, 1), ovulation_test='POSITIVE').order_by('date').values_list('date', flat=True), index)
+
+    def test_notification_queries(self):
+        index = 'notification_user_unread'
+        unread = self.user.notifications.filter(is_read=False)
+
+        self.assertUsesIndex(unread[:5], index)
+        self.assertUsesIndex(Notification.objects.filter(user_id__in=[self.user.id], is_read=False).values('user_id'), index)
\ No newline at end of file
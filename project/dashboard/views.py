@@ -1,26 +1,31 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
-from django.views.decorators.http import require_POST
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST, require_GET
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.contrib.auth.decorators import login_required
-from django.utils.translation import gettext_lazy as _
+from django.utils.translation import gettext_lazy as _, get_language
 
 
 from datetime import datetime, date, timedelta
 from dateutil import relativedelta
 import json
+import hashlib
 
-from .services import user_type_required, configured_required, fetch_closest_prediction, render_selectable_calendars, group_consecutive_days, generate_date_intervals, parse_list_of_dates, apply_period_windows, calculate_timeline_data
-from .dashboard_analytics import (
-    get_intercourse_activity_metrics, 
-    get_intercourse_frequency_metrics,
-    get_cycle_length_distribution
-)
+from .services import user_type_required, configured_required, fetch_closest_prediction, render_selectable_calendars, get_selectable_months, group_consecutive_days, generate_date_intervals, parse_list_of_dates, apply_period_windows, calculate_timeline_data
+from .backup import iter_backup, BACKUP_FORMATS
+from .dashboard_analytics import get_intercourse_metrics
+from .analytics_snapshot import get_stats_snapshot
 from cycle_core.models import CycleDetails, CycleStats, CycleWindow, MIN_LOG_FOR_STATS
 from cycle_core.forms import CycleDetailsForm
-from log_core.services import get_day_log
+from cycle_core.batching import deferred_cycle_updates
+from cycle_core.prediction_cache import get_predictions
+from log_core.services import get_day_log, get_day_log_data
+from log_core.analytics import ITEM_TYPES, get_item_heatmap
+from log_core.search import search_notes
 from log_core.models import DailyLog, IntercourseLog
 from log_core.forms import DailyLogForm, IntercourseLogForm
-from calendar_core.services import render_multiple_calendars, CalendarType
+from calendar_core.services import render_multiple_calendars, get_month_labels, CalendarType
+from calendar_core.day_index import get_day_index, serialize_day_index
 
 from users.models import PartnerProfile
 from users.models import PartnerProfile, UserProfile
@@ -29,7 +34,9 @@ from users.forms import UserUpdateForm, ProfileUpdateForm, PremiumUpgradeForm
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 from django.contrib import messages
-from notifications.services import check_dangerous_symptoms, check_upcoming_predictions
+from notifications.services import check_dangerous_symptoms
+from job_core.models import Job
+from job_core.services import enqueue_job, store_job_upload
 
 
 # Create your views here.
@@ -91,39 +98,14 @@ def calendar_view(request):
     visible_start = months_to_render[0]
     visible_end = (months_to_render[-1] + relativedelta.relativedelta(months=1)) - timedelta(days=1)
     
-    # get CycleWindows in month range
-    cycle_windows = CycleWindow.objects.filter(
-        user=user,
-        menstruation_start__lte=visible_end,
-        max_ovulation_window__gte=visible_start 
-    )
-    
-    menstruation_dates = set()
-    ovulation_dates = set()
-    
-    for cw in cycle_windows:
-        try:
-            menstruation_dates.update(cw.getMenstruationDatesAsList())
-            ovulation_dates.update(cw.getOvulationDatesAsList())
-        except ValueError:
-            continue
-
-    # get DailyLogs in month range
-    logs = DailyLog.objects.filter(
-        user=user,
-        date__gte=visible_start,
-        date__lte=visible_end
-    )
-    
-    log_dates = {log.date.strftime('%Y-%m-%d') for log in logs}
+    # day states of the visible months, one indexed query once the months are built
+    day_index = get_day_index(user, visible_start, visible_end)
 
     # render calendars
     calendars = render_multiple_calendars(
         months=months_to_render,
-        menstruation_dates=list(menstruation_dates),
-        ovulation_dates=list(ovulation_dates),
-        log_dates=list(log_dates),
-        calendar_type=CalendarType.STANDARD
+        calendar_type=CalendarType.STANDARD,
+        day_index=day_index
     )
     
     ctx['calendars'] = calendars
@@ -150,9 +132,6 @@ def homepage(request):
     ctx['next_prediction'] = fetch_closest_prediction(request.user)
     ctx['timeline_data'] = calculate_timeline_data(request.user)
 
-    # Check for upcoming period/ovulation notifications
-    check_upcoming_predictions(request.user)
-
     return render(request, 'dashboard/dashboard.html', ctx)
 
 @user_type_required(['PARTNER'])
@@ -348,9 +327,31 @@ def settings(request):
         ctx['linked_partners'] = PartnerProfile.objects.filter(linked_user=request.user)
     except:
         ctx['linked_partners'] = []
+
+    if request.user.user_type in ['STANDARD', 'PREMIUM']:
+        ctx['jobs'] = _recent_jobs(request.user)
     
     return render(request, 'dashboard/settings.html', ctx)
 
+RECENT_JOBS_LIMIT = 5
+
+def _recent_jobs(user):
+    # backups, restores and resets listed (and polled) on the settings page
+    jobs = list(user.jobs.filter(kind__in=list(Job.USER_KIND_LABELS))[:RECENT_JOBS_LIMIT])
+    for job in jobs:
+        job.summary = ''
+        if job.kind == 'restore' and job.status == 'DONE':
+            job.summary = _("Restored {windows} cycle windows and {logs} daily logs in {seconds} seconds.").format(
+                windows=job.result.get('cycle_windows'), logs=job.result.get('daily_logs'), seconds=job.result.get('seconds')
+            )
+        elif job.kind == 'restore' and job.status == 'FAILED':
+            job.summary = _("Restore failed: {error}").format(error=job.getErrorSummary())
+        elif job.kind == 'reset' and job.status == 'FAILED':
+            job.summary = _("Reset failed: {error}").format(error=job.getErrorSummary())
+        elif job.status == 'FAILED':
+            job.summary = job.getErrorSummary()
+    return jobs
+
 @user_type_required(['STANDARD', 'PREMIUM', 'PARTNER'])
 @configured_required
 def cycle_logs(request):
@@ -381,7 +382,7 @@ def cycle_logs(request):
     show_history_view = request.GET.get('view') == 'history'
     
     periods_history = CycleWindow.objects.filter(user=user, is_prediction=False).order_by('menstruation_start')
-    predictions_log = CycleWindow.objects.filter(user=user, is_prediction=True).order_by('menstruation_start')
+    predictions_log = get_predictions(user)
 
     ctx['objects'] = periods_history if show_history_view else predictions_log
     ctx['active_view'] = 'history' if show_history_view else 'predictions'
@@ -450,6 +451,58 @@ def ajax_navigate_calendar(request):
 
     return JsonResponse(response_data)
 
+@user_type_required(['STANDARD', 'PREMIUM', 'PARTNER'])
+@configured_required
+@require_GET
+def ajax_calendar_data(request):
+    # Data mode of ajax_navigate_calendar: the day-state bitmaps of the period editor months,
+    # rendered by the calendar widget. Conditional GETs are answered with 304 when nothing changed.
+    user = _get_dashboard_user(request)
+    if not user:
+        return JsonResponse({'error': 'No linked user'}, status=403)
+
+    try:
+        reference_month = datetime.strptime(request.GET.get('reference_month', ''), '%Y-%m-%d').date().replace(day=1)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid reference_month'}, status=400)
+
+    months, rendered_month_start, rendered_month_end = get_selectable_months(reference_month)
+    day_index = get_day_index(user, rendered_month_start, rendered_month_end)
+    today = date.today()
+
+    # the payload depends on the stored months, the language of the labels and today: a 304 is answered
+    # from these alone, before the payload is built
+    etag = '"%s"' % hashlib.md5(':'.join([
+        str(user.id),
+        reference_month.isoformat(),
+        max(row.updated_at for row in day_index.values()).isoformat(),
+        get_language() or '',
+        today.isoformat(),
+    ]).encode()).hexdigest()
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        labels = get_month_labels(months)
+        month_states = serialize_day_index(months, day_index)
+        for month_data, name in zip(month_states, labels['month_names']):
+            month_data['name'] = name
+
+        response_data = {
+            'reference_month': reference_month.strftime('%Y-%m-%d'),
+            'rendered_month_start': rendered_month_start.strftime('%Y-%m-%d'),
+            'rendered_month_end': rendered_month_end.strftime('%Y-%m-%d'),
+            # future days can't be selected
+            'today': today.strftime('%Y-%m-%d'),
+            'weekdays': labels['weekdays'],
+            'months': month_states,
+        }
+        response = HttpResponse(json.dumps(response_data, separators=(',', ':')), content_type='application/json')
+
+    response['ETag'] = etag
+    # per-user data: only the browser may keep it, and it has to revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
 @user_type_required(['STANDARD', 'PREMIUM'])
 @configured_required
 def add_log(request):
@@ -488,7 +541,7 @@ def add_log(request):
                 # Check for dangerous symptoms and heavy bleeding
                 symptom_names = [s.name for s in symptoms]
                 flow_level = dl_form.cleaned_data.get('flow')
-                check_dangerous_symptoms(request.user, symptom_names, flow_level)
+                check_dangerous_symptoms(request.user, symptom_names, flow_level, daily_log.date)
             if 'moods' in dl_form.cleaned_data:
                 daily_log.moods_field.set(dl_form.cleaned_data['moods'])
             if 'medications' in dl_form.cleaned_data:
@@ -556,64 +609,20 @@ def ajax_load_log(request):
     if not date:
         print(date)
 
-    try:
-        log = DailyLog.objects.get(user=user, date=date)
-        exists = True
-    except DailyLog.DoesNotExist:
-        log = None
-        exists = False
+    log_data = get_day_log_data(user, date)
     
-    response_data = {"exists": exists}
+    response_data = {"exists": log_data is not None}
     
     # check for cycle status (Period/Ovulation) even if log doesn't exist
-    cycle_windows = CycleWindow.objects.filter(
-        user=user,
-        menstruation_start__lte=date,
-        max_ovulation_window__gte=date
-    )
-    
-    is_period = False
-    is_ovulation = False
-    
     date_obj = datetime.strptime(date, '%Y-%m-%d').date()
-    
-    # check if date is in a cycle window
-    for cw in cycle_windows:
-        if cw.menstruation_start <= date_obj <= cw.menstruation_end:
-            is_period = True
-        
-        if cw.min_ovulation_window <= date_obj <= cw.max_ovulation_window:
-            is_ovulation = True
+    day_states = get_day_index(user, date_obj, date_obj)[date_obj.replace(day=1)]
 
-    response_data['is_period'] = is_period
-    response_data['is_ovulation'] = is_ovulation
+    response_data['is_period'] = day_states.hasFlag('menstruation', date_obj.day)
+    response_data['is_ovulation'] = day_states.hasFlag('ovulation', date_obj.day)
 
     # return data only if exists. return empty form if it doesn't
-    if log:
-        il = IntercourseLog.objects.filter(log=log).first()
-        from django.utils.translation import gettext as _rt
-
-        response_data.update({
-            "note": log.note,
-            "flow": log.flow,
-            "flow_display": _rt(log.get_flow_display()) if log.flow is not None else None,
-            "weight": log.weight,
-            "temperature": log.temperature,
-            "ovulation_test": log.ovulation_test,
-
-            "symptoms": [s.id for s in log.symptoms_field.all()],
-            "symptoms_display": [str(s) for s in log.symptoms_field.all()],
-            "moods": [m.id for m in log.moods_field.all()],
-            "moods_display": [str(m) for m in log.moods_field.all()],
-            "medications": [m.id for m in log.medications_field.all()],
-            "medications_display": [str(med) for med in log.medications_field.all()],
-
-            "protected": il.protected if il else None,
-            "protected_display": _rt("Yes") if il and il.protected else (_rt("No") if il and il.protected is False else None),
-            "orgasm": il.orgasm if il else None,
-            "orgasm_display": _rt("Yes") if il and il.orgasm else (_rt("No") if il and il.orgasm is False else None),
-            "quantity": il.quantity if il else None,
-        })
+    if log_data:
+        response_data.update(log_data)
 
     else:
         response_data.update({
@@ -649,18 +658,13 @@ def stats(request):
     if not user:
         return redirect('dashboard:partner_setup_page')
 
-    activity_metrics = get_intercourse_activity_metrics(user=user)
-    frequency_metrics = get_intercourse_frequency_metrics(user=user)
+    snapshot = get_stats_snapshot(user)
 
-    ctx['intercourse_count'] = activity_metrics['intercourse_count']
-    ctx['orgasm_percentage'] = activity_metrics['orgasm_percentage']
-    ctx['protected_count'] = activity_metrics['protected_count']
-    ctx['unprotected_count'] = activity_metrics['unprotected_count']
-    
-    ctx['frequency_intercourse'] = frequency_metrics['frequency_intercourse']
-    ctx['frequency_orgasm'] = frequency_metrics['frequency_orgasm']
+    # every dropdown range at once, the page switches between them without a round-trip
+    ctx.update(snapshot['intercourse_metrics']['1'])
+    ctx['intercourse_metrics'] = snapshot['intercourse_metrics']
 
-    ctx['cycle_length_distribution'] = get_cycle_length_distribution(user)
+    ctx['cycle_length_distribution'] = snapshot['cycle_length_distribution']
 
     return render(request, 'dashboard/stats/stats.html', ctx)
 
@@ -676,22 +680,25 @@ def ajax_load_stats(request):
     month_range= int(data.get('month_range', 1))
     type=str(data.get('type'))
 
+    metrics = get_stats_snapshot(user)['intercourse_metrics'].get(str(month_range))
+    if metrics is None:
+        # not one of the dropdown ranges
+        metrics = get_intercourse_metrics(user=user, month_range=month_range)
+
     response_data = {}
     if type == 'activity_dropdown':
-        activity_metrics = get_intercourse_activity_metrics(user=user, month_range=month_range)
         response_data.update({
-            'intercourse_count': activity_metrics['intercourse_count'],
-            'orgasm_percentage': activity_metrics['orgasm_percentage'],
-            'protected_count': activity_metrics['protected_count'],
-            'unprotected_count': activity_metrics['unprotected_count']
+            'intercourse_count': metrics['intercourse_count'],
+            'orgasm_percentage': metrics['orgasm_percentage'],
+            'protected_count': metrics['protected_count'],
+            'unprotected_count': metrics['unprotected_count']
 
         })
 
     elif type == 'frequency_dropdown':
-        frequency_metrics = get_intercourse_frequency_metrics(user=request.user, month_range=month_range)
         response_data.update({
-            'frequency_intercourse' : frequency_metrics['frequency_intercourse'],
-            'frequency_orgasm' : frequency_metrics['frequency_orgasm']
+            'frequency_intercourse' : metrics['frequency_intercourse'],
+            'frequency_orgasm' : metrics['frequency_orgasm']
         })
 
     return JsonResponse(response_data)
@@ -704,27 +711,12 @@ def ajax_get_top_symptoms(request):
     if not user:
         return JsonResponse({'error': 'No linked user'}, status=403)
 
-    from django.db.models import Count
-    from log_core.models import SymptomLog
-    # 1. Top 5 Symptoms
-    # Group by symptom name and count.
-    top_symptoms_qs = SymptomLog.objects.filter(log__user=user)\
-        .values('symptom__name')\
-        .annotate(count=Count('id'))\
-        .order_by('-count')[:5]
-        
     from django.utils.translation import gettext as _rt
-    results = []
-    
-    for item in top_symptoms_qs:
-        name = item['symptom__name']
-        count = item['count']
-        
-        results.append({
-            'name': _rt(name),
-            'count': count
-        })
-        
+    results = [
+        {'name': _rt(item['name']), 'count': item['count']}
+        for item in get_stats_snapshot(user)['top_symptoms']
+    ]
+
     return JsonResponse({'top_symptoms': results})
 
 
@@ -791,6 +783,20 @@ def ajax_analyze_item(request):
         'occurrences': occurrences
     })
 
+@user_type_required(['STANDARD', 'PREMIUM', 'PARTNER'])
+@configured_required
+@require_GET
+def ajax_item_heatmap(request):
+    user = _get_dashboard_user(request)
+    if not user:
+        return JsonResponse({'error': 'No linked user'}, status=403)
+
+    item_type = request.GET.get('item_type')
+    if item_type not in ITEM_TYPES:
+        return JsonResponse({'error': 'Invalid item type'}, status=400)
+
+    return JsonResponse(get_item_heatmap(user, item_type))
+
 @user_type_required(['STANDARD', 'PREMIUM', 'PARTNER'])
 @configured_required
 @require_POST
@@ -803,90 +809,37 @@ def ajax_search_logs(request):
     query = data.get('query')
 
     if not query:
-        return JsonResponse({'results': []})
-
-    logs = DailyLog.objects.filter(
-        user=user, 
-        note__icontains=query
-    ).order_by('-date')
-
-    results = []
-    for log in logs:
-        results.append({
-            'date': log.date.strftime('%Y-%m-%d'),
-            'note': log.note
-        })
+        return JsonResponse({'results': [], 'next_cursor': None})
 
-    return JsonResponse({'results': results})
+    try:
+        page = search_notes(user, query, cursor=data.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    return JsonResponse(page)
 
 @user_type_required(['STANDARD', 'PREMIUM'])
 @configured_required
 def backup_data(request):
+    # ?format=ndjson writes one record per line, ?compress=gzip gzips the stream.
+    # POST (settings page) prepares the file in a background job instead of streaming it.
     user = request.user
-    data = {
-        'cycle_details': {},
-        'cycle_stats': {},
-        'cycle_windows': [],
-        'daily_logs': []
-    }
-
-    # CycleDetails
-    cd = getattr(user, 'cycledetails', None)
-    if cd:
-        data['cycle_details'] = {
-            'base_menstruation_date': cd.base_menstruation_date.strftime('%Y-%m-%d'),
-            'avg_cycle_duration': cd.avg_cycle_duration,
-            'avg_menstruation_duration': cd.avg_menstruation_duration
-        }
-
-    # CycleStats
-    cs = getattr(user, 'cyclestats', None)
-    if cs:
-        data['cycle_stats'] = {
-            'avg_cycle_duration': cs.avg_cycle_duration,
-            'avg_menstruation_duration': cs.avg_menstruation_duration,
-            'avg_ovulation_start_day': cs.avg_ovulation_start_day,
-            'avg_ovulation_end_day': cs.avg_ovulation_end_day,
-            'log_count': cs.log_count
-        }
-
-    # CycleWindows
-    for cw in CycleWindow.objects.filter(user=user):
-        data['cycle_windows'].append({
-            'menstruation_start': cw.menstruation_start.strftime('%Y-%m-%d'),
-            'menstruation_end': cw.menstruation_end.strftime('%Y-%m-%d') if cw.menstruation_end else None,
-            'min_ovulation_window': cw.min_ovulation_window.strftime('%Y-%m-%d'),
-            'max_ovulation_window': cw.max_ovulation_window.strftime('%Y-%m-%d'),
-            'is_prediction': cw.is_prediction
-        })
+    params = request.POST if request.method == 'POST' else request.GET
+    backup_format = params.get('format', 'json')
+    if backup_format not in BACKUP_FORMATS:
+        backup_format = 'json'
+    compress = params.get('compress') == 'gzip'
 
-    # DailyLogs
-    for log in DailyLog.objects.filter(user=user):
-        log_data = {
-            'date': log.date.strftime('%Y-%m-%d'),
-            'note': log.note,
-            'flow': log.flow,
-            'weight': log.weight,
-            'temperature': log.temperature,
-            'ovulation_test': log.ovulation_test,
-            'symptoms': [s.name for s in log.symptoms_field.all()],
-            'moods': [m.name for m in log.moods_field.all()],
-            'medications': [med.name for med in log.medications_field.all()],
-        }
-        
-        il = getattr(log, 'intercourse', None)
-        if il:
-            log_data['intercourse'] = {
-                'protected': il.protected,
-                'orgasm': il.orgasm,
-                'quantity': il.quantity
-            }
-        
-        data['daily_logs'].append(log_data)
+    if request.method == 'POST':
+        enqueue_job(user, 'backup', {'format': backup_format, 'compress': compress})
+        messages.info(request, _("Your backup is being prepared, it can be downloaded from this page once ready."))
+        return redirect('dashboard:settings_page')
 
-    response_content = json.dumps(data, indent=4)
-    response = HttpResponse(response_content, content_type='application/json')
-    filename = f"florcycle_backup_{user.username}_{date.today()}.json"
+    response = StreamingHttpResponse(
+        iter_backup(user, backup_format, compress),
+        content_type='application/gzip' if compress else ('application/x-ndjson' if backup_format == 'ndjson' else 'application/json')
+    )
+    filename = f"florcycle_backup_{user.username}_{date.today()}.{backup_format}" + ('.gz' if compress else '')
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
@@ -894,133 +847,21 @@ def backup_data(request):
 @configured_required
 @require_POST
 def restore_data(request):
-    from django.db import transaction
-    from log_core.models import Symptom, Mood, Medication
-    
+    # the backup is validated and restored by a background job (job_core.handlers.restore_job)
     backup_file = request.FILES.get('backup_file')
     if not backup_file:
         messages.error(request, _("No backup file provided."))
         return redirect('dashboard:settings_page')
 
-    try:
-        data = json.load(backup_file)
-    except json.JSONDecodeError:
-        messages.error(request, _("Invalid JSON file."))
-        return redirect('dashboard:settings_page')
-
-    try:
-        with transaction.atomic():
-            user = request.user
-            
-            # Delete existing data to prevent duplicates/conflicts (Cascade will handle logs-intercourse relationship)
-            CycleWindow.objects.filter(user=user).delete()
-            DailyLog.objects.filter(user=user).delete()
-
-            # Restore CycleDetails
-            if data.get('cycle_details'):
-                cd_data = data['cycle_details']
-                CycleDetails.objects.update_or_create(
-                    user=user,
-                    defaults={
-                        'base_menstruation_date': datetime.strptime(cd_data['base_menstruation_date'], '%Y-%m-%d').date(),
-                        'avg_cycle_duration': cd_data['avg_cycle_duration'],
-                        'avg_menstruation_duration': cd_data['avg_menstruation_duration']
-                    }
-                )
-
-            # Restore CycleStats
-            if data.get('cycle_stats'):
-                cs_data = data['cycle_stats']
-                CycleStats.objects.update_or_create(
-                    user=user,
-                    defaults={
-                        'avg_cycle_duration': cs_data['avg_cycle_duration'],
-                        'avg_menstruation_duration': cs_data['avg_menstruation_duration'],
-                        'avg_ovulation_start_day': cs_data['avg_ovulation_start_day'],
-                        'avg_ovulation_end_day': cs_data['avg_ovulation_end_day'],
-                        'log_count': cs_data['log_count']
-                    }
-                )
-
-            # Restore CycleWindows
-            for cw_data in data.get('cycle_windows', []):
-                CycleWindow.objects.create(
-                    user=user,
-                    menstruation_start=datetime.strptime(cw_data['menstruation_start'], '%Y-%m-%d').date(),
-                    menstruation_end=datetime.strptime(cw_data['menstruation_end'], '%Y-%m-%d').date() if cw_data['menstruation_end'] else None,
-                    min_ovulation_window=datetime.strptime(cw_data['min_ovulation_window'], '%Y-%m-%d').date(),
-                    max_ovulation_window=datetime.strptime(cw_data['max_ovulation_window'], '%Y-%m-%d').date(),
-                    is_prediction=cw_data['is_prediction']
-                )
-
-            # Restore DailyLogs
-            for log_data in data.get('daily_logs', []):
-                daily_log = DailyLog.objects.create(
-                    user=user,
-                    date=datetime.strptime(log_data['date'], '%Y-%m-%d').date(),
-                    note=log_data.get('note'),
-                    flow=log_data.get('flow'),
-                    weight=log_data.get('weight'),
-                    temperature=log_data.get('temperature'),
-                    ovulation_test=log_data.get('ovulation_test')
-                )
-
-                # Restore Symptoms
-                for name in log_data.get('symptoms', []):
-                    symptom = Symptom.objects.filter(name=name).first()
-                    if symptom:
-                        daily_log.symptoms_field.add(symptom)
-
-                # Restore Moods
-                for name in log_data.get('moods', []):
-                    mood = Mood.objects.filter(name=name).first()
-                    if mood:
-                        daily_log.moods_field.add(mood)
-
-                # Restore Medications
-                for name in log_data.get('medications', []):
-                    med = Medication.objects.filter(name=name).first()
-                    if med:
-                        daily_log.medications_field.add(med)
-
-                # Restore IntercourseLog
-                il_data = log_data.get('intercourse')
-                if il_data:
-                    IntercourseLog.objects.create(
-                        log=daily_log,
-                        protected=il_data.get('protected'),
-                        orgasm=il_data.get('orgasm'),
-                        quantity=il_data.get('quantity')
-                    )
-
-        messages.success(request, _("Data restored successfully."))
-    except Exception as e:
-        messages.error(request, _("Restore failed: {error}").format(error=str(e)))
-
+    enqueue_job(request.user, 'restore', {'file': store_job_upload(backup_file)})
+    messages.info(request, _("Your backup is being restored, the result is shown on this page."))
     return redirect('dashboard:settings_page')
 
 @user_type_required(['STANDARD', 'PREMIUM'])
 @configured_required
 @require_POST
 def reset_data(request):
-    from django.db import transaction
-    user = request.user
-    
-    try:
-        with transaction.atomic():
-            # Delete all cycle-related data
-            CycleWindow.objects.filter(user=user).delete()
-            DailyLog.objects.filter(user=user).delete()
-            CycleDetails.objects.filter(user=user).delete()
-            CycleStats.objects.filter(user=user).delete()
-            
-            # Reset configuration status
-            profile = user.userprofile
-            profile.is_configured = False
-            profile.save()
-            
-        messages.success(request, _("All data has been reset. You can now start over."))
-        return redirect('dashboard:setup_page')
-    except Exception as e:
-        messages.error(request, _("Reset failed: {error}").format(error=str(e)))
-        return redirect('dashboard:settings_page')
\ No newline at end of file
+    # run by a background job, the settings page moves to the setup page once the data is gone
+    enqueue_job(request.user, 'reset')
+    messages.info(request, _("Your data is being reset."))
+    return redirect('dashboard:settings_page')
\ No newline at end of file
@@ -0,0 +1,258 @@
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.models import signals as model_signals
+from django.template.backends.django import Template
+
+# Opt-in request profiler (settings.PROFILING). A sampled request records its SQL queries, the time spent in the
+# model signal receivers of the profiled apps and in template rendering. The breakdown is sent back in a
+# Server-Timing header and kept in a rolling in-memory history, aggregated per view by profiling_stats (staff only).
+# The history is per process.
+DEFAULT_PROFILING = {
+    'ENABLED': False,
+    # share of the requests profiled, staff can force a request with ?profile=1
+    'SAMPLE_RATE': 0.01,
+    'TOP_QUERIES': 5,
+    'HISTORY': 500,
+    'SIGNAL_APPS': ('cycle_core', 'calendar_core', 'notifications'),
+}
+
+PROFILED_SIGNALS = (
+    model_signals.pre_save, model_signals.post_save,
+    model_signals.pre_delete, model_signals.post_delete,
+    model_signals.m2m_changed,
+)
+
+_current = ContextVar('florcycle_profile', default=None)
+_history = deque(maxlen=DEFAULT_PROFILING['HISTORY'])
+_history_lock = threading.Lock()
+
+
+def get_profiling_settings() -> dict:
+    return {**DEFAULT_PROFILING, **getattr(settings, 'PROFILING', {})}
+
+
+class RequestProfile():
+    def __init__(self, top_queries):
+        self.top_queries = top_queries
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.queries = []  # (duration, sql) of the slowest queries
+        self.signal_time = 0.0
+        self.signals = {}
+        self.template_time = 0.0
+        self._template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.addQuery(sql, time.perf_counter() - started)
+
+    def addQuery(self, sql, duration):
+        self.sql_count += 1
+        self.sql_time += duration
+        self.queries.append((duration, sql))
+        if len(self.queries) > self.top_queries:
+            self.queries.sort(key=lambda q: q[0], reverse=True)
+            del self.queries[self.top_queries:]
+
+    def addSignal(self, name, duration):
+        self.signal_time += duration
+        self.signals[name] = self.signals.get(name, 0.0) + duration
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        self.queries.sort(key=lambda q: q[0], reverse=True)
+
+    def serverTiming(self):
+        return ', '.join([
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+            f'signals;dur={self.signal_time * 1000:.1f}',
+            f'templates;dur={self.template_time * 1000:.1f}',
+            f'total;dur={self.total * 1000:.1f}',
+        ])
+
+    def asDict(self):
+        return {
+            'total_ms': round(self.total * 1000, 2),
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'signals_ms': round(self.signal_time * 1000, 2),
+            'signals': {name: round(duration * 1000, 2) for name, duration in self.signals.items()},
+            'templates_ms': round(self.template_time * 1000, 2),
+            'slowest_queries': [{'ms': round(duration * 1000, 2), 'sql': sql} for duration, sql in self.queries],
+        }
+
+
+def _profile_receiver(receiver):
+    if getattr(receiver, '_profiled', False):
+        return receiver
+    name = f'{receiver.__module__}.{receiver.__qualname__}'
+
+    @wraps(receiver)
+    def profiled(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return receiver(*args, **kwargs)
+
+        started = time.perf_counter()
+        try:
+            return receiver(*args, **kwargs)
+        finally:
+            profile.addSignal(name, time.perf_counter() - started)
+
+    profiled._profiled = True
+    return profiled
+
+
+def install_signal_profiling(apps):
+    # Swaps the receivers of the profiled apps for timing wrappers (strong references, same lookup keys,
+    # so disconnect() keeps working). Outside a profiled request the wrapper only costs a ContextVar lookup.
+    for signal in PROFILED_SIGNALS:
+        with signal.lock:
+            for i, (lookup_key, receiver, is_async) in enumerate(signal.receivers):
+                if is_async:
+                    continue
+                if isinstance(receiver, weakref.ReferenceType):
+                    receiver = receiver()
+                if receiver is None or getattr(receiver, '__module__', '').split('.')[0] not in apps:
+                    continue
+                signal.receivers[i] = (lookup_key, _profile_receiver(receiver), is_async)
+            signal.sender_receivers_cache.clear()
+
+
+_template_render = Template.render
+
+
+def _profiled_template_render(self, context=None, request=None):
+    profile = _current.get()
+    if profile is None:
+        return _template_render(self, context, request)
+
+    # {% include %} renders nested templates: only the outermost render is timed
+    profile._template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _template_render(self, context, request)
+    finally:
+        profile._template_depth -= 1
+        if not profile._template_depth:
+            profile.template_time += time.perf_counter() - started
+
+
+class ProfilingMiddleware():
+    def __init__(self, get_response):
+        config = get_profiling_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.sample_rate = config['SAMPLE_RATE']
+        self.top_queries = config['TOP_QUERIES']
+        if _history.maxlen != config['HISTORY']:
+            resize_history(config['HISTORY'])
+
+        install_signal_profiling(config['SIGNAL_APPS'])
+        Template.render = _profiled_template_render
+
+    def __call__(self, request):
+        if not self.isSampled(request):
+            return self.get_response(request)
+
+        profile = RequestProfile(self.top_queries)
+        token = _current.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        profile.finish()
+        response['Server-Timing'] = profile.serverTiming()
+        record_profile(request, response, profile)
+        return response
+
+    def isSampled(self, request):
+        if request.GET.get('profile') == '1' and getattr(request, 'user', None) and request.user.is_staff:
+            return True
+        return random.random() < self.sample_rate
+
+
+def resize_history(size):
+    global _history
+    with _history_lock:
+        _history = deque(_history, maxlen=size)
+
+
+def record_profile(request, response, profile):
+    match = request.resolver_match
+    entry = {
+        'view': match.view_name if match else request.path,
+        'method': request.method,
+        'status': response.status_code,
+        **profile.asDict(),
+    }
+    with _history_lock:
+        _history.append(entry)
+
+
+def clear_profiles():
+    with _history_lock:
+        _history.clear()
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def get_profile_stats() -> dict:
+    # Aggregates the rolling history per view, slowest views first.
+    with _history_lock:
+        entries = list(_history)
+
+    views = {}
+    for entry in entries:
+        views.setdefault(entry['view'], []).append(entry)
+
+    stats = []
+    for view, view_entries in views.items():
+        totals = [e['total_ms'] for e in view_entries]
+        slowest = sorted((q for e in view_entries for q in e['slowest_queries']), key=lambda q: q['ms'], reverse=True)
+        signals = {}
+        for e in view_entries:
+            for name, duration in e['signals'].items():
+                signals[name] = signals.get(name, 0.0) + duration
+
+        stats.append({
+            'view': view,
+            'requests': len(view_entries),
+            'avg_ms': round(sum(totals) / len(totals), 2),
+            'p95_ms': _percentile(totals, 95),
+            'max_ms': max(totals),
+            'avg_sql_count': round(sum(e['sql_count'] for e in view_entries) / len(view_entries), 1),
+            'avg_sql_ms': round(sum(e['sql_ms'] for e in view_entries) / len(view_entries), 2),
+            'avg_signals_ms': round(sum(e['signals_ms'] for e in view_entries) / len(view_entries), 2),
+            'avg_templates_ms': round(sum(e['templates_ms'] for e in view_entries) / len(view_entries), 2),
+            'signals_ms': {name: round(duration, 2) for name, duration in sorted(signals.items(), key=lambda s: s[1], reverse=True)},
+            'slowest_queries': slowest[:get_profiling_settings()['TOP_QUERIES']],
+        })
+
+    stats.sort(key=lambda s: s['avg_ms'], reverse=True)
+    return {'requests': len(entries), 'views': stats}
\ No newline at end of file
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'calendar_core',
     'users.apps.UsersConfig',
     'notifications',
+    'job_core',
 ]
 
 MIDDLEWARE = [
@@ -60,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'florcycle.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'florcycle.urls'
@@ -95,6 +97,42 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Used for the per-user predictions (cycle_core.prediction_cache). The cache must be shared by every
+# process (web workers and run_workers), otherwise invalidations don't reach the other processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    }
+}
+
+
+# Background jobs (job_core), run by `manage.py run_workers`
+
+JOB_WORKERS = 2
+# job results (e.g. backups) are personal data: outside MEDIA_ROOT
+JOB_RESULTS_ROOT = BASE_DIR / 'job_results'
+# seconds without heartbeat after which a RUNNING job is failed (its worker was killed)
+JOB_STALE_TIMEOUT = 600
+# finished jobs and their result files are deleted after this many days
+JOB_RETENTION_DAYS = 7
+
+
+# Request profiling (florcycle.profiling): Server-Timing header and /profiling/ stats for staff.
+# Opt-in; with a low SAMPLE_RATE it can stay enabled in production.
+
+PROFILING = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.01,
+    'TOP_QUERIES': 5,
+    'HISTORY': 500,
+    'SIGNAL_APPS': ('cycle_core', 'calendar_core', 'notifications'),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
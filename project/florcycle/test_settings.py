@@ -0,0 +1,9 @@
+# Settings of `manage.py test` (picked by manage.py). The suite clears the cache between tests: it runs on an
+# in-memory cache instead of the development cache directory, and no version stamp survives a run.
+from .settings import *  # noqa
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
\ No newline at end of file
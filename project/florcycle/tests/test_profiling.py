@@ -0,0 +1,84 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from datetime import date, timedelta
+
+from cycle_core.models import CycleDetails, CycleWindow
+from florcycle.profiling import DEFAULT_PROFILING, RequestProfile, install_signal_profiling, clear_profiles, get_profile_stats, _current
+
+User = get_user_model()
+
+PROFILE_EVERYTHING = {**DEFAULT_PROFILING, 'ENABLED': True, 'SAMPLE_RATE': 1.0}
+
+
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        clear_profiles()
+        self.user = User.objects.create_user(username='testuser', password='pass', email='test@example.com')
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date.today() - timedelta(days=10))
+        profile = self.user.userprofile
+        profile.is_configured = True
+        profile.save()
+
+        self.staff = User.objects.create_user(username='staff', password='pass', email='staff@example.com', is_staff=True)
+
+    @override_settings(PROFILING=PROFILE_EVERYTHING)
+    def test_sampled_request(self):
+        self.client.login(username='testuser', password='pass')
+        response = self.client.get(reverse('dashboard:homepage'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^sql;dur=[\d.]+;desc="\d+ queries", signals;dur=[\d.]+, templates;dur=[\d.]+, total;dur=[\d.]+$')
+
+        stats = get_profile_stats()
+        self.assertEqual(stats['requests'], 1)
+        view = stats['views'][0]
+        self.assertEqual((view['view'], view['requests']), ('dashboard:homepage', 1))
+        self.assertGreater(view['avg_sql_count'], 0)
+        self.assertGreater(view['avg_templates_ms'], 0)
+        self.assertLessEqual(len(view['slowest_queries']), DEFAULT_PROFILING['TOP_QUERIES'])
+
+    @override_settings(PROFILING={**PROFILE_EVERYTHING, 'SAMPLE_RATE': 0})
+    def test_sampling(self):
+        self.client.login(username='testuser', password='pass')
+        self.assertNotIn('Server-Timing', self.client.get(reverse('dashboard:homepage'), {'profile': 1}))
+
+        # staff can force a profile
+        self.client.login(username='staff', password='pass')
+        self.assertIn('Server-Timing', self.client.get(reverse('root'), {'profile': 1}))
+
+    def test_disabled_by_default(self):
+        self.client.login(username='testuser', password='pass')
+        self.assertNotIn('Server-Timing', self.client.get(reverse('dashboard:homepage')))
+
+    @override_settings(PROFILING=PROFILE_EVERYTHING)
+    def test_stats_endpoint_is_staff_only(self):
+        self.client.login(username='testuser', password='pass')
+        self.assertEqual(self.client.get(reverse('profiling_stats')).status_code, 302)
+
+        self.client.login(username='staff', password='pass')
+        self.client.get(reverse('root'))
+        stats = self.client.get(reverse('profiling_stats')).json()
+        self.assertIn('root', [view['view'] for view in stats['views']])
+
+    def test_signal_receivers_are_timed(self):
+        install_signal_profiling(DEFAULT_PROFILING['SIGNAL_APPS'])
+        profile = RequestProfile(top_queries=3)
+
+        token = _current.set(profile)
+        try:
+            start = date.today() - timedelta(days=40)
+            CycleWindow.objects.create(
+                user=self.user,
+                menstruation_start=start,
+                menstruation_end=start + timedelta(days=4),
+                min_ovulation_window=start + timedelta(days=12),
+                max_ovulation_window=start + timedelta(days=16),
+                is_prediction=False
+            )
+        finally:
+            _current.reset(token)
+
+        self.assertGreater(profile.signal_time, 0)
+        self.assertTrue(any(name.startswith('cycle_core.signals.') for name in profile.signals))
+        self.assertTrue(any(name.startswith('calendar_core.signals.') for name in profile.signals))
\ No newline at end of file
@@ -23,6 +23,7 @@ from django.conf.urls.static import static
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.root_redirect, name='root'),
+    path('profiling/', views.profiling_stats, name='profiling_stats'),
     path('i18n/', include('django.conf.urls.i18n')),
     path('cycle-core/', include('cycle_core.urls')),
     path('guest-mode/', include('guest_mode.urls')),
@@ -31,4 +32,5 @@ urlpatterns = [
     path('dashboard/', include('dashboard.urls')),
     path('forums/', include('forum_core.urls')),
     path('notifications/', include('notifications.urls')),
+    path('jobs/', include('job_core.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
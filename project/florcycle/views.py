@@ -1,6 +1,10 @@
 from django.shortcuts import redirect
+from django.http import JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.db.utils import OperationalError
 
+from .profiling import get_profile_stats
+
 def root_redirect(request):
     """
     Redirects users based on their authentication status and user type.
@@ -28,3 +32,9 @@ def root_redirect(request):
         
     # Fallback
     return redirect('dashboard:homepage')
+
+
+@staff_member_required
+def profiling_stats(request):
+    # Rolling request profiles of this process (florcycle.profiling), aggregated per view.
+    return JsonResponse(get_profile_stats())
\ No newline at end of file
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class JobCoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'job_core'
+
+    def ready(self):
+        import job_core.handlers
\ No newline at end of file
@@ -0,0 +1,78 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.utils import timezone
+
+from .services import register_job
+from .models import job_result_storage
+from dashboard.backup import iter_backup, load_backup, validate_backup, restore_backup, BACKUP_FORMATS
+from dashboard.services import reset_user_data
+from dashboard.analytics_snapshot import REFRESH_JOB, refresh_analytics_snapshot
+from cycle_core.batching import refresh_cycle_data
+from notifications.services import FAN_OUT_JOB, fan_out_notification
+
+# Per-user operations that can run in `manage.py run_workers` instead of the request thread.
+# Every handler receives the Job and a JobProgress, and returns the job's result dict.
+
+
+@register_job('backup')
+def backup_job(job, progress):
+    backup_format = job.payload.get('format', 'json')
+    if backup_format not in BACKUP_FORMATS:
+        backup_format = 'json'
+    compress = bool(job.payload.get('compress'))
+
+    filename = f"florcycle_backup_{job.user.username}_{timezone.localdate()}.{backup_format}" + ('.gz' if compress else '')
+    size = 0
+    with tempfile.TemporaryFile() as tmp:
+        for chunk in iter_backup(job.user, backup_format, compress, progress=progress):
+            tmp.write(chunk)
+            size += len(chunk)
+        tmp.seek(0)
+        job.result_file.save(filename, File(tmp), save=False)
+
+    job.save(update_fields=['result_file'])
+    return {'filename': filename, 'size': size}
+
+
+@register_job('restore')
+def restore_job(job, progress):
+    # the uploaded backup, stored by job_core.views.enqueue
+    storage = job_result_storage()
+    name = job.payload.get('file')
+    try:
+        with storage.open(name, 'rb') as backup_file:
+            data = validate_backup(load_backup(backup_file))
+        return restore_backup(job.user, data, progress=progress)
+    finally:
+        if name:
+            storage.delete(name)
+
+
+@register_job('reset')
+def reset_job(job, progress):
+    reset_user_data(job.user)
+    return {}
+
+
+@register_job('recompute_stats')
+def recompute_stats_job(job, progress):
+    refresh_cycle_data(job.user)
+    return {}
+
+
+@register_job(REFRESH_JOB)
+def refresh_analytics_job(job, progress):
+    # queued by dashboard.analytics_snapshot, at most one pending per user
+    return {'rebuilt': refresh_analytics_snapshot(job.user)}
+
+
+@register_job(FAN_OUT_JOB)
+def fan_out_notification_job(job, progress):
+    # queued by notifications.services.fan_out_notification for large recipient lists
+    payload = job.payload
+    # recipients deleted since
+    user_ids = get_user_model().objects.filter(id__in=payload['user_ids']).values_list('id', flat=True)
+    notified = fan_out_notification(user_ids, payload['title'], payload['message'], payload['notification_type'], link=payload.get('link'))
+    return {'notified': notified}
\ No newline at end of file
@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from job_core.services import (
+    claim_next_job, run_job, fail_job, get_worker_name, send_heartbeats, fail_stale_jobs, purge_finished_jobs, HEARTBEAT_INTERVAL
+)
+
+
+def _init_worker():
+    # spawned interpreters start without the app registry
+    import django
+    django.setup()
+
+
+def _run_job(job_id):
+    try:
+        return run_job(job_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Runs the queued jobs (job_core.Job) with a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'JOB_WORKERS', None) or os.cpu_count(),
+                            help='Size of the process pool, 0 runs the jobs in this process.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between two polls of an empty queue.')
+
+    def handle(self, *args, **options):
+        workers = max(0, options['workers'])
+        self.once = options['once']
+        self.poll_interval = options['poll_interval']
+        self.worker_name = get_worker_name()
+        self.maintained_at = None
+
+        self.stdout.write(f'Running jobs with {workers or "no"} worker processes ({self.worker_name})')
+        try:
+            if workers:
+                self.runPool(workers)
+            else:
+                self.runInline()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
+
+    def maintain(self, running_ids=()):
+        # every HEARTBEAT_INTERVAL: heartbeats of the jobs run by the pool, then the queue housekeeping
+        # (jobs left RUNNING by killed workers, finished jobs past their retention)
+        now = time.monotonic()
+        if self.maintained_at is not None and now - self.maintained_at < HEARTBEAT_INTERVAL:
+            return
+        self.maintained_at = now
+
+        send_heartbeats(list(running_ids))
+        stale = fail_stale_jobs()
+        if stale:
+            self.stdout.write(f'{stale} stale jobs failed')
+        purge_finished_jobs()
+
+    def runInline(self):
+        # the running job sends its heartbeats through JobProgress
+        while True:
+            self.maintain()
+            job = claim_next_job(self.worker_name)
+            if job is None:
+                if self.once:
+                    return
+                time.sleep(self.poll_interval)
+                continue
+
+            self.report(job.id, run_job(job.id))
+
+    def runPool(self, workers):
+        # The main process claims the jobs, the pool runs them. Spawned workers don't inherit
+        # the parent's database connections.
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+            running = {}  # future -> job id
+            while True:
+                self.maintain(running.values())
+                while len(running) < workers:
+                    job = claim_next_job(self.worker_name)
+                    if job is None:
+                        break
+                    running[pool.submit(_run_job, job.id)] = job.id
+
+                if not running:
+                    if self.once:
+                        return
+                    time.sleep(self.poll_interval)
+                    continue
+
+                done, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        status = future.result()
+                    except Exception as e:
+                        # the worker process died, the job can't have recorded its outcome
+                        fail_job(job_id, repr(e))
+                        status = 'FAILED'
+                    self.report(job_id, status)
+
+    def report(self, job_id, status):
+        self.stdout.write(f'Job {job_id}: {status}')
\ No newline at end of file
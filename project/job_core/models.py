@@ -0,0 +1,65 @@
+from django.db import models
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.translation import gettext_lazy as _
+
+
+def job_result_storage():
+    # results hold personal data: kept outside MEDIA_ROOT, served by job_core.views.download_job_result
+    return FileSystemStorage(location=settings.JOB_RESULTS_ROOT)
+
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', _('Pending')),
+        ('RUNNING', _('Running')),
+        ('DONE', _('Done')),
+        ('FAILED', _('Failed')),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='jobs', verbose_name=_("User"))
+    kind = models.CharField(max_length=50, verbose_name=_("Kind"))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', verbose_name=_("Status"))
+
+    payload = models.JSONField(default=dict, blank=True, verbose_name=_("Payload"))
+    result = models.JSONField(default=dict, blank=True, verbose_name=_("Result"))
+    result_file = models.FileField(storage=job_result_storage, upload_to='%Y/%m/', blank=True, verbose_name=_("Result file"))
+    error = models.TextField(blank=True, verbose_name=_("Error"))
+
+    # 0-100, updated by the handler through JobProgress
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name=_("Progress"))
+    progress_message = models.CharField(max_length=255, blank=True, verbose_name=_("Progress message"))
+
+    worker = models.CharField(max_length=100, blank=True, verbose_name=_("Worker"))
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    # refreshed while the job runs, a RUNNING job without heartbeats lost its worker
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+        verbose_name = _("Job")
+        verbose_name_plural = _("Jobs")
+
+    # the kinds users enqueue, the others are internal
+    USER_KIND_LABELS = {
+        'backup': _('Backup'),
+        'restore': _('Restore'),
+        'reset': _('Data reset'),
+        'recompute_stats': _('Stats recompute'),
+    }
+
+    def isFinished(self):
+        return self.status in ('DONE', 'FAILED')
+
+    def getKindDisplay(self):
+        return self.USER_KIND_LABELS.get(self.kind, self.kind)
+
+    def getErrorSummary(self):
+        # the traceback stays server-side
+        return self.error.strip().splitlines()[-1] if self.error else ''
+
+    def __str__(self):
+        return f"{self.user} - {self.kind} ({self.status})"
\ No newline at end of file
@@ -0,0 +1,160 @@
+import os
+import socket
+import traceback
+from uuid import uuid4
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job, job_result_storage
+
+# Database-backed job queue: views enqueue Job rows, `manage.py run_workers` claims and runs them.
+# Claiming is a conditional UPDATE, so it works on SQLite without SELECT ... FOR UPDATE or a broker.
+# Running jobs send heartbeats: the ones left RUNNING by a killed worker are failed once stale, and the
+# finished jobs are purged after JOB_RETENTION_DAYS.
+
+HEARTBEAT_INTERVAL = 30  # seconds
+
+# kind -> handler(job, progress) returning the job's result dict
+JOB_HANDLERS = {}
+
+
+def register_job(kind):
+    def decorator(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+class JobProgress():
+    # Callable handed to the handlers: progress(done, total, message='').
+    # Only writes when the percentage or the message change, or a heartbeat is due.
+    def __init__(self, job):
+        self.job = job
+        self.percent = job.progress
+        self.message = job.progress_message
+        self.beat_at = timezone.now()
+
+    def __call__(self, done, total, message=''):
+        percent = min(100, done * 100 // total) if total else 0
+        now = timezone.now()
+        if percent == self.percent and message == self.message and now - self.beat_at < timedelta(seconds=HEARTBEAT_INTERVAL):
+            return
+
+        self.percent, self.message, self.beat_at = percent, message, now
+        Job.objects.filter(pk=self.job.pk).update(progress=percent, progress_message=message[:255], heartbeat_at=now)
+
+
+def get_worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue_job(user, kind, payload=None):
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    return Job.objects.create(user=user, kind=kind, payload=payload or {})
+
+
+def store_job_upload(upload) -> str:
+    # Uploads waiting for a worker (restore backups) are kept in the job results storage, their job deletes them.
+    # Returns the name to put in the job payload.
+    return job_result_storage().save(f'uploads/{uuid4().hex}', upload)
+
+
+def enqueue_job_once(user_id, kind, payload=None):
+    # At most one queued job of kind per user: a job not claimed yet covers the new request (e.g. refreshes
+    # after a burst of changes). Returns the queued job.
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    # two concurrent callers may both queue one: the second job finds the work done
+    job = Job.objects.filter(user_id=user_id, kind=kind, status='PENDING').first()
+    if job is None:
+        job = Job.objects.create(user_id=user_id, kind=kind, payload=payload or {})
+    return job
+
+
+def claim_next_job(worker_name=None):
+    # Marks the oldest pending job as running and returns it, None when the queue is empty.
+    # Another worker may win the race for a job: the update then matches no row and the next one is tried.
+    while True:
+        job_id = Job.objects.filter(status='PENDING').order_by('created_at', 'id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+
+        now = timezone.now()
+        claimed = Job.objects.filter(id=job_id, status='PENDING').update(
+            status='RUNNING',
+            worker=worker_name or get_worker_name(),
+            started_at=now,
+            heartbeat_at=now
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+
+
+def run_job(job_id):
+    # Runs a claimed job in the current process, records its result or error.
+    job = Job.objects.select_related('user').get(id=job_id)
+    handler = JOB_HANDLERS.get(job.kind)
+
+    try:
+        if handler is None:
+            raise ValueError(f'Unknown job kind: {job.kind}')
+        result = handler(job, JobProgress(job))
+    except Exception:
+        fail_job(job.id, traceback.format_exc())
+        return 'FAILED'
+
+    Job.objects.filter(id=job.id).update(
+        status='DONE',
+        result=result or {},
+        progress=100,
+        finished_at=timezone.now()
+    )
+    return 'DONE'
+
+
+def fail_job(job_id, error):
+    Job.objects.filter(id=job_id).exclude(status='DONE').update(
+        status='FAILED',
+        error=error,
+        finished_at=timezone.now()
+    )
+
+
+def send_heartbeats(job_ids):
+    if job_ids:
+        Job.objects.filter(id__in=job_ids, status='RUNNING').update(heartbeat_at=timezone.now())
+
+
+def fail_stale_jobs(timeout=None) -> int:
+    # Fails the RUNNING jobs without heartbeat for timeout seconds (JOB_STALE_TIMEOUT): their worker was killed.
+    # They aren't requeued, a handler stopped half way (e.g. a restore) isn't safe to run again.
+    timeout = settings.JOB_STALE_TIMEOUT if timeout is None else timeout
+    limit = timezone.now() - timedelta(seconds=timeout)
+    # jobs claimed before the heartbeats were recorded go by started_at
+    stale = Q(heartbeat_at__lt=limit) | Q(heartbeat_at__isnull=True, started_at__lt=limit)
+    return Job.objects.filter(stale, status='RUNNING').update(
+        status='FAILED',
+        error='Worker lost: no heartbeat',
+        finished_at=timezone.now()
+    )
+
+
+def purge_finished_jobs(days=None) -> int:
+    # Deletes the DONE and FAILED jobs finished more than days (JOB_RETENTION_DAYS) ago, with their files.
+    days = settings.JOB_RETENTION_DAYS if days is None else days
+    jobs = Job.objects.filter(status__in=['DONE', 'FAILED'], finished_at__lt=timezone.now() - timedelta(days=days))
+
+    job_ids = []
+    for job in jobs.only('id', 'payload', 'result_file').iterator():
+        if job.result_file:
+            job.result_file.delete(save=False)
+        # restore uploads left by a killed worker
+        if job.payload.get('file'):
+            job.result_file.storage.delete(job.payload['file'])
+        job_ids.append(job.id)
+    Job.objects.filter(id__in=job_ids).delete()
+    return len(job_ids)
\ No newline at end of file
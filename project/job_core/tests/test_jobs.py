@@ -0,0 +1,178 @@
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.utils import timezone
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import patch
+import json
+import shutil
+import tempfile
+
+from cycle_core.models import CycleDetails, CycleWindow
+from log_core.models import DailyLog
+from job_core.models import Job, job_result_storage
+from job_core.services import enqueue_job, claim_next_job, run_job, register_job, send_heartbeats, fail_stale_jobs, purge_finished_jobs, JOB_HANDLERS
+
+User = get_user_model()
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        self.results_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.results_root)
+        settings_override = override_settings(JOB_RESULTS_ROOT=self.results_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='testuser', password='pass')
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date(2025, 1, 1))
+        profile = self.user.userprofile
+        profile.is_configured = True
+        profile.save()
+
+        for i in range(3):
+            DailyLog.objects.create(user=self.user, date=date(2025, 1, 1) + timedelta(days=i), note=f'note {i}')
+
+    def test_claim_is_exclusive_and_ordered(self):
+        first = enqueue_job(self.user, 'recompute_stats')
+        second = enqueue_job(self.user, 'recompute_stats')
+
+        claimed = claim_next_job('worker-a')
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual((claimed.status, claimed.worker), ('RUNNING', 'worker-a'))
+
+        self.assertEqual(claim_next_job('worker-b').id, second.id)
+        self.assertIsNone(claim_next_job('worker-c'))
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            enqueue_job(self.user, 'nope')
+
+    def test_backup_job(self):
+        job = enqueue_job(self.user, 'backup', {'format': 'ndjson'})
+        self.assertEqual(run_job(claim_next_job().id), 'DONE')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress), ('DONE', 100))
+        self.assertTrue(job.result['filename'].endswith('.ndjson'))
+
+        with job.result_file.open('rb') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(sum(1 for line in lines if b'daily_log' in line), 3)
+
+    def test_failed_job_records_error(self):
+        @register_job('broken')
+        def broken_job(job, progress):
+            progress(1, 2, 'half way')
+            raise RuntimeError('boom')
+        self.addCleanup(JOB_HANDLERS.pop, 'broken')
+
+        job = enqueue_job(self.user, 'broken')
+        self.assertEqual(run_job(claim_next_job().id), 'FAILED')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.progress_message), ('FAILED', 50, 'half way'))
+        self.assertIn('RuntimeError: boom', job.error)
+
+    def test_stale_running_jobs_fail(self):
+        lost = enqueue_job(self.user, 'recompute_stats')
+        alive = enqueue_job(self.user, 'recompute_stats')
+        claim_next_job('killed-worker')
+        claim_next_job('worker')
+        Job.objects.update(heartbeat_at=timezone.now() - timedelta(seconds=120))
+        send_heartbeats([alive.id])
+
+        self.assertEqual(fail_stale_jobs(timeout=60), 1)
+        self.assertEqual(Job.objects.get(id=lost.id).status, 'FAILED')
+        self.assertEqual(Job.objects.get(id=alive.id).status, 'RUNNING')
+
+    def test_purge_finished_jobs(self):
+        old = enqueue_job(self.user, 'backup')
+        run_job(claim_next_job().id)
+        recent = enqueue_job(self.user, 'backup')
+        run_job(claim_next_job().id)
+        pending = enqueue_job(self.user, 'backup')
+        Job.objects.filter(id=old.id).update(finished_at=timezone.now() - timedelta(days=8))
+        old.refresh_from_db()
+        storage = old.result_file.storage
+        self.assertTrue(storage.exists(old.result_file.name))
+
+        self.assertEqual(purge_finished_jobs(days=7), 1)
+        self.assertFalse(storage.exists(old.result_file.name))
+        self.assertEqual(set(Job.objects.values_list('id', flat=True)), {recent.id, pending.id})
+
+    def test_run_workers_inline(self):
+        enqueue_job(self.user, 'reset')
+        out = StringIO()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('run_workers', workers=0, once=True, stdout=out)
+
+        self.assertIn(': DONE', out.getvalue())
+        self.assertFalse(DailyLog.objects.filter(user=self.user).exists())
+        self.assertFalse(CycleDetails.objects.filter(user=self.user).exists())
+
+
+class JobEndpointsTest(TestCase):
+    def setUp(self):
+        self.results_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.results_root)
+        settings_override = override_settings(JOB_RESULTS_ROOT=self.results_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='testuser', password='pass', email='test@example.com')
+        self.other = User.objects.create_user(username='other', password='pass', email='other@example.com')
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date(2025, 1, 1))
+        profile = self.user.userprofile
+        profile.is_configured = True
+        profile.save()
+        self.client.login(username='testuser', password='pass')
+
+    def test_enqueue_poll_download(self):
+        response = self.client.post(reverse('job_core:enqueue', args=['backup']), {'compress': 'gzip'})
+        self.assertEqual(response.status_code, 202)
+        job_data = response.json()
+        self.assertEqual(job_data['status'], 'PENDING')
+
+        run_job(claim_next_job().id)
+
+        job_data = self.client.get(job_data['poll_url']).json()
+        self.assertEqual((job_data['status'], job_data['progress']), ('DONE', 100))
+
+        download = self.client.get(job_data['download_url'])
+        self.assertEqual(download.status_code, 200)
+        self.assertIn('.json.gz', download['Content-Disposition'])
+
+    def test_enqueue_restore(self):
+        backup = {'cycle_details': {}, 'cycle_stats': {}, 'cycle_windows': [], 'daily_logs': [{'date': '2025-01-05', 'note': 'restored'}]}
+        backup_file = SimpleUploadedFile('backup.json', json.dumps(backup).encode())
+
+        response = self.client.post(reverse('job_core:enqueue', args=['restore']), {'backup_file': backup_file})
+        self.assertEqual(response.status_code, 202)
+        # the payload only holds the path of the stored upload
+        upload = Job.objects.get(id=response.json()['id']).payload['file']
+        storage = job_result_storage()
+        self.assertTrue(storage.exists(upload))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(run_job(claim_next_job().id), 'DONE')
+        self.assertEqual(DailyLog.objects.get(user=self.user).note, 'restored')
+        self.assertEqual(Job.objects.get(id=response.json()['id']).result['daily_logs'], 1)
+        self.assertFalse(storage.exists(upload))
+
+    def test_enqueue_requires_configuration(self):
+        self.client.login(username='other', password='pass')
+        response = self.client.post(reverse('job_core:enqueue', args=['reset']))
+        self.assertRedirects(response, reverse('dashboard:setup_page'), fetch_redirect_response=False)
+        self.assertFalse(Job.objects.exists())
+
+    def test_jobs_are_private(self):
+        job = enqueue_job(self.other, 'recompute_stats')
+        self.assertEqual(self.client.get(reverse('job_core:job_status', args=[job.id])).status_code, 404)
+
+    def test_unknown_kind(self):
+        self.assertEqual(self.client.post(reverse('job_core:enqueue', args=['broken'])).status_code, 404)
\ No newline at end of file
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = 'job_core'
+
+urlpatterns = [
+    path('enqueue/<str:kind>/', views.enqueue, name='enqueue'),
+    path('<int:job_id>/', views.job_status, name='job_status'),
+    path('<int:job_id>/download/', views.download_job_result, name='download_job_result'),
+]
\ No newline at end of file
@@ -0,0 +1,72 @@
+from django.http import JsonResponse, FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_POST, require_GET
+
+from dashboard.services import user_type_required, configured_required
+from .models import Job
+from .services import enqueue_job, store_job_upload
+
+USER_JOB_KINDS = tuple(Job.USER_KIND_LABELS)
+
+
+def _job_data(job):
+    data = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'progress_message': job.progress_message,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'poll_url': reverse('job_core:job_status', args=[job.id]),
+    }
+
+    if job.status == 'DONE':
+        data['result'] = job.result
+        if job.result_file:
+            data['download_url'] = reverse('job_core:download_job_result', args=[job.id])
+    elif job.status == 'FAILED':
+        data['error'] = job.getErrorSummary()
+
+    return data
+
+
+@user_type_required(['STANDARD', 'PREMIUM'])
+@configured_required
+@require_POST
+def enqueue(request, kind):
+    if kind not in USER_JOB_KINDS:
+        raise Http404
+
+    payload = {}
+    if kind == 'backup':
+        payload = {'format': request.POST.get('format', 'json'), 'compress': request.POST.get('compress') == 'gzip'}
+    elif kind == 'restore':
+        backup_file = request.FILES.get('backup_file')
+        if not backup_file:
+            return JsonResponse({'error': 'No backup file provided.'}, status=400)
+        # validated by the job
+        payload = {'file': store_job_upload(backup_file)}
+
+    job = enqueue_job(request.user, kind, payload)
+    return JsonResponse(_job_data(job), status=202)
+
+
+@user_type_required(['STANDARD', 'PREMIUM'])
+@require_GET
+def job_status(request, job_id):
+    job = get_object_or_404(Job, id=job_id, user=request.user)
+    return JsonResponse(_job_data(job))
+
+
+@user_type_required(['STANDARD', 'PREMIUM'])
+@require_GET
+def download_job_result(request, job_id):
+    job = get_object_or_404(Job, id=job_id, user=request.user, status='DONE')
+    if not job.result_file:
+        raise Http404
+
+    filename = job.result.get('filename') or job.result_file.name.rsplit('/', 1)[-1]
+    return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=filename)
\ No newline at end of file
@@ -0,0 +1,197 @@
+from bisect import bisect_right
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, IntegerField, Value
+
+from cycle_core.models import CycleWindow, _as_date
+from .catalog import get_display_names
+from .models import DailyLog, Symptom, Mood, Medication, SymptomLog, MoodLog, MedicationLog, CycleDayItemCount
+
+# Cross-cycle item analytics: for every user, how many logs hold each symptom/mood/medication on each cycle day
+# and phase (CycleDayItemCount). The table is built in one streaming pass over the logs and their items, each
+# date being placed in its logged cycle with bisect, then kept up to date by the receivers in log_core.signals
+# (+1/-1 on the touched day). Changes to the logged windows shift every cycle day: they only drop the "built"
+# stamp and the next read rebuilds. Heatmaps are read from the table in O(items x cycle length).
+MAX_CYCLE_DAY = 60  # days past this (e.g. a missing period log) are left out
+PHASES = [phase for phase, _ in CycleDayItemCount.PHASES]
+LOGGED_DAYS = 'log'
+BUILD_CHUNK_SIZE = 2000
+
+# item_type -> (through model, item field, catalog model)
+ITEM_TYPES = {
+    'symptom': (SymptomLog, 'symptom_id', Symptom),
+    'mood': (MoodLog, 'mood_id', Mood),
+    'medication': (MedicationLog, 'medication_id', Medication),
+}
+
+
+def _built_key(user_id):
+    return f'log_core:item_analytics_built:{user_id}'
+
+
+def get_phase(day, start, end, min_ovulation, max_ovulation):
+    # day falls in the cycle starting at start
+    if day <= (end or start):
+        return 'menstruation'
+    if day < min_ovulation:
+        return 'follicular'
+    if day <= max_ovulation:
+        return 'ovulation'
+    return 'luteal'
+
+
+WINDOW_FIELDS = ('menstruation_start', 'menstruation_end', 'min_ovulation_window', 'max_ovulation_window')
+
+
+def _place(day, window):
+    # (cycle day, phase) of day in the cycle of window, or None past MAX_CYCLE_DAY
+    cycle_day = (day - window[0]).days
+    if cycle_day >= MAX_CYCLE_DAY:
+        return None
+    return (cycle_day, get_phase(day, *window))
+
+
+def locate_day(user_id, day):
+    # CycleLocator.locate for a single date: the last logged window starting on or before it, one indexed query
+    window = list(
+        CycleWindow.objects.filter(user_id=user_id, menstruation_start__lte=day, is_prediction=False)
+        .order_by('-menstruation_start')
+        .values_list(*WINDOW_FIELDS)[:1]
+    )
+    return _place(day, window[0]) if window else None
+
+
+class CycleLocator():
+    # Places dates in the user's logged cycles: date -> (cycle day, phase), or None outside of any cycle.
+    def __init__(self, user_id):
+        self.windows = list(
+            CycleWindow.objects.filter(user_id=user_id, is_prediction=False)
+            .order_by('menstruation_start')
+            .values_list(*WINDOW_FIELDS)
+        )
+        self.starts = [window[0] for window in self.windows]
+        self._located = {}
+
+    def locate(self, day):
+        if day not in self._located:
+            idx = bisect_right(self.starts, day) - 1
+            self._located[day] = _place(day, self.windows[idx]) if idx >= 0 else None
+        return self._located[day]
+
+
+def _log_items(logs):
+    # (date, item type, item id) of every log in logs and of each of their items, as a single UNION ALL query
+    rows = logs.order_by().annotate(kind=Value(LOGGED_DAYS), item=Value(0, output_field=IntegerField())).values_list('date', 'kind', 'item')
+    return rows.union(*[
+        through.objects.filter(log__in=logs).order_by().annotate(kind=Value(item_type)).values_list('log__date', 'kind', field)
+        for item_type, (through, field, _) in ITEM_TYPES.items()
+    ], all=True)
+
+
+def build_item_analytics(user_id):
+    locator = CycleLocator(user_id)
+    counts = Counter()
+
+    for day, item_type, item_id in _log_items(DailyLog.objects.filter(user_id=user_id)).iterator(chunk_size=BUILD_CHUNK_SIZE):
+        located = locator.locate(day)
+        if located:
+            counts[(item_type, item_id, *located)] += 1
+
+    with transaction.atomic():
+        CycleDayItemCount.objects.filter(user_id=user_id).delete()
+        CycleDayItemCount.objects.bulk_create([
+            CycleDayItemCount(user_id=user_id, item_type=item_type, item_id=item_id, cycle_day=cycle_day, phase=phase, count=count)
+            for (item_type, item_id, cycle_day, phase), count in counts.items()
+        ], batch_size=BUILD_CHUNK_SIZE)
+
+    cache.set(_built_key(user_id), True, None)
+
+
+def invalidate_item_analytics(user_id):
+    cache.delete(_built_key(user_id))
+    # a concurrent read may rebuild from the pre-commit rows
+    transaction.on_commit(lambda: cache.delete(_built_key(user_id)))
+
+
+def update_item_analytics(user_id, day, items, delta):
+    # items (item type, item id) were added (delta=1) to or removed (delta=-1) from the log of day.
+    # Nothing to do while the table isn't built: the next read builds it from the logs.
+    if not cache.get(_built_key(user_id)):
+        return
+
+    located = locate_day(user_id, _as_date(day))
+    if located is None:
+        return
+
+    cycle_day, phase = located
+    for item_type, item_id in items:
+        counter = CycleDayItemCount.objects.filter(user_id=user_id, item_type=item_type, item_id=item_id, cycle_day=cycle_day, phase=phase)
+        if counter.update(count=F('count') + delta) or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                CycleDayItemCount.objects.create(user_id=user_id, item_type=item_type, item_id=item_id, cycle_day=cycle_day, phase=phase, count=delta)
+        except IntegrityError:
+            # created concurrently
+            counter.update(count=F('count') + delta)
+
+
+def get_log_items(log) -> list:
+    # (item type, item id) of the log itself and of its symptoms, moods and medications
+    return [(item_type, item_id) for _, item_type, item_id in _log_items(DailyLog.objects.filter(pk=log.pk))]
+
+
+def get_item_heatmap(user, item_type) -> dict:
+    # Heatmap-ready arrays of the items of item_type ('symptom', 'mood' or 'medication'), indexed by cycle day.
+    # logged_days holds the denominators: how many logs exist on each cycle day / in each phase.
+    if not cache.get(_built_key(user.id)):
+        build_item_analytics(user.id)
+
+    rows = list(
+        CycleDayItemCount.objects.filter(user=user, item_type__in=[item_type, LOGGED_DAYS], count__gt=0)
+        .values_list('item_type', 'item_id', 'cycle_day', 'phase', 'count')
+    )
+    cycle_length = max((row[2] for row in rows), default=-1) + 1
+
+    logged_days = {'days': [0] * cycle_length, 'phases': dict.fromkeys(PHASES, 0)}
+    items = {}
+    for row_type, item_id, cycle_day, phase, count in rows:
+        if row_type == LOGGED_DAYS:
+            entry = logged_days
+        else:
+            entry = items.setdefault(item_id, {'days': [0] * cycle_length, 'phases': dict.fromkeys(PHASES, 0)})
+        entry['days'][cycle_day] += count
+        entry['phases'][phase] += count
+
+    catalog = ITEM_TYPES[item_type][2]
+    results = []
+    for item_id in sorted(items, key=lambda i: sum(items[i]['days']), reverse=True):
+        name = get_display_names(catalog, [item_id])
+        if not name:
+            # deleted from the catalog
+            continue
+
+        entry = items[item_id]
+        peak_day = max(range(cycle_length), key=entry['days'].__getitem__)
+        results.append({
+            'id': item_id,
+            'name': name[0],
+            'total': sum(entry['days']),
+            'days': entry['days'],
+            'phases': entry['phases'],
+            # share of the logged days of each phase holding the item
+            'phase_frequency': {
+                phase: round(count / logged_days['phases'][phase], 3) if logged_days['phases'][phase] else 0
+                for phase, count in entry['phases'].items()
+            },
+            'peak_day': peak_day,
+        })
+
+    return {
+        'cycle_length': cycle_length,
+        'phases': PHASES,
+        'logged_days': logged_days,
+        'items': results,
+    }
\ No newline at end of file
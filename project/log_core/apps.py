@@ -6,6 +6,10 @@ class LogCoreConfig(AppConfig):
     name = 'log_core'
 
     def ready(self):
+        import log_core.signals
+        from django.db.models.signals import post_migrate
+        from .search import create_note_index
+        post_migrate.connect(create_note_index, sender=self)
         from .services import initialize_log_data
         import sys
 
@@ -0,0 +1,85 @@
+import threading
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import get_language, gettext as _rt
+
+from .models import Symptom, Mood, Medication
+
+# In-process cache of the Symptom/Mood/Medication catalogs. They are seeded once and rarely edited,
+# so log reads resolve names from here instead of joining the catalog tables.
+# Each catalog is stamped with a version kept in the shared cache: edits (log_core.signals) bump it, and every
+# process reloads its copy once its stamp is outdated. Ids unknown to the cache trigger a reload too.
+CATALOG_MODELS = (Symptom, Mood, Medication)
+
+_lock = threading.Lock()
+_names = {}          # model -> (version, {id: name})
+_display_names = {}  # (model, language) -> (version, {id: translated name})
+
+
+def _version_key(model):
+    return f'log_core:catalog_version:{model._meta.label_lower}'
+
+
+def get_catalog_version(model) -> str:
+    # random tokens: a version evicted from the cache comes back as a new one
+    return cache.get_or_set(_version_key(model), uuid4().hex, None)
+
+
+def bump_catalog_version(model):
+    # Outdates the catalog in every process, again after commit: a process may reload it before the edit commits.
+    def bump():
+        cache.set(_version_key(model), uuid4().hex, None)
+        invalidate_catalog(model)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def get_catalog(model, version=None) -> dict[int, str]:
+    version = version or get_catalog_version(model)
+    cached = _names.get(model)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    names = dict(model.objects.values_list('id', 'name'))
+    with _lock:
+        _names[model] = (version, names)
+    return names
+
+
+def get_names(model, ids) -> list[str]:
+    # Catalog names in the order of ids.
+    names = get_catalog(model)
+    if any(i not in names for i in ids):
+        # created in another process
+        invalidate_catalog(model)
+        names = get_catalog(model)
+    return [names[i] for i in ids if i in names]
+
+
+def invalidate_catalog(model):
+    # this process only, see bump_catalog_version
+    with _lock:
+        _names.pop(model, None)
+        for key in [key for key in _display_names if key[0] is model]:
+            del _display_names[key]
+
+
+def get_display_names(model, ids) -> list[str]:
+    # Translated names (what str() of the catalog item returns) in the order of ids.
+    key = (model, get_language())
+    version = get_catalog_version(model)
+    cached = _display_names.get(key)
+    display_names = cached[1] if cached is not None and cached[0] == version else None
+
+    if display_names is None or any(i not in display_names for i in ids):
+        if display_names is not None:
+            # created in another process
+            invalidate_catalog(model)
+        display_names = {i: _rt(name) for i, name in get_catalog(model, version).items()}
+        with _lock:
+            _display_names[key] = (version, display_names)
+
+    return [display_names[i] for i in ids if i in display_names]
\ No newline at end of file
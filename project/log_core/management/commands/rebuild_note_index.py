@@ -0,0 +1,28 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from log_core.search import create_note_index, rebuild_note_index, uses_fts
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the note search index (SQLite FTS5 table, or NoteToken rows on other databases) from the logs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', dest='username', default=None,
+                            help="Only reindex the notes of this user.")
+
+    def handle(self, *args, **options):
+        user_id = None
+        if options['username']:
+            user_id = get_user_model().objects.filter(username=options['username']).values_list('pk', flat=True).first()
+            if user_id is None:
+                raise CommandError(f"Unknown user: {options['username']}")
+
+        started = time.perf_counter()
+        # the FTS5 table is normally created by migrate
+        create_note_index()
+        count = rebuild_note_index(user_id)
+        backend = 'FTS5' if uses_fts() else 'token'
+        self.stdout.write(f'{count} notes indexed ({backend} index) in {time.perf_counter() - started:.2f}s')
\ No newline at end of file
@@ -135,4 +135,44 @@ class MedicationLog(models.Model):
     class Meta:
         unique_together = ('log', 'medication')
         verbose_name = _("Medication Log")
-        verbose_name_plural = _("Medication Logs")
\ No newline at end of file
+        verbose_name_plural = _("Medication Logs")
+
+# Number of logs holding an item on a given cycle day, per user (see log_core.analytics).
+# item_type 'log' counts the logged days themselves (item_id 0): the denominators of the frequencies.
+class CycleDayItemCount(models.Model):
+    ITEM_TYPES = [
+        ('log', _('Log')),
+        ('symptom', _('Symptom')),
+        ('mood', _('Mood')),
+        ('medication', _('Medication')),
+    ]
+    PHASES = [
+        ('menstruation', _('Menstruation')),
+        ('follicular', _('Follicular')),
+        ('ovulation', _('Ovulation')),
+        ('luteal', _('Luteal')),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name=_("User"))
+    item_type = models.CharField(max_length=10, choices=ITEM_TYPES, verbose_name=_("Item type"))
+    item_id = models.PositiveIntegerField(verbose_name=_("Item"))
+    cycle_day = models.PositiveSmallIntegerField(verbose_name=_("Cycle day"))  # 0 = first day of menstruation
+    phase = models.CharField(max_length=12, choices=PHASES, verbose_name=_("Phase"))
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Count"))
+
+    class Meta:
+        unique_together = ('user', 'item_type', 'item_id', 'cycle_day', 'phase')
+        verbose_name = _("Cycle Day Item Count")
+        verbose_name_plural = _("Cycle Day Item Counts")
+
+class NoteToken(models.Model):
+    # Inverted index of the notes, used by log_core.search on databases without SQLite FTS5
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name=_("User"))
+    log = models.ForeignKey(DailyLog, on_delete=models.CASCADE, related_name='note_tokens', verbose_name=_("Log"))
+    token = models.CharField(max_length=64, verbose_name=_("Token"))
+    count = models.PositiveSmallIntegerField(default=1, verbose_name=_("Count"))
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'token'], name='notetoken_user_token')]
+        verbose_name = _("Note Token")
+        verbose_name_plural = _("Note Tokens")
\ No newline at end of file
@@ -0,0 +1,261 @@
+import base64
+import binascii
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.db.models import F, Q, Sum
+from django.utils.html import escape
+
+from .models import DailyLog, NoteToken
+
+# Full-text search of the DailyLog notes. On SQLite the notes are indexed in an FTS5 virtual table (created after
+# migrate by create_note_index), on other databases in the NoteToken inverted index. Both are kept in sync by the
+# DailyLog receivers in log_core.signals and fold case and diacritics the same way. All the query terms must match,
+# the last one as a prefix (search as you type: prefixes of the other terms would expand to many more index terms).
+# Results come best first, with a highlighted snippet, in pages chained by an opaque cursor: (score, log id) of the
+# last result, lower scores first.
+NOTE_INDEX_TABLE = 'log_core_note_fts'
+SEARCH_PAGE_SIZE = 20
+MAX_QUERY_TERMS = 8
+SNIPPET_TOKENS = 12
+INDEX_CHUNK_SIZE = 500
+
+TOKEN_RE = re.compile(r'[^\W_]+')  # letters and digits, as the unicode61 tokenizer
+TOKEN_MAX_LENGTH = 64
+# snippet markers, turned into <mark> once the note is escaped
+MARK_START, MARK_END, ELLIPSIS = '\x02', '\x03', '…'
+
+_fts_available = {}
+
+
+def fold(word) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFKD', word) if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text) -> list:
+    return [fold(word)[:TOKEN_MAX_LENGTH] for word in TOKEN_RE.findall(text or '')]
+
+
+def uses_fts(using=DEFAULT_DB_ALIAS) -> bool:
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    if using not in _fts_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            _fts_available[using] = bool(cursor.fetchone()[0])
+    return _fts_available[using]
+
+
+def _user_key(user_id):
+    return f'u{user_id}'
+
+
+def create_note_index(using=DEFAULT_DB_ALIAS, **kwargs):
+    # post_migrate receiver: the virtual table isn't a model, it is created (and filled) once
+    if not uses_fts(using):
+        return
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if NOTE_INDEX_TABLE in connection.introspection.table_names(cursor):
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {NOTE_INDEX_TABLE} USING fts5("
+            "note, user_key, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    rebuild_note_index()
+
+
+def _insert_notes(logs):
+    logs = [log for log in logs if log.note]
+    if uses_fts():
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {NOTE_INDEX_TABLE} (rowid, note, user_key) VALUES (%s, %s, %s)',
+                [(log.pk, log.note, _user_key(log.user_id)) for log in logs]
+            )
+    else:
+        NoteToken.objects.bulk_create([
+            NoteToken(user_id=log.user_id, log_id=log.pk, token=token, count=count)
+            for log in logs
+            for token, count in Counter(tokenize(log.note)).items()
+        ], batch_size=INDEX_CHUNK_SIZE)
+
+
+def unindex_notes(log_ids):
+    # NoteToken rows go with their log
+    log_ids = list(log_ids)
+    if not uses_fts() or not log_ids:
+        return
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        for i in range(0, len(log_ids), INDEX_CHUNK_SIZE):
+            chunk = log_ids[i:i + INDEX_CHUNK_SIZE]
+            cursor.execute(f"DELETE FROM {NOTE_INDEX_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})", chunk)
+
+
+def unindex_user_notes(user_id):
+    # Drops the whole index of a user in one statement, for bulk deletions of their logs (restore, reset).
+    if uses_fts():
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {NOTE_INDEX_TABLE} WHERE rowid IN '
+                f'(SELECT rowid FROM {NOTE_INDEX_TABLE} WHERE {NOTE_INDEX_TABLE} MATCH %s)',
+                [f'user_key : {_user_key(user_id)}']
+            )
+    else:
+        NoteToken.objects.filter(user_id=user_id).delete()
+
+
+def index_notes(logs):
+    # (Re)indexes the notes of saved or bulk created logs.
+    logs = list(logs)
+    with transaction.atomic():
+        if uses_fts():
+            unindex_notes([log.pk for log in logs])
+        else:
+            NoteToken.objects.filter(log__in=[log.pk for log in logs]).delete()
+        for i in range(0, len(logs), INDEX_CHUNK_SIZE):
+            _insert_notes(logs[i:i + INDEX_CHUNK_SIZE])
+
+
+def rebuild_note_index(user_id=None) -> int:
+    # Indexes the notes of every log, or of the logs of user_id, from scratch. Returns the number of notes.
+    logs = DailyLog.objects.exclude(note__isnull=True).exclude(note='').order_by().only('id', 'user_id', 'note')
+    if user_id is not None:
+        logs = logs.filter(user_id=user_id)
+
+    with transaction.atomic():
+        if user_id is not None:
+            unindex_user_notes(user_id)
+        elif uses_fts():
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute(f'DELETE FROM {NOTE_INDEX_TABLE}')
+        else:
+            NoteToken.objects.all().delete()
+
+        count = 0
+        chunk = []
+        for log in logs.iterator(chunk_size=INDEX_CHUNK_SIZE):
+            chunk.append(log)
+            if len(chunk) == INDEX_CHUNK_SIZE:
+                _insert_notes(chunk)
+                count, chunk = count + len(chunk), []
+        _insert_notes(chunk)
+
+    return count + len(chunk)
+
+
+def encode_cursor(score, log_id) -> str:
+    return base64.urlsafe_b64encode(f'{score!r}:{log_id}'.encode()).decode()
+
+
+def decode_cursor(cursor) -> tuple:
+    # raises ValueError on a malformed cursor
+    if not isinstance(cursor, str):
+        raise ValueError('Invalid cursor')
+    try:
+        score, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+    except (binascii.Error, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    return float(score), int(log_id)
+
+
+def _render_snippet(snippet) -> str:
+    return escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def _search_fts(user, terms, after, limit) -> list:
+    # bm25 ranks on the note only. The inner LIMIT keeps SQLite from flattening the subquery, which would move
+    # the auxiliary function into the WHERE clause.
+    phrases = [f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*']
+    match = f'user_key : {_user_key(user.id)} AND note : (' + ' '.join(phrases) + ')'
+    params = [match]
+    where = ''
+    if after:
+        where = 'WHERE score > %s OR (score = %s AND id > %s)'
+        params += [after[0], after[0], after[1]]
+    params.append(limit)
+
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute(f'''
+            SELECT score, id FROM (
+                SELECT bm25({NOTE_INDEX_TABLE}, 1.0, 0.0) AS score, rowid AS id
+                FROM {NOTE_INDEX_TABLE}
+                WHERE {NOTE_INDEX_TABLE} MATCH %s
+                LIMIT -1
+            ) {where}
+            ORDER BY score, id
+            LIMIT %s
+        ''', params)
+        return cursor.fetchall()
+
+
+def _highlight(note, terms) -> str:
+    # SNIPPET_TOKENS words from the first match, matched words wrapped in the markers.
+    # Computed here for the page only: FTS5 snippet() would run on every match before the ranking.
+    words = list(TOKEN_RE.finditer(note))
+    if not words:
+        return note
+    exact, prefix = set(terms[:-1]), terms[-1]
+    hits = {i for i, word in enumerate(words) if fold(word.group()) in exact or fold(word.group()).startswith(prefix)}
+    start = max(0, min(min(hits, default=0), len(words) - SNIPPET_TOKENS))
+    end = min(len(words), start + SNIPPET_TOKENS)
+
+    parts = [ELLIPSIS if start else note[:words[0].start()]]
+    for i in range(start, end):
+        if i > start:
+            parts.append(note[words[i - 1].end():words[i].start()])
+        parts.append(f'{MARK_START}{words[i].group()}{MARK_END}' if i in hits else words[i].group())
+    parts.append(ELLIPSIS if end < len(words) else note[words[-1].end():])
+    return ''.join(parts)
+
+
+def _search_tokens(user, terms, after, limit) -> list:
+    logs = DailyLog.objects.filter(user=user)
+    matching = Q()
+    for i, term in enumerate(terms):
+        lookup = 'token__startswith' if i == len(terms) - 1 else 'token'
+        logs = logs.filter(pk__in=NoteToken.objects.filter(user=user, **{lookup: term}).values('log_id'))
+        matching |= Q(**{f'note_tokens__{lookup}': term})
+
+    # matched term occurrences, negated to sort like bm25
+    logs = logs.annotate(score=Sum(F('note_tokens__count') * -1, filter=matching))
+    if after:
+        logs = logs.filter(Q(score__gt=after[0]) | Q(score=after[0], pk__gt=after[1]))
+
+    return list(logs.order_by('score', 'pk').values_list('score', 'pk')[:limit])
+
+
+def search_notes(user, query, cursor=None, limit=SEARCH_PAGE_SIZE) -> dict:
+    # One page of the user's logs whose note matches query, and the cursor of the next page (None on the last one).
+    # Raises ValueError on a malformed cursor.
+    after = decode_cursor(cursor) if cursor else None
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return {'results': [], 'next_cursor': None}
+
+    rows = (_search_fts if uses_fts() else _search_tokens)(user, terms, after, limit + 1)
+    logs = {
+        log_id: (date, note)
+        for log_id, date, note in DailyLog.objects.filter(pk__in=[log_id for _, log_id in rows[:limit]]).values_list('pk', 'date', 'note')
+    }
+
+    results = []
+    for _, log_id in rows[:limit]:
+        # index rows of logs deleted meanwhile
+        if log_id not in logs:
+            continue
+        date, note = logs[log_id]
+        results.append({
+            'date': date.strftime('%Y-%m-%d'),
+            'note': note,
+            'snippet': _render_snippet(_highlight(note, terms)),
+        })
+
+    return {
+        'results': results,
+        'next_cursor': encode_cursor(*rows[limit - 1]) if len(rows) > limit else None,
+    }
\ No newline at end of file
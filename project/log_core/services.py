@@ -1,8 +1,54 @@
-from .models import DailyLog, Symptom, Mood, Medication
+from django.db.models import Value
+from django.utils.translation import gettext as _rt
+
+from .models import DailyLog, Symptom, Mood, Medication, SymptomLog, MoodLog, MedicationLog
+from .catalog import get_display_names
 
 def get_day_log(user, target_date):
     return DailyLog.objects.filter(user=user, date=target_date).first()
 
+def get_day_log_data(user, target_date):
+    # Fully hydrated day log for the calendar sidebar, or None if there is no log.
+    # Two queries: the log with its IntercourseLog, then the ids of its symptoms, moods and medications.
+    # Names come from the in-process catalog cache.
+    log = DailyLog.objects.select_related('intercourse').filter(user=user, date=target_date).first()
+    if log is None:
+        return None
+
+    item_ids = {'symptoms': [], 'moods': [], 'medications': []}
+    items = SymptomLog.objects.filter(log=log).annotate(kind=Value('symptoms')).values_list('kind', 'symptom_id', 'id').union(
+        MoodLog.objects.filter(log=log).annotate(kind=Value('moods')).values_list('kind', 'mood_id', 'id'),
+        MedicationLog.objects.filter(log=log).annotate(kind=Value('medications')).values_list('kind', 'medication_id', 'id'),
+        all=True
+    ).order_by('kind', 'id')
+
+    for kind, item_id, _ in items:
+        item_ids[kind].append(item_id)
+
+    il = getattr(log, 'intercourse', None)
+
+    return {
+        "note": log.note,
+        "flow": log.flow,
+        "flow_display": _rt(log.get_flow_display()) if log.flow is not None else None,
+        "weight": log.weight,
+        "temperature": log.temperature,
+        "ovulation_test": log.ovulation_test,
+
+        "symptoms": item_ids['symptoms'],
+        "symptoms_display": get_display_names(Symptom, item_ids['symptoms']),
+        "moods": item_ids['moods'],
+        "moods_display": get_display_names(Mood, item_ids['moods']),
+        "medications": item_ids['medications'],
+        "medications_display": get_display_names(Medication, item_ids['medications']),
+
+        "protected": il.protected if il else None,
+        "protected_display": _rt("Yes") if il and il.protected else (_rt("No") if il and il.protected is False else None),
+        "orgasm": il.orgasm if il else None,
+        "orgasm_display": _rt("Yes") if il and il.orgasm else (_rt("No") if il and il.orgasm is False else None),
+        "quantity": il.quantity if il else None,
+    }
+
 def initialize_log_data():
     """
     Populates the database with initial symptoms, moods, and medications
@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from cycle_core.batching import is_deferred, cycle_data_bulk_changed
+from cycle_core.models import CycleWindow, _as_date
+from .analytics import ITEM_TYPES, LOGGED_DAYS, update_item_analytics, invalidate_item_analytics, get_log_items
+from .catalog import CATALOG_MODELS, bump_catalog_version
+from .search import index_notes, unindex_notes
+from .models import DailyLog
+
+
+def clearCatalogCache(sender, **kwargs):
+    bump_catalog_version(sender)
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(clearCatalogCache, sender=model)
+    post_delete.connect(clearCatalogCache, sender=model)
+
+
+# Item analytics (log_core.analytics). Bulk changes inside deferred_cycle_updates (restore, reset) are skipped:
+# the scope drops the whole table once done.
+@receiver(pre_save, sender=DailyLog)
+def rememberLogDate(sender, instance, update_fields=None, **kwargs):
+    # the stored date of an edited log, read by the receivers of a moved log (here and in calendar_core.signals)
+    instance._previous_date = None
+    if instance._state.adding or is_deferred(instance.user_id) or (update_fields is not None and 'date' not in update_fields):
+        return
+    instance._previous_date = DailyLog.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+
+
+@receiver(post_save, sender=DailyLog)
+def countDailyLog(sender, instance, created, **kwargs):
+    if is_deferred(instance.user_id):
+        return
+    if created:
+        update_item_analytics(instance.user_id, instance.date, [(LOGGED_DAYS, 0)], 1)
+        return
+
+    previous_date = getattr(instance, '_previous_date', None)
+    if previous_date and previous_date != _as_date(instance.date):
+        # moved to another day, maybe of another cycle: its counts follow it
+        items = get_log_items(instance)
+        update_item_analytics(instance.user_id, previous_date, items, -1)
+        update_item_analytics(instance.user_id, instance.date, items, 1)
+
+
+@receiver(pre_delete, sender=DailyLog)
+def uncountDailyLog(sender, instance, origin=None, **kwargs):
+    # the user is being deleted: the counters go with it
+    if isinstance(origin, get_user_model()) or is_deferred(instance.user_id):
+        return
+    update_item_analytics(instance.user_id, instance.date, get_log_items(instance), -1)
+
+
+def countLogItems(sender, instance, action, reverse, pk_set, **kwargs):
+    item_type = THROUGH_ITEM_TYPES[sender]
+    through, field, _ = ITEM_TYPES[item_type]
+
+    if reverse:
+        # logs changed from the item side, not done by the app: rebuild for their users
+        if action in ('pre_add', 'pre_remove'):
+            user_ids = DailyLog.objects.filter(pk__in=pk_set).values_list('user_id', flat=True).distinct()
+        elif action == 'pre_clear':
+            user_ids = through.objects.filter(**{field: instance.pk}).values_list('log__user_id', flat=True).distinct()
+        else:
+            return
+        for user_id in user_ids:
+            invalidate_item_analytics(user_id)
+        return
+
+    if is_deferred(instance.user_id):
+        return
+
+    if action == 'post_add':
+        item_ids = pk_set
+    elif action in ('pre_remove', 'pre_clear'):
+        # remove() may be given items the log doesn't hold
+        linked = through.objects.filter(log=instance)
+        if action == 'pre_remove':
+            linked = linked.filter(**{f'{field}__in': pk_set})
+        item_ids = linked.values_list(field, flat=True)
+    else:
+        return
+
+    delta = 1 if action == 'post_add' else -1
+    items = [(item_type, item_id) for item_id in item_ids]
+    if items:
+        update_item_analytics(instance.user_id, instance.date, items, delta)
+
+
+THROUGH_ITEM_TYPES = {through: item_type for item_type, (through, _, _) in ITEM_TYPES.items()}
+for through in THROUGH_ITEM_TYPES:
+    m2m_changed.connect(countLogItems, sender=through)
+
+
+@receiver(post_save, sender=CycleWindow)
+@receiver(post_delete, sender=CycleWindow)
+def clearItemAnalytics(sender, instance, **kwargs):
+    # logged cycles moved: every cycle day may have shifted
+    if not instance.is_prediction and not is_deferred(instance.user_id):
+        invalidate_item_analytics(instance.user_id)
+
+
+@receiver(cycle_data_bulk_changed)
+def clearItemAnalyticsAfterBulkChange(sender, user_id, **kwargs):
+    invalidate_item_analytics(user_id)
+
+
+# Note search index (log_core.search), bulk created or deleted logs are (un)indexed by their creator (restore_backup, reset_user_data)
+@receiver(post_save, sender=DailyLog)
+def indexNote(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'note' not in update_fields:
+        return
+    if created and not instance.note:
+        return
+    index_notes([instance])
+
+
+@receiver(post_delete, sender=DailyLog)
+def unindexNote(sender, instance, **kwargs):
+    # bulk deletions (deferred_cycle_updates) drop the user's index at once, see unindex_user_notes
+    if not is_deferred(instance.user_id):
+        unindex_notes([instance.pk])
\ No newline at end of file
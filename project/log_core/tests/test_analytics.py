@@ -0,0 +1,136 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from datetime import date, timedelta
+
+from cycle_core.models import CycleDetails, CycleWindow
+from log_core.models import DailyLog, Symptom, Mood, CycleDayItemCount
+from log_core.catalog import invalidate_catalog
+from log_core.analytics import build_item_analytics, get_item_heatmap, update_item_analytics
+
+User = get_user_model()
+
+
+class ItemAnalyticsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for model in (Symptom, Mood):
+            invalidate_catalog(model)
+
+        self.user = User.objects.create_user(username='testuser', password='pass', email='testuser@test.com')
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date(2025, 1, 1))
+        for start in (date(2025, 1, 1), date(2025, 1, 29)):
+            self._create_window(start)
+
+        self.headache = Symptom.objects.create(name='Headache')
+        self.cramps = Symptom.objects.create(name='Cramps')
+        self.happy = Mood.objects.create(name='Happy')
+
+        self._log(date(2024, 12, 20), [self.headache])  # before the first logged cycle
+        self._log(date(2025, 1, 2), [self.headache])
+        self._log(date(2025, 1, 15), [self.headache, self.cramps], [self.happy])
+        self._log(date(2025, 1, 31), [self.headache])
+
+    def _create_window(self, start):
+        return CycleWindow.objects.create(
+            user=self.user,
+            menstruation_start=start,
+            menstruation_end=start + timedelta(days=3),
+            min_ovulation_window=start + timedelta(days=12),
+            max_ovulation_window=start + timedelta(days=16),
+            is_prediction=False
+        )
+
+    def _log(self, day, symptoms=(), moods=()):
+        log = DailyLog.objects.create(user=self.user, date=day)
+        log.symptoms_field.set(symptoms)
+        log.moods_field.set(moods)
+        return log
+
+    def _counts(self):
+        return {
+            (c.item_type, c.item_id, c.cycle_day, c.phase): c.count
+            for c in CycleDayItemCount.objects.filter(user=self.user, count__gt=0)
+        }
+
+    def test_heatmap(self):
+        heatmap = get_item_heatmap(self.user, 'symptom')
+
+        self.assertEqual(heatmap['cycle_length'], 15)
+        self.assertEqual(heatmap['logged_days']['phases'], {'menstruation': 2, 'follicular': 0, 'ovulation': 1, 'luteal': 0})
+
+        headache, cramps = heatmap['items']
+        self.assertEqual((headache['name'], headache['total'], headache['peak_day']), ('Headache', 3, 1))
+        self.assertEqual([i for i, count in enumerate(headache['days']) if count], [1, 2, 14])
+        self.assertEqual(headache['phase_frequency']['menstruation'], 1.0)
+        self.assertEqual((cramps['name'], cramps['phases']['ovulation']), ('Cramps', 1))
+
+        # the table is built: one query (the catalog is cached)
+        get_item_heatmap(self.user, 'mood')
+        with self.assertNumQueries(1):
+            mood_heatmap = get_item_heatmap(self.user, 'mood')
+        self.assertEqual([(i['name'], i['peak_day']) for i in mood_heatmap['items']], [('Happy', 14)])
+
+    def test_incremental_updates_match_rebuild(self):
+        get_item_heatmap(self.user, 'symptom')
+
+        log = self._log(date(2025, 1, 20), [self.cramps])
+        log.symptoms_field.add(self.headache)
+        log.symptoms_field.remove(self.cramps, self.headache)
+        log.symptoms_field.remove(self.headache)  # not held anymore
+        log.moods_field.add(self.happy)
+
+        other = DailyLog.objects.get(user=self.user, date=date(2025, 1, 15))
+        other.symptoms_field.clear()
+        DailyLog.objects.get(user=self.user, date=date(2025, 1, 2)).delete()
+
+        incremental = self._counts()
+        build_item_analytics(self.user.id)
+        self.assertEqual(incremental, self._counts())
+
+    def test_moved_log_follows_its_cycle(self):
+        get_item_heatmap(self.user, 'symptom')
+
+        log = DailyLog.objects.get(user=self.user, date=date(2025, 1, 15))
+        log.date = date(2025, 2, 3)  # into the second cycle
+        log.save()
+        log = DailyLog.objects.get(user=self.user, date=date(2025, 1, 2))
+        log.date = date(2024, 12, 25)  # out of any cycle
+        log.save()
+
+        incremental = self._counts()
+        build_item_analytics(self.user.id)
+        self.assertEqual(incremental, self._counts())
+
+    def test_update_reads_one_window(self):
+        get_item_heatmap(self.user, 'symptom')
+        for i in range(10):
+            self._create_window(date(2024, 1, 1) + timedelta(days=28 * i))
+        get_item_heatmap(self.user, 'symptom')
+
+        # the window lookup and the counter update
+        with self.assertNumQueries(2):
+            update_item_analytics(self.user.id, date(2025, 1, 15), [('symptom', self.headache.id)], 1)
+
+    def test_window_change_rebuilds(self):
+        get_item_heatmap(self.user, 'symptom')
+
+        self._create_window(date(2025, 1, 14))
+        headache = get_item_heatmap(self.user, 'symptom')['items'][0]
+
+        self.assertEqual([i for i, count in enumerate(headache['days']) if count], [1, 2])
+        self.assertEqual(headache['phases']['menstruation'], 3)
+
+    def test_endpoint(self):
+        profile = self.user.userprofile
+        profile.is_configured = True
+        profile.save()
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('dashboard:ajax_item_heatmap'), {'item_type': 'symptom'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([i['name'] for i in response.json()['items']], ['Headache', 'Cramps'])
+
+        response = self.client.get(reverse('dashboard:ajax_item_heatmap'), {'item_type': 'flow'})
+        self.assertEqual(response.status_code, 400)
\ No newline at end of file
@@ -0,0 +1,144 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from datetime import date, timedelta
+import json
+
+from cycle_core.models import CycleDetails
+from log_core.models import DailyLog, NoteToken
+from log_core.search import search_notes, rebuild_note_index, uses_fts, NOTE_INDEX_TABLE
+from dashboard.services import reset_user_data
+
+User = get_user_model()
+
+
+class NoteSearchTests():
+    # run against both backends by the subclasses
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='pass', email='testuser@test.com')
+        self.other = User.objects.create_user(username='other', password='pass', email='other@test.com')
+
+        self.day = date(2025, 1, 1)
+        self._log('Mal di testa forte dopo pranzo')
+        self._log('testa, testa e ancora testa')
+        self._log('Crampi leggeri')
+        self._log('Troppo caffè oggi')
+        DailyLog.objects.create(user=self.other, date=self.day, note='testa')
+
+    def _log(self, note):
+        self.day += timedelta(days=1)
+        return DailyLog.objects.create(user=self.user, date=self.day, note=note)
+
+    def _notes(self, query, **kwargs):
+        return [r['note'] for r in search_notes(self.user, query, **kwargs)['results']]
+
+    def test_ranked_prefix_search(self):
+        self.assertEqual(self._notes('test'), ['testa, testa e ancora testa', 'Mal di testa forte dopo pranzo'])
+        self.assertEqual(self._notes('TESTA pran'), ['Mal di testa forte dopo pranzo'])
+        # only the last term is a prefix
+        self.assertEqual(self._notes('pran testa'), [])
+        self.assertEqual(self._notes('caffe'), ['Troppo caffè oggi'])
+        self.assertEqual(self._notes('crampi testa'), [])
+        self.assertEqual(self._notes('?!'), [])
+
+    def test_snippets(self):
+        self._log('<b>Emicrania</b>')
+        result = search_notes(self.user, 'emicr')['results'][0]
+        self.assertEqual(result['snippet'], '&lt;b&gt;<mark>Emicrania</mark>&lt;/b&gt;')
+
+        self._log(' '.join(f'word{i}' for i in range(30)) + ' nausea')
+        snippet = search_notes(self.user, 'nausea')['results'][0]['snippet']
+        self.assertTrue(snippet.startswith('…'))
+        self.assertTrue(snippet.endswith('<mark>nausea</mark>'))
+
+    def test_cursor_pagination(self):
+        for i in range(5):
+            self._log(f'nausea {i}')
+
+        notes, cursor = [], None
+        while True:
+            page = search_notes(self.user, 'nausea', cursor=cursor, limit=2)
+            notes += [r['note'] for r in page['results']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(sorted(notes), [f'nausea {i}' for i in range(5)])
+        with self.assertRaises(ValueError):
+            search_notes(self.user, 'nausea', cursor='not a cursor')
+
+    def test_kept_in_sync(self):
+        log = DailyLog.objects.get(user=self.user, note='Crampi leggeri')
+        log.note = 'Nausea'
+        log.save()
+        self.assertEqual(self._notes('crampi'), [])
+        self.assertEqual(self._notes('nausea'), ['Nausea'])
+
+        log.delete()
+        self.assertEqual(self._notes('nausea'), [])
+
+    def test_rebuild(self):
+        self.assertEqual(rebuild_note_index(self.user.id), 4)
+        self.assertEqual(len(self._notes('testa')), 2)
+        self.assertEqual(rebuild_note_index(), 5)
+        self.assertEqual(search_notes(self.other, 'testa')['results'][0]['note'], 'testa')
+
+    def test_reset_drops_the_index(self):
+        reset_user_data(self.user)
+        self.assertEqual(self._notes('testa'), [])
+        self.assertEqual(search_notes(self.other, 'testa')['results'][0]['note'], 'testa')
+
+
+class FTSNoteSearchTest(NoteSearchTests, TestCase):
+    def test_backend(self):
+        self.assertTrue(uses_fts())
+        self.assertFalse(NoteToken.objects.exists())
+
+    def test_endpoint(self):
+        CycleDetails.objects.create(user=self.user, base_menstruation_date=date.today() - timedelta(days=10))
+        profile = self.user.userprofile
+        profile.is_configured = True
+        profile.save()
+        self.client.force_login(self.user)
+
+        url = reverse('dashboard:ajax_search_logs')
+        response = self.client.post(url, json.dumps({'query': 'testa'}), content_type='application/json')
+        self.assertEqual(response.json()['results'][1], {
+            'date': '2025-01-02',
+            'note': 'Mal di testa forte dopo pranzo',
+            'snippet': 'Mal di <mark>testa</mark> forte dopo pranzo',
+        })
+        self.assertIsNone(response.json()['next_cursor'])
+
+        response = self.client.post(url, json.dumps({'query': 'testa', 'cursor': '!'}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, json.dumps({'query': 'testa', 'cursor': 5}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_reset_drops_the_index_at_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            reset_user_data(self.user)
+        index_queries = [q for q in ctx.captured_queries if NOTE_INDEX_TABLE in q['sql']]
+        self.assertEqual(len(index_queries), 1)
+
+    def test_stale_index_rows_are_skipped(self):
+        # deleted without the signals: its index row stays behind
+        logs = DailyLog.objects.filter(user=self.user, note='Mal di testa forte dopo pranzo')
+        logs._raw_delete(logs.db)
+
+        self.assertEqual(len(self._notes('testa')), 1)
+
+
+class TokenNoteSearchTest(NoteSearchTests, TestCase):
+    # the inverted index used on databases without FTS5
+    def setUp(self):
+        patcher = patch('log_core.search.uses_fts', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+    def test_backend(self):
+        self.assertEqual(NoteToken.objects.get(user=self.user, token='testa', log__note__startswith='testa').count, 3)
\ No newline at end of file
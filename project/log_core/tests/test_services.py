@@ -0,0 +1,74 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.utils import translation
+from datetime import date
+
+from log_core.models import DailyLog, IntercourseLog, Symptom, Mood, Medication
+from log_core.services import get_day_log_data
+from log_core.catalog import get_catalog, get_catalog_version, get_display_names, invalidate_catalog
+
+User = get_user_model()
+
+
+class DayLogDataTest(TestCase):
+    def setUp(self):
+        for model in (Symptom, Mood, Medication):
+            invalidate_catalog(model)
+
+        self.user = User.objects.create_user(username='testuser', password='pass')
+        self.symptoms = [Symptom.objects.create(name='Headache'), Symptom.objects.create(name='Acne')]
+        self.mood = Mood.objects.create(name='Happy')
+        self.medication = Medication.objects.create(name='Patch')
+
+        self.log = DailyLog.objects.create(user=self.user, date=date(2025, 1, 10), note='note', flow=2)
+        self.log.symptoms_field.set(self.symptoms)
+        self.log.moods_field.set([self.mood])
+        self.log.medications_field.set([self.medication])
+        IntercourseLog.objects.create(log=self.log, protected=False, orgasm=True, quantity=2)
+
+    def test_hydrated_day(self):
+        data = get_day_log_data(self.user, date(2025, 1, 10))
+
+        self.assertEqual(data['note'], 'note')
+        self.assertEqual(data['flow_display'], 'Medium')
+        self.assertEqual(data['symptoms'], [s.id for s in self.symptoms])
+        self.assertEqual(data['symptoms_display'], ['Headache', 'Acne'])
+        self.assertEqual((data['moods'], data['moods_display']), ([self.mood.id], ['Happy']))
+        self.assertEqual((data['medications'], data['medications_display']), ([self.medication.id], ['Patch']))
+        self.assertEqual((data['protected'], data['protected_display']), (False, 'No'))
+        self.assertEqual((data['orgasm'], data['orgasm_display']), (True, 'Yes'))
+        self.assertEqual(data['quantity'], 2)
+
+    def test_two_queries_with_warm_catalog(self):
+        get_day_log_data(self.user, date(2025, 1, 10))
+
+        with self.assertNumQueries(2):
+            get_day_log_data(self.user, date(2025, 1, 10))
+
+    def test_missing_log(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_day_log_data(self.user, date(2025, 1, 11)))
+
+    def test_catalog_edits_clear_cache(self):
+        self.assertNotIn('Nausea', get_catalog(Symptom).values())
+
+        nausea = Symptom.objects.create(name='Nausea')
+        self.assertEqual(get_display_names(Symptom, [nausea.id]), ['Nausea'])
+
+    def test_catalog_edits_in_other_processes(self):
+        get_display_names(Symptom, [self.symptoms[0].id])
+        version = get_catalog_version(Symptom)
+
+        # renamed by another process: this one's copy is stale until the shared version moves
+        Symptom.objects.filter(pk=self.symptoms[0].pk).update(name='Migraine')
+        self.assertEqual(get_catalog(Symptom)[self.symptoms[0].id], 'Headache')
+
+        self.symptoms[1].save()
+        self.assertNotEqual(get_catalog_version(Symptom), version)
+        self.assertEqual(get_catalog(Symptom)[self.symptoms[0].id], 'Migraine')
+        self.assertEqual(get_display_names(Symptom, [self.symptoms[0].id]), ['Migraine'])
+
+    def test_display_names_are_translated(self):
+        with translation.override('it'):
+            italian = get_display_names(Medication, [self.medication.id])
+            self.assertEqual(italian, [str(self.medication)])
@@ -1,11 +1,21 @@
+from django.utils.functional import SimpleLazyObject
+
+from .unread import get_unread_count, get_recent_unread
+
+
 def notification_context(request):
-    if request.user.is_authenticated:
-        unread_notifications = request.user.notifications.filter(is_read=False)
-        return {
-            'unread_notifications_count': unread_notifications.count(),
-            'recent_notifications': unread_notifications[:5]
-        }
+    # Lazy values: templates that never read them (AJAX fragments, most pages for the recent list) cost no query.
+    def unread_count():
+        if request.user.is_authenticated:
+            return get_unread_count(request.user)
+        return 0
+
+    def recent_notifications():
+        if request.user.is_authenticated:
+            return get_recent_unread(request.user)
+        return []
+
     return {
-        'unread_notifications_count': 0,
-        'recent_notifications': []
-    }
+        'unread_notifications_count': SimpleLazyObject(unread_count),
+        'recent_notifications': SimpleLazyObject(recent_notifications)
+    }
\ No newline at end of file
@@ -0,0 +1,20 @@
+from datetime import date
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.services import send_cycle_reminders
+
+
+class Command(BaseCommand):
+    help = "Sends the reminders for the periods and ovulations predicted for tomorrow. Meant to run once a day."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None,
+                            help="Run as if today were this date (YYYY-MM-DD), defaults to today.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        due = send_cycle_reminders(options['date'], batch_size=options['batch_size'])
+        self.stdout.write(f'{due} cycle reminders due, sent in {time.perf_counter() - started:.2f}s')
\ No newline at end of file
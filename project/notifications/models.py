@@ -1,6 +1,6 @@
 from django.db import models
 from django.conf import settings
-from django.utils.translation import gettext_lazy as _
+from django.utils.translation import gettext, gettext_lazy as _
 
 # Create your models here.
 
@@ -18,9 +18,41 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     link = models.CharField(max_length=500, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # identifies the event a notification was generated for (e.g. 'cycle:period:2025-01-31'),
+    # unique per user so the same event can't be notified twice. Plain notifications leave it empty.
+    dedupe_key = models.CharField(max_length=100, null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # unread notifications of a user, newest first (unread counters and recent list)
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_read=False), name='notification_user_unread'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'dedupe_key'], name='unique_notification_dedupe_key'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
+
+    # cycle reminders are written by a batch with no active language and store the untranslated msgids
+    def isTranslatable(self):
+        return bool(self.dedupe_key) and self.dedupe_key.startswith('cycle:')
+
+    @property
+    def display_title(self):
+        return gettext(self.title) if self.isTranslatable() else self.title
+
+    @property
+    def display_message(self):
+        return gettext(self.message) if self.isTranslatable() else self.message
+
+
+# Denormalized number of unread notifications per user, kept in sync by notifications.unread
+# so the navbar badge doesn't COUNT(*) the notifications on every render.
+class UnreadCounter(models.Model):
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='unread_counter')
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.unread} unread"
\ No newline at end of file
@@ -1,20 +1,105 @@
-from django.utils.translation import gettext as _
+from django.db import transaction
+from django.db.models import Q
+from django.utils.translation import gettext as _, gettext_noop
+from datetime import date, timedelta
+
+from cycle_core.models import CycleWindow, PredictedWindow
+from job_core.services import enqueue_job
 from .models import Notification
+from .unread import increment_unread, decrement_unread, refresh_unread_counts
 
 def create_notification(user, title, message, notification_type, link=None):
     # Utility function to create a new notification.
-    return Notification.objects.create(
+    notification = Notification.objects.create(
         user=user,
         title=title,
         message=message,
         notification_type=notification_type,
         link=link
     )
+    increment_unread([notification.user_id])
+    return notification
+
+def mark_notification_read(notification):
+    # the conditional update makes concurrent reads of the same notification decrement the counter once
+    if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+        decrement_unread(notification.user_id)
+    notification.is_read = True
+
+def mark_all_notifications_read(user):
+    # decremented by the rows actually updated: notifications created meanwhile stay counted
+    decrement_unread(user.id, user.notifications.filter(is_read=False).update(is_read=True))
+
+def delete_user_notification(notification):
+    if Notification.objects.filter(pk=notification.pk, is_read=False).delete()[0]:
+        decrement_unread(notification.user_id)
+    else:
+        notification.delete()
+
+# deferred fan-outs to more recipients than this are written by a background job (manage.py run_workers)
+FAN_OUT_JOB = 'fan_out_notification'
+FAN_OUT_JOB_THRESHOLD = 200
+
+def fan_out_notification(user_ids, title, message, notification_type, link=None, batch_size=500, defer=False, sender=None):
+    # Sends the same notification to every user in user_ids with batched bulk_create,
+    # instead of one INSERT per recipient (thread participants, moderators).
+    # With defer the rows are written once the surrounding transaction commits, and never if it rolls back.
+    # Deferred fan-outs to more than FAN_OUT_JOB_THRESHOLD users are queued as a job owned by sender instead.
+    user_ids = list(user_ids)
+
+    def create():
+        Notification.objects.bulk_create([
+            Notification(
+                user_id=user_id,
+                title=title,
+                message=message,
+                notification_type=notification_type,
+                link=link
+            )
+            for user_id in user_ids
+        ], batch_size=batch_size)
+        increment_unread(user_ids)
+
+    def enqueue():
+        enqueue_job(sender, FAN_OUT_JOB, {
+            'user_ids': user_ids,
+            'title': title,
+            'message': message,
+            'notification_type': notification_type,
+            'link': link,
+        })
 
-def check_dangerous_symptoms(user, symptom_names, flow_level=None):
+    if defer and sender is not None and len(user_ids) > FAN_OUT_JOB_THRESHOLD:
+        transaction.on_commit(enqueue)
+    elif defer:
+        transaction.on_commit(create)
+    else:
+        create()
+    return len(user_ids)
+
+def create_notifications_once(notifications, batch_size=1000):
+    # Inserts the (unsaved) notifications whose dedupe_key hasn't been used for their user yet.
+    # The unique constraint does the deduplication: no read before the write, no race between concurrent callers.
+    Notification.objects.bulk_create(notifications, batch_size=batch_size, ignore_conflicts=True)
+    refresh_unread_counts({notification.user_id for notification in notifications})
+
+def create_notification_once(user, title, message, notification_type, dedupe_key, link=None):
+    create_notifications_once([
+        Notification(
+            user=user,
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            link=link,
+            dedupe_key=dedupe_key
+        )
+    ])
+
+def check_dangerous_symptoms(user, symptom_names, flow_level=None, log_date=None):
     # Checks for dangerous symptoms and triggers medical advice notification. 
     # Only sends notification if ALL dangerous symptoms are present together:
     # Severe Pain, Fainting, Fever, AND Heavy Bleeding.
+    # With log_date the advice is sent once per logged day, re-saving the same log doesn't repeat it.
     DANGEROUS_SYMPTOMS = ["Severe Pain", "Fainting", "Fever"]
     
     # Check if all dangerous symptoms are present
@@ -25,92 +110,58 @@ def check_dangerous_symptoms(user, symptom_names, flow_level=None):
     
     # Only notify if ALL conditions are met
     if has_all_symptoms and has_heavy_bleeding:
-        create_notification(
-            user=user,
-            title=_("URGENT: Medical Advice Needed"),
-            message=_("You have logged all critical symptoms together: Severe Pain, Fainting, Fever, and Heavy Bleeding. Please contact a medical professional immediately."),
-            notification_type='MEDICAL'
-        )
+        title = _("URGENT: Medical Advice Needed")
+        message = _("You have logged all critical symptoms together: Severe Pain, Fainting, Fever, and Heavy Bleeding. Please contact a medical professional immediately.")
+
+        if log_date:
+            create_notification_once(user, title, message, 'MEDICAL', f'medical:critical_symptoms:{log_date.isoformat()}')
+        else:
+            create_notification(user=user, title=title, message=message, notification_type='MEDICAL')
         return True
     return False
 
-def check_upcoming_predictions(user):
-    # Checks if a period or ovulation starts tomorrow and notifies the user. Only creates notification if one doesn't already exist for that prediction.
-    from datetime import date, timedelta
-    from cycle_core.models import CycleWindow
-    
-    tomorrow = date.today() + timedelta(days=1)
-    
-    # Check for period
-    upcoming_period = CycleWindow.objects.filter(
-        user=user,
-        is_prediction=True,
-        menstruation_start=tomorrow
-    ).first()
-    
-    if upcoming_period:
-        # Check if notification already exists for this prediction
-        existing_notification = Notification.objects.filter(
-            user=user,
-            notification_type='CYCLE',
-            title=_("Cycle Reminder"),
-            created_at__date=date.today()
-        ).exists()
-        
-        if not existing_notification:
-            create_notification(
-                user=user,
-                title=_("Cycle Reminder"),
-                message=_("Your period is predicted to start tomorrow."),
-                notification_type='CYCLE',
-                link='/dashboard/calendar'
-            )
+def cycle_reminder_key(kind, target_date):
+    return f'cycle:{kind}:{target_date.isoformat()}'
 
-    # Check for ovulation window start
-    upcoming_ovulation = CycleWindow.objects.filter(
-        user=user,
-        is_prediction=True,
-        min_ovulation_window=tomorrow
-    ).first()
-    
-    if upcoming_ovulation:
-        # Check if notification already exists for this prediction
-        existing_notification = Notification.objects.filter(
-            user=user,
+def send_cycle_reminders(today=None, batch_size=1000):
+    # Daily batch (manage.py send_cycle_reminders): notifies every user whose period, ovulation window or probable
+    # ovulation day starts tomorrow. One query finds the candidate predictions across all users and the reminders
+    # are bulk created once per dedupe_key, so re-running the batch for the same day is a no-op.
+    # Returns the number of reminders due (including the ones already sent).
+    # The batch runs without an active language: the reminders store the msgids, translated when displayed.
+    target = (today or date.today()) + timedelta(days=1)
+    reminders = {
+        'period': (gettext_noop("Cycle Reminder"), gettext_noop("Your period is predicted to start tomorrow.")),
+        'ovulation': (gettext_noop("Cycle Reminder"), gettext_noop("Your ovulation window is predicted to start tomorrow.")),
+        'ovulation_day': (gettext_noop("Ovulation Day Reminder"), gettext_noop("Your most likely ovulation day is tomorrow.")),
+    }
+    keys = {kind: cycle_reminder_key(kind, target) for kind in reminders}
+
+    # the probable ovulation day lies inside the ovulation window
+    windows = CycleWindow.objects.filter(is_prediction=True).filter(
+        Q(menstruation_start=target) | Q(min_ovulation_window__lte=target, max_ovulation_window__gte=target)
+    ).values_list('user_id', 'menstruation_start', 'min_ovulation_window', 'max_ovulation_window')
+
+    due = set()
+    for user_id, start, min_ovulation, max_ovulation in windows.iterator(chunk_size=batch_size):
+        if start == target:
+            due.add((user_id, 'period'))
+        if min_ovulation == target:
+            due.add((user_id, 'ovulation'))
+        phases = PredictedWindow(start, None, min_ovulation, max_ovulation).getPhasesBreakdown()
+        if phases['ovulation']['probable_date'] == target:
+            due.add((user_id, 'ovulation_day'))
+
+    notifications = [
+        Notification(
+            user_id=user_id,
+            title=reminders[kind][0],
+            message=reminders[kind][1],
             notification_type='CYCLE',
-            message=_("Your ovulation window is predicted to start tomorrow."),
-            created_at__date=date.today()
-        ).exists()
-        
-        if not existing_notification:
-            create_notification(
-                user=user,
-                title=_("Cycle Reminder"),
-                message=_("Your ovulation window is predicted to start tomorrow."),
-                notification_type='CYCLE',
-                link='/dashboard/calendar'
-            )
-    
-    # Check for probable ovulation day (midpoint of ovulation window)
-    for cycle_window in CycleWindow.objects.filter(user=user, is_prediction=True):
-        phases = cycle_window.getPhasesBreakdown()
-        probable_ovulation_date = phases['ovulation']['probable_date']
-        
-        if probable_ovulation_date == tomorrow:
-            # Check if notification already exists
-            existing_notification = Notification.objects.filter(
-                user=user,
-                notification_type='CYCLE',
-                title=_("Ovulation Day Reminder"),
-                created_at__date=date.today()
-            ).exists()
-            
-            if not existing_notification:
-                create_notification(
-                    user=user,
-                    title=_("Ovulation Day Reminder"),
-                    message=_("Your most likely ovulation day is tomorrow."),
-                    notification_type='CYCLE',
-                    link='/dashboard/calendar'
-                )
-            break  # Only notify once
+            link='/dashboard/calendar',
+            dedupe_key=keys[kind]
+        )
+        for user_id, kind in sorted(due)
+    ]
+    create_notifications_once(notifications, batch_size=batch_size)
+    return len(notifications)
\ No newline at end of file
@@ -1,8 +1,22 @@
-from django.test import TestCase
+from django.test import TestCase, RequestFactory
+from django.core.cache import cache
+from django.urls import reverse
+from django.db import transaction, connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
 from django.contrib.auth import get_user_model
-from forum_core.models import Thread, Comment
+from django.utils import translation
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import patch
+from cycle_core.models import CycleWindow
+from forum_core.models import Thread, Comment, CommentReport, ThreadReport
 from notifications.models import Notification
-from notifications.services import check_dangerous_symptoms
+from job_core.models import Job
+from job_core.services import claim_next_job, run_job
+from notifications.services import check_dangerous_symptoms, send_cycle_reminders, create_notification, create_notification_once, fan_out_notification, mark_all_notifications_read
+from notifications.unread import refresh_unread_counts, get_unread_count, get_recent_unread, decrement_unread
+from notifications.context_processors import notification_context
 
 User = get_user_model()
 
@@ -20,13 +34,262 @@ class NotificationTest(TestCase):
         self.assertIn("critical symptoms", notification.message)
         self.assertIn("Severe Pain", notification.message)
 
+    def test_dangerous_symptom_notification_once_per_day(self):
+        symptoms = ["Severe Pain", "Fainting", "Fever"]
+        for log_date in [date(2025, 3, 1), date(2025, 3, 1), date(2025, 3, 2)]:
+            self.assertTrue(check_dangerous_symptoms(self.user_a, symptoms, flow_level=3, log_date=log_date))
+
+        self.assertEqual(Notification.objects.filter(user=self.user_a, notification_type='MEDICAL').count(), 2)
+
+    def test_create_notification_once(self):
+        for user in [self.user_a, self.user_a, self.user_b]:
+            create_notification_once(user, "Title", "Message", 'CYCLE', 'cycle:period:2025-03-01')
+        # plain notifications have no key and are never deduplicated
+        create_notification(self.user_a, "Title", "Message", 'CYCLE')
+        create_notification(self.user_a, "Title", "Message", 'CYCLE')
+
+        self.assertEqual(Notification.objects.filter(user=self.user_a).count(), 3)
+        self.assertEqual(Notification.objects.filter(user=self.user_b).count(), 1)
+
     def test_forum_reply_notification(self):
         thread = Thread.objects.create(title="Test Thread", content="Body", created_by=self.user_a)
         
-        # User B replies
-        Comment.objects.create(thread=thread, created_by=self.user_b, content="I agree")
+        # User B replies, notifications are sent once the comment is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(thread=thread, created_by=self.user_b, content="I agree")
         
         # User A should get a notification
         notification = Notification.objects.filter(user=self.user_a, notification_type='FORUM').first()
         self.assertIsNotNone(notification)
         self.assertIn("user_b replied to your thread", notification.message)
+
+
+class CycleRemindersTest(TestCase):
+    def setUp(self):
+        self.user_a = User.objects.create_user(username='user_a', email='a@test.com', password='password')
+        self.user_b = User.objects.create_user(username='user_b', email='b@test.com', password='password')
+        self.user = User.objects.create_user(username='user_c', email='c@test.com', password='password')
+        self.today = date(2025, 3, 10)
+        self.tomorrow = self.today + timedelta(days=1)
+
+    def _predict(self, user, menstruation_start, min_ovulation, max_ovulation):
+        CycleWindow.objects.create(
+            user=user,
+            menstruation_start=menstruation_start,
+            menstruation_end=menstruation_start + timedelta(days=4),
+            min_ovulation_window=min_ovulation,
+            max_ovulation_window=max_ovulation,
+            is_prediction=True
+        )
+
+    def test_batch_is_idempotent(self):
+        self._predict(self.user, self.tomorrow, self.tomorrow + timedelta(days=12), self.tomorrow + timedelta(days=16))
+        # window starting tomorrow, probable ovulation day (midpoint) two days later
+        self._predict(self.user_a, self.tomorrow - timedelta(days=14), self.tomorrow, self.tomorrow + timedelta(days=4))
+        # probable ovulation day tomorrow
+        self._predict(self.user_b, self.tomorrow - timedelta(days=16), self.tomorrow - timedelta(days=2), self.tomorrow + timedelta(days=2))
+
+        # candidates, inserts, unread counters recount and upsert
+        with self.assertNumQueries(4):
+            self.assertEqual(send_cycle_reminders(self.today), 3)
+        send_cycle_reminders(self.today)
+
+        sent = Notification.objects.filter(notification_type='CYCLE').values_list('user__username', 'dedupe_key')
+        self.assertEqual(sorted(sent), [
+            ('user_a', 'cycle:ovulation:2025-03-11'),
+            ('user_b', 'cycle:ovulation_day:2025-03-11'),
+            ('user_c', 'cycle:period:2025-03-11'),
+        ])
+
+    def test_query_count_independent_of_users(self):
+        def reminder_queries(count):
+            # count more users with a reminder due
+            first = User.objects.count()
+            users = User.objects.bulk_create([
+                User(username=f'reminded_{i}', email=f'reminded_{i}@test.com') for i in range(first, first + count)
+            ])
+            for user in users:
+                self._predict(user, self.tomorrow, self.tomorrow + timedelta(days=12), self.tomorrow + timedelta(days=16))
+
+            with CaptureQueriesContext(connection) as ctx:
+                send_cycle_reminders(self.today)
+            return len(ctx.captured_queries)
+
+        # N then 2N users, within the same number of bulk_create batches (SQLite caps them at 999 parameters)
+        self.assertEqual(reminder_queries(25), reminder_queries(25))
+        self.assertEqual(Notification.objects.filter(dedupe_key='cycle:period:2025-03-11').count(), 50)
+
+    def test_command(self):
+        self._predict(self.user, self.tomorrow, self.tomorrow + timedelta(days=12), self.tomorrow + timedelta(days=16))
+        # logged windows don't trigger reminders
+        CycleWindow.objects.create(
+            user=self.user_a, menstruation_start=self.tomorrow, menstruation_end=self.tomorrow + timedelta(days=4),
+            min_ovulation_window=self.tomorrow + timedelta(days=12), max_ovulation_window=self.tomorrow + timedelta(days=16),
+            is_prediction=False
+        )
+        out = StringIO()
+
+        call_command('send_cycle_reminders', date=self.today, stdout=out)
+
+        self.assertIn('1 cycle reminders due', out.getvalue())
+        self.assertTrue(Notification.objects.filter(user=self.user, dedupe_key='cycle:period:2025-03-11').exists())
+
+    def test_reminders_translated_when_displayed(self):
+        self._predict(self.user, self.tomorrow, self.tomorrow + timedelta(days=12), self.tomorrow + timedelta(days=16))
+        # the batch language doesn't leak into the stored text
+        with translation.override('it'):
+            send_cycle_reminders(self.today)
+
+        notification = Notification.objects.get(user=self.user)
+        self.assertEqual(notification.message, "Your period is predicted to start tomorrow.")
+        self.assertEqual(notification.display_message, "Your period is predicted to start tomorrow.")
+        with translation.override('it'):
+            self.assertEqual(notification.display_title, "Promemoria ciclo")
+            self.assertEqual(notification.display_message, "La mestruazione dovrebbe iniziare domani.")
+
+class ForumFanOutTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', email='author@test.com', password='password')
+        self.replier = User.objects.create_user(username='replier', email='replier@test.com', password='password')
+        self.thread = Thread.objects.create(title="Popular Thread", content="Body", created_by=self.author)
+
+    def _add_participants(self, count):
+        first = User.objects.filter(username__startswith='participant_').count()
+        participants = User.objects.bulk_create([
+            User(username=f'participant_{i}', email=f'participant_{i}@test.com') for i in range(first, first + count)
+        ])
+        self.thread.participants.add(self.replier, self.author, *participants)
+
+    def test_reply_fan_out_query_count(self):
+        # the reply runs the same queries whatever the thread size: the fan-out is queued as a job
+        refresh_unread_counts([self.author.id])
+        for participants in (1000, 2000):
+            self._add_participants(participants - User.objects.filter(username__startswith='participant_').count())
+            # comment, participants, author notification and counter, job
+            with self.assertNumQueries(5):
+                with self.captureOnCommitCallbacks(execute=True):
+                    Comment.objects.create(thread=self.thread, created_by=self.replier, content="Hi")
+
+        self.assertEqual(Job.objects.filter(kind='fan_out_notification').count(), 2)
+        while (job := claim_next_job()) is not None:
+            self.assertEqual(run_job(job.id), 'DONE')
+
+        # the thread creator plus every participant except the replier
+        self.assertEqual(Notification.objects.filter(title="New reply in joined thread").count(), 1000 + 2000)
+        self.assertEqual(Notification.objects.filter(user=self.author, title="New reply on your thread").count(), 2)
+        self.assertFalse(Notification.objects.filter(user=self.replier).exists())
+        self.assertEqual(get_unread_count(User.objects.get(username='participant_0')), 2)
+
+    def test_large_fan_out_runs_in_a_job(self):
+        self._add_participants(5)
+
+        with patch('notifications.services.FAN_OUT_JOB_THRESHOLD', 3):
+            with self.captureOnCommitCallbacks(execute=True):
+                Comment.objects.create(thread=self.thread, created_by=self.replier, content="Hi")
+        self.assertFalse(Notification.objects.filter(title="New reply in joined thread").exists())
+
+        job = Job.objects.get(kind='fan_out_notification')
+        self.assertEqual(job.user, self.replier)
+        self.assertEqual(run_job(claim_next_job().id), 'DONE')
+        self.assertEqual(Notification.objects.filter(title="New reply in joined thread").count(), 5)
+        self.assertEqual(get_unread_count(User.objects.get(username='participant_0')), 1)
+
+    def test_no_notifications_on_rollback(self):
+        self._add_participants(3)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    Comment.objects.create(thread=self.thread, created_by=self.replier, content="Hi")
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Notification.objects.exists())
+
+    def test_report_notifies_every_moderator(self):
+        User.objects.bulk_create([
+            User(username=f'mod_{i}', email=f'mod_{i}@test.com', user_type='MODERATOR') for i in range(5)
+        ])
+        comment = Comment.objects.create(thread=self.thread, created_by=self.replier, content="Spam")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CommentReport.objects.create(comment=comment, reported_by=self.author, reason='SPAM')
+            ThreadReport.objects.create(thread=self.thread, reported_by=self.author, reason='SPAM')
+
+        self.assertEqual(Notification.objects.filter(user__user_type='MODERATOR', title="New Comment Report").count(), 5)
+        self.assertEqual(Notification.objects.filter(user__user_type='MODERATOR', title="New Thread Report").count(), 5)
+
+
+class UnreadCounterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', email='reader@test.com', password='password')
+        self.client.login(username='reader', password='password')
+
+    def _assertUnread(self, count):
+        self.assertEqual(get_unread_count(self.user), count)
+        self.assertEqual(get_unread_count(self.user), self.user.notifications.filter(is_read=False).count())
+
+    def test_counter_follows_writes(self):
+        first = create_notification(self.user, "First", "Message", 'FORUM')
+        fan_out_notification([self.user.id], "Second", "Message", 'FORUM')
+        create_notification_once(self.user, "Third", "Message", 'CYCLE', 'cycle:period:2025-03-01')
+        create_notification_once(self.user, "Third", "Message", 'CYCLE', 'cycle:period:2025-03-01')
+        self._assertUnread(3)
+
+        self.client.get(reverse('notifications:mark_as_read', args=[first.id]))
+        self.client.get(reverse('notifications:ajax_mark_as_read', args=[first.id]))
+        self._assertUnread(2)
+
+        second = self.user.notifications.get(title="Second")
+        self.client.get(reverse('notifications:delete_notification', args=[second.id]))
+        self.client.get(reverse('notifications:delete_notification', args=[first.id]))
+        self._assertUnread(1)
+
+        self.client.get(reverse('notifications:mark_all_as_read'))
+        self._assertUnread(0)
+
+    def test_mark_all_read_keeps_concurrent_notifications(self):
+        create_notification(self.user, "First", "Message", 'FORUM')
+        create_notification(self.user, "Second", "Message", 'FORUM')
+
+        # a notification created between the read update and the counter update stays unread
+        def create_then_decrement(user_id, count=1):
+            create_notification(self.user, "Third", "Message", 'FORUM')
+            decrement_unread(user_id, count)
+
+        with patch('notifications.services.decrement_unread', side_effect=create_then_decrement):
+            mark_all_notifications_read(self.user)
+        self._assertUnread(1)
+
+    def test_counter_created_lazily(self):
+        create_notification(self.user, "First", "Message", 'FORUM')
+        self.user.unread_counter.delete()
+
+        self._assertUnread(1)
+        create_notification(self.user, "Second", "Message", 'FORUM')
+        self._assertUnread(2)
+
+    def test_recent_unread_is_cached(self):
+        for i in range(7):
+            create_notification(self.user, f"Notification {i}", "Message", 'FORUM')
+
+        recent = get_recent_unread(self.user)
+        self.assertEqual(len(recent), 5)
+        with self.assertNumQueries(0):
+            get_recent_unread(self.user)
+
+        self.client.get(reverse('notifications:mark_as_read', args=[recent[0].id]))
+        self.assertNotIn(recent[0], get_recent_unread(self.user))
+        self.assertEqual(len(get_recent_unread(self.user)), 5)
+
+    def test_context_processor_is_lazy(self):
+        create_notification(self.user, "First", "Message", 'FORUM')
+        request = RequestFactory().get('/')
+        request.user = self.user
+
+        with self.assertNumQueries(0):
+            context = notification_context(request)
+        with self.assertNumQueries(1):
+            self.assertEqual(str(context['unread_notifications_count']), '1')
\ No newline at end of file
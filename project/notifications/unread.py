@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+from .models import Notification, UnreadCounter
+
+# Unread notifications state read by the context processor on every page: the per-user UnreadCounter row and a
+# cached list of the most recent unread notifications. Every service writing notifications goes through here:
+# exact inserts increment the counters, inserts that may skip duplicates recount them, reads and deletions
+# decrement them. Each change drops the user's cached list.
+RECENT_UNREAD_LIMIT = 5
+RECENT_UNREAD_TIMEOUT = 60 * 60
+BATCH_SIZE = 500
+
+
+def _recent_key(user_id):
+    return f'notifications:recent_unread:{user_id}'
+
+
+def _batches(user_ids):
+    user_ids = list(user_ids)
+    for i in range(0, len(user_ids), BATCH_SIZE):
+        yield user_ids[i:i + BATCH_SIZE]
+
+
+def increment_unread(user_ids):
+    # user_ids received exactly one new unread notification each
+    for batch in _batches(user_ids):
+        updated = UnreadCounter.objects.filter(user_id__in=batch).update(unread=F('unread') + 1)
+        if updated < len(batch):
+            # users without a counter yet start from their actual count (which includes the new notification)
+            existing = UnreadCounter.objects.filter(user_id__in=batch).values_list('user_id', flat=True)
+            refresh_unread_counts(set(batch) - set(existing))
+        cache.delete_many([_recent_key(user_id) for user_id in batch])
+
+
+def decrement_unread(user_id, count=1):
+    # count notifications of user_id were marked read or deleted
+    if count:
+        UnreadCounter.objects.filter(user_id=user_id, unread__gt=0).update(unread=Greatest(F('unread') - count, Value(0)))
+    cache.delete(_recent_key(user_id))
+
+
+def refresh_unread_counts(user_ids):
+    # Recomputes the counters from the notifications table, for bulk inserts that can't tell which rows they added.
+    for batch in _batches(user_ids):
+        counts = dict(
+            Notification.objects.filter(user_id__in=batch, is_read=False)
+            .values('user_id').annotate(unread=Count('id'))
+            .values_list('user_id', 'unread')
+        )
+        UnreadCounter.objects.bulk_create(
+            [UnreadCounter(user_id=user_id, unread=counts.get(user_id, 0)) for user_id in batch],
+            update_conflicts=True, unique_fields=['user'], update_fields=['unread']
+        )
+        cache.delete_many([_recent_key(user_id) for user_id in batch])
+
+
+def get_unread_count(user) -> int:
+    unread = UnreadCounter.objects.filter(user=user).values_list('unread', flat=True).first()
+    if unread is None:
+        refresh_unread_counts([user.id])
+        unread = UnreadCounter.objects.get(user=user).unread
+    return unread
+
+
+def get_recent_unread(user) -> list[Notification]:
+    key = _recent_key(user.id)
+    notifications = cache.get(key)
+    if notifications is None:
+        notifications = list(user.notifications.filter(is_read=False)[:RECENT_UNREAD_LIMIT])
+        cache.set(key, notifications, RECENT_UNREAD_TIMEOUT)
+    return notifications
\ No newline at end of file
@@ -2,6 +2,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from .models import Notification
+from .services import mark_notification_read, mark_all_notifications_read, delete_user_notification
 
 @login_required
 def notification_list(request):
@@ -11,8 +12,7 @@ def notification_list(request):
 @login_required
 def mark_as_read(request, notification_id):
     notification = get_object_or_404(Notification, id=notification_id, user=request.user)
-    notification.is_read = True
-    notification.save()
+    mark_notification_read(notification)
     
     if notification.link:
         return redirect(notification.link)
@@ -20,18 +20,17 @@ def mark_as_read(request, notification_id):
 
 @login_required
 def mark_all_as_read(request):
-    request.user.notifications.filter(is_read=False).update(is_read=True)
+    mark_all_notifications_read(request.user)
     return redirect('notifications:notification_list')
 
 @login_required
 def ajax_mark_as_read(request, notification_id):
     notification = get_object_or_404(Notification, id=notification_id, user=request.user)
-    notification.is_read = True
-    notification.save()
+    mark_notification_read(notification)
     return JsonResponse({'status': 'success'})
 
 @login_required
 def delete_notification(request, notification_id):
     notification = get_object_or_404(Notification, id=notification_id, user=request.user)
-    notification.delete()
+    delete_user_notification(notification)
     return redirect('notifications:notification_list')